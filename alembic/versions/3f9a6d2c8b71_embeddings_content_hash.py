@@ -0,0 +1,41 @@
+"""embeddings_content_hash
+
+Revision ID: 3f9a6d2c8b71
+Revises: e7b5c3a90f14
+Create Date: 2026-10-17 17:05:12.448190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a6d2c8b71'
+down_revision: Union[str, Sequence[str], None] = 'e7b5c3a90f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Same digest as server.utils.text_processing.content_hash: SHA-256 of the UTF-8 text
+    op.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT")
+    op.execute("""
+        UPDATE embeddings SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+        WHERE content_hash IS NULL
+    """)
+    # Earlier re-index runs could store the same chunk more than once; keep the oldest row
+    op.execute("""
+        DELETE FROM embeddings a USING embeddings b
+        WHERE a.user_id = b.user_id AND a.content_hash = b.content_hash AND a.id > b.id
+    """)
+    op.execute("ALTER TABLE embeddings ALTER COLUMN content_hash SET NOT NULL")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_embeddings_user_content_hash ON embeddings (user_id, content_hash)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ux_embeddings_user_content_hash")
+    op.execute("ALTER TABLE embeddings DROP COLUMN IF EXISTS content_hash")
@@ -0,0 +1,47 @@
+"""composite_indexes_for_time_range_queries
+
+Revision ID: 8c3f2a91d6e4
+Revises: 52618744fa9f
+Create Date: 2026-10-17 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3f2a91d6e4'
+down_revision: Union[str, Sequence[str], None] = '52618744fa9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns): equality columns first, the range / ORDER BY column last
+INDEXES = [
+    ("ix_vital_readings_patient_type_recorded_at", "vital_readings", ["patient_id", "type", "recorded_at"]),
+    ("ix_health_events_patient_event_date", "health_events", ["patient_id", "event_date"]),
+    ("ix_notifications_user_read_created_at", "notifications", ["user_id", "is_read", "created_at"]),
+    ("ix_system_logs_event_type_timestamp", "system_logs", ["event_type", "timestamp"]),
+    ("ix_medical_records_uploader_type_created_at", "medical_records", ["uploader_id", "type", "created_at"]),
+    ("ix_health_data_user_type_source_timestamp", "health_data", ["user_id", "data_type", "source_timestamp"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY on PostgreSQL so the tables stay writable while the indexes
+    # build; it cannot run inside a transaction, hence the autocommit block.
+    # The tables themselves may be newer than this database (create_all at
+    # startup creates them with the indexes already), so skip existing ones.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""admin_stats_rollup
+
+Revision ID: d41b7e0c9a25
+Revises: 8c3f2a91d6e4
+Create Date: 2026-10-17 11:40:03.118562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41b7e0c9a25'
+down_revision: Union[str, Sequence[str], None] = '8c3f2a91d6e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stats_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("dimension", sa.String(), primary_key=True),
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    # Incremental rollup refreshes recount recent days by timestamp range
+    with op.get_context().autocommit_block():
+        op.create_index("ix_system_logs_timestamp", "system_logs", ["timestamp"],
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_system_logs_timestamp", table_name="system_logs",
+                      if_exists=True, postgresql_concurrently=True)
+    op.drop_table("stats_rollups", if_exists=True)
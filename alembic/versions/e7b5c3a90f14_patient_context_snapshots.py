@@ -0,0 +1,44 @@
+"""patient_context_snapshots
+
+Revision ID: e7b5c3a90f14
+Revises: d41b7e0c9a25
+Create Date: 2026-10-17 15:22:47.930214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b5c3a90f14'
+down_revision: Union[str, Sequence[str], None] = 'd41b7e0c9a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Snapshots are derived data: the table starts empty and each patient's
+    # snapshot is built on first read
+    op.create_table(
+        "patient_context_snapshots",
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), primary_key=True),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("profile", sa.JSON(), nullable=True),
+        sa.Column("medications", sa.JSON(), nullable=True),
+        sa.Column("records", sa.JSON(), nullable=True),
+        sa.Column("vitals_latest", sa.JSON(), nullable=True),
+        sa.Column("vitals_daily", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_patient_context_snapshots_user_id", "patient_context_snapshots", ["user_id"],
+                    if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_patient_context_snapshots_user_id", table_name="patient_context_snapshots", if_exists=True)
+    op.drop_table("patient_context_snapshots", if_exists=True)
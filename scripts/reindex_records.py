@@ -1,79 +1,170 @@
 import sys
 import os
 import json
+import argparse
+from itertools import islice
+from typing import Dict, Optional
 
 # Add parent directory to path to import server modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from server.database import SessionLocal
-from server.models import MedicalRecord, Patient, User
+from server.models import MedicalRecord, Patient
 from server.services.agent_service import agent_service
+from server.utils.text_processing import content_hash
 
-def reindex_records():
-    db = SessionLocal()
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_CHECKPOINT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server", "data", "reindex_checkpoint.json"
+)
+
+
+def load_checkpoint(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {"last_id": None, "indexed": 0, "skipped": 0}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    """Atomic write, so a crash mid-save never leaves a corrupt checkpoint."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def record_content(record: MedicalRecord) -> str:
+    """Reproduces the RAG text format used by upload_patient_record."""
+    findings_str = ""
     try:
-        records = db.query(MedicalRecord).all()
-        print(f"Found {len(records)} records to check/index.")
-        
-        for record in records:
-            # Resolve User ID for indexing
-            user_id = record.uploader_id
-            if not user_id and record.patient_id:
-                patient = db.query(Patient).filter(Patient.id == record.patient_id).first()
-                if patient and patient.user_id:
-                    user_id = patient.user_id
-            
-            if not user_id:
-                print(f"Skipping Record {record.id}: No linked User ID found.")
-                continue
-                
-            print(f"Indexing Record {record.id} for User {user_id}")
-            
-            # Construct Content
-            # Try to reproduce the format from upload_patient_record
-            findings_str = ""
-            try:
-                # content_text is effectively the findings JSON in the new format
-                # or OCR text in valid old format
-                content_json = json.loads(record.content_text)
-                if isinstance(content_json, dict):
-                    findings_str = ", ".join([f"{k}: {v}" for k, v in content_json.items()])
-                elif isinstance(content_json, list):
-                    findings_str = ", ".join([str(f) for f in content_json])
-                else:
-                    findings_str = str(content_json)
-            except:
-                # If not JSON, assume raw text
-                findings_str = record.content_text or ""
-            
-            rag_content = f"Findings: {findings_str}"
-            if record.ai_summary:
-                rag_content += f"\nSummary: {record.ai_summary}"
-            
-            # Include Staff metadata in index
-            staff_info = []
-            if record.metadata_:
-                 meta = record.metadata_
-                 if meta.get("doctor_name"): staff_info.append(f"Doctor: {meta.get('doctor_name')}")
-                 if meta.get("nurse_name"): staff_info.append(f"Nurse: {meta.get('nurse_name')}")
-                 if meta.get("facility_name"): staff_info.append(f"Facility: {meta.get('facility_name')}")
-            
-            if staff_info:
-                 rag_content += f"\nStaff: {' | '.join(staff_info)}"
-
-            try:
-                agent_service.index_medical_record(
-                    user_id=user_id,
-                    record_id=record.id,
-                    content=rag_content,
-                    summary=record.ai_summary or "Medical Record"
-                )
-                print(f"Successfully Indexed {record.id}")
-            except Exception as e:
-                print(f"Failed to index {record.id}: {e}")
+        # content_text is effectively the findings JSON in the new format
+        # or OCR text in valid old format
+        content_json = json.loads(record.content_text)
+        if isinstance(content_json, dict):
+            findings_str = ", ".join([f"{k}: {v}" for k, v in content_json.items()])
+        elif isinstance(content_json, list):
+            findings_str = ", ".join([str(f) for f in content_json])
+        else:
+            findings_str = str(content_json)
+    except (TypeError, ValueError):
+        # If not JSON, assume raw text
+        findings_str = record.content_text or ""
+
+    rag_content = f"Findings: {findings_str}"
+    if record.ai_summary:
+        rag_content += f"\nSummary: {record.ai_summary}"
+
+    # Include Staff metadata in index
+    staff_info = []
+    meta = record.metadata_ or {}
+    if meta.get("doctor_name"): staff_info.append(f"Doctor: {meta.get('doctor_name')}")
+    if meta.get("nurse_name"): staff_info.append(f"Nurse: {meta.get('nurse_name')}")
+    if meta.get("facility_name"): staff_info.append(f"Facility: {meta.get('facility_name')}")
+
+    if staff_info:
+        rag_content += f"\nStaff: {' | '.join(staff_info)}"
+    return rag_content
+
+
+def resolve_user_ids(db, records) -> Dict[str, Optional[str]]:
+    """Record id -> user id to index under; one IN() query for the whole batch."""
+    patient_ids = {r.patient_id for r in records if not r.uploader_id and r.patient_id}
+    patient_users = {}
+    if patient_ids:
+        patient_users = dict(
+            db.query(Patient.id, Patient.user_id).filter(Patient.id.in_(patient_ids)).all()
+        )
+    return {r.id: r.uploader_id or patient_users.get(r.patient_id) for r in records}
+
 
+def index_batch(db, records) -> tuple:
+    """
+    Embeds and writes one batch. Returns (indexed, skipped); indexed includes
+    records whose content was already in the store.
+    """
+    user_ids = resolve_user_ids(db, records)
+
+    by_user: Dict[str, list] = {}
+    skipped = 0
+    for record in records:
+        user_id = user_ids[record.id]
+        if not user_id:
+            print(f"Skipping Record {record.id}: No linked User ID found.")
+            skipped += 1
+            continue
+        by_user.setdefault(user_id, []).append(
+            (record.id, record_content(record), record.ai_summary or "Medical Record")
+        )
+
+    # Records whose content is already stored for the user (a resumed or repeated
+    # run) are left out before anything is embedded
+    store = agent_service.vector_store
+    indexed = sum(len(items) for items in by_user.values())
+    for user_id, items in list(by_user.items()):
+        stored = store.indexed_hashes(user_id, [content_hash(content) for _, content, _ in items])
+        if stored:
+            by_user[user_id] = [item for item in items if content_hash(item[1]) not in stored]
+
+    # Embed the whole batch at once (parallel API batches, across users) to warm
+    # the embedding cache; the per-user store writes below then hit the cache.
+    embedder = store.embedder
+    pending = [content for items in by_user.values() for _, content, _ in items]
+    if pending and getattr(embedder, "cache", None) is not None:
+        embedder.embed(pending)
+
+    for user_id, items in by_user.items():
+        if items:
+            agent_service.index_medical_records(user_id, items)
+    return indexed, skipped
+
+
+def reindex_records(batch_size: int = DEFAULT_BATCH_SIZE, checkpoint_path: str = DEFAULT_CHECKPOINT,
+                    reset: bool = False, session_factory=SessionLocal) -> Dict:
+    """
+    Streams all medical records in primary-key order and indexes them in batches.
+    Progress is checkpointed after every batch, so an interrupted run resumes
+    after the last completed batch. Every vector store skips content already
+    stored for the user (same content hash; a unique index on PostgreSQL), so
+    replaying a partial batch or re-running with --reset adds no duplicates.
+    """
+    if reset and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint["last_id"]:
+        print(f"Resuming after Record {checkpoint['last_id']} ({checkpoint['indexed']} indexed so far).")
+
+    db = session_factory()
+    try:
+        query = db.query(MedicalRecord)
+        if checkpoint["last_id"]:
+            query = query.filter(MedicalRecord.id > checkpoint["last_id"])
+        stream = iter(query.order_by(MedicalRecord.id).yield_per(batch_size))
+
+        while True:
+            records = list(islice(stream, batch_size))
+            if not records:
+                break
+            indexed, skipped = index_batch(db, records)
+            checkpoint["last_id"] = records[-1].id
+            checkpoint["indexed"] += indexed
+            checkpoint["skipped"] += skipped
+            save_checkpoint(checkpoint_path, checkpoint)
+            print(f"Indexed {checkpoint['indexed']} records (skipped {checkpoint['skipped']}), last id {checkpoint['last_id']}")
     finally:
         db.close()
 
+    print(f"Re-index complete: {checkpoint['indexed']} indexed, {checkpoint['skipped']} skipped.")
+    return checkpoint
+
+
 if __name__ == "__main__":
-    reindex_records()
+    parser = argparse.ArgumentParser(description="Bulk re-index medical records into the RAG vector store.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="Ignore the checkpoint and start from the first record")
+    args = parser.parse_args()
+    reindex_records(batch_size=args.batch_size, checkpoint_path=args.checkpoint, reset=args.reset)
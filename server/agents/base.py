@@ -3,6 +3,7 @@ from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import Session
 import server.models as models
+from server.services.llm_client import llm_client
 # User accessed via models.User
 
 class BaseAgent(ABC):
@@ -10,6 +11,10 @@ class BaseAgent(ABC):
     Abstract Base Class for all specialized agents.
     Ensures a consistent interface for the Orchestrator.
     """
+
+    # Shared non-blocking LLM client (bounded concurrency, timeouts); agents
+    # must await self.llm.generate(...) instead of calling generate_content.
+    llm = llm_client
     
     def __init__(self, name: str, role: str, description: str):
         self.name = name
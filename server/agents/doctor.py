@@ -56,7 +56,7 @@ class DoctorAgent(BaseAgent):
              return {"status": "error", "message": "Doctor Brain (Gemini) not connected."}
 
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             res_json = json.loads(response.text)
             return {
                 "status": "success",
@@ -99,7 +99,7 @@ class DoctorAgent(BaseAgent):
         """
         
         try:
-            response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
@@ -131,7 +131,7 @@ class DoctorAgent(BaseAgent):
         Include: Immediate actions, Medication(s), Labs needed.
         """
         try:
-            response = model.generate_content(prompt)
+            response = await self.llm.generate(model, prompt)
             plan_text = response.text
             
             # 3. Predict Outcome & Log (World Model Simulation)
@@ -166,7 +166,7 @@ class DoctorAgent(BaseAgent):
         Identify 3 potential conflicts or missing checks. Return JSON list of {{ "suggestion": str, "rationale": str }}
         """
         try:
-            response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return []
@@ -192,7 +192,7 @@ class DoctorAgent(BaseAgent):
         """
         
         try:
-            response = model.generate_content(prompt)
+            response = await self.llm.generate(model, prompt)
             return {
                 "message": response.text,
                 "actions": [
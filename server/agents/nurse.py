@@ -70,7 +70,7 @@ class NurseAgent(BaseAgent):
         """
 
         try:
-            response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
             rankings = json.loads(response.text)
             
             updated_count = 0
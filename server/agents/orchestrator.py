@@ -14,10 +14,18 @@ from .integration_agent import IntegrationAgent
 from .claude_agent import ClaudeSpecialistAgent
 from .openai_agent import OpenAIAgent
 from ..services.domain_router import domain_router
+from ..services.llm_client import llm_client
+from ..utils.intent_router import LocalIntentRouter
+from .routing_table import RoutingTable, capability_version
+from .workflow_engine import WorkflowEngine
+from .workflows import DEFAULT_WORKFLOWS
+from ..services.consent_cache import consent_cache
+from ..services.audit_writer import audit_writer
 
 import google.generativeai as genai
 import json
 import os
+import time
 import uuid
 from datetime import datetime
 
@@ -26,8 +34,71 @@ class AgentOrchestrator:
     The Traffic Controller.
     Manages the registry of agents and routes tasks to the appropriate one.
     """
+
+    # Tasks a natural language query can be routed to
+    ROUTABLE_TASKS = [
+        'triage', 'diagnose', 'analyze_labs', 'analyze_image', 'check_eligibility', 
+        'estimate_cost', 'coping_strategies', 'research_condition', 'find_guidelines', 
+        'drug_interaction_deep_dive', 'generate_rehab_plan', 'emergency_protocol', 
+        'mental_health_screening', 'treatment_plan', 'review_labs', 'clinical_summary', 
+        'augment_case', 'daily_checkin', 'vitals_check', 'monitor', 'initial_assessment',
+        'check_interactions', 'check_drug_interaction', 'prior_auth', 'chat_with_patient',
+        'daily_checkup', 'crash_cart_recommendation', 'rapid_triage', 'validate_results',
+        'analyze_xray', 'analyze_ct', 'consult_healthcare_data', 'find_icd10_codes', 'research_clinical_guidelines',
+        'general_consultation', 'complex_reasoning', 'second_opinion', 'analyze_medical_structured',
+        'specialist_consult'
+    ]
+
+    # Local pre-router, stage 1: (regex, task, static payload); named groups become payload keys.
+    # Ordered most specific first. These mirror the "Common Maps" given to the LLM router.
+    ROUTING_RULES = [
+        (r"\b(?:code blue|cardiac arrest|crash cart)\b", "emergency_protocol", {}),
+        (r"\btriage\b(?:.*?\bcase\s+#?(?P<case_id>[\w-]+))?", "triage", {}),
+        (r"\b(?:analy[sz]e|review|read|interpret|look at)\b.*?\b(?:x-?rays?|radiographs?|ct scans?|mri|imaging|scans?)\b(?:.*?\bcase\s+#?(?P<case_id>[\w-]+))?", "analyze_image", {}),
+        (r"\b(?:analy[sz]e|review|interpret)\s+(?:the\s+)?labs?\b(?:.*?\bcase\s+#?(?P<case_id>[\w-]+))?", "analyze_labs", {}),
+        (r"\bguidelines?\s+(?:for|on)\s+(?P<condition>[^?.!]+)", "find_guidelines", {}),
+        (r"\binteractions?\s+(?:between|for|of)\s+(?P<medications>[^?.!]+)", "check_drug_interaction", {}),
+        (r"\b(?:drug|medication)\s+interactions?\b", "check_drug_interaction", {}),
+        (r"\bresearch\s+(?:treatments?\s+(?:for|of)\s+)?(?P<query>[^?.!]+)", "research_condition", {}),
+        (r"\bicd-?10\b", "find_icd10_codes", {}),
+        (r"\bprior\s+auth(?:ori[sz]ation)?\b", "prior_auth", {}),
+        (r"\b(?:insurance|coverage)\b.*\b(?:eligib\w*|cover(?:ed|s)?)\b|\beligib\w*\b.*\binsurance\b", "check_eligibility", {}),
+        (r"\bsecond opinion\b", "second_opinion", {}),
+        (r"\b(?:consult|ask)\s+(?:a\s+|the\s+)?specialist\b", "specialist_consult", {}),
+    ]
+
+    # Local pre-router, stage 2: phrases for the nearest-neighbour classifier.
+    # Tasks without hints are only reachable through rules or the LLM.
+    TASK_HINTS = {
+        'triage': "triage prioritise urgency assess severity case",
+        'diagnose': "diagnose diagnosis differential what is wrong",
+        'analyze_labs': "analyze lab results blood test panel values",
+        'analyze_image': "analyze image scan x-ray ct mri photo",
+        'check_eligibility': "insurance eligibility coverage covered plan",
+        'estimate_cost': "estimate cost price how much bill expensive",
+        'coping_strategies': "coping strategies cope stress stressed anxiety anxious worry overwhelmed",
+        'research_condition': "research condition literature studies evidence",
+        'find_guidelines': "clinical guidelines recommendations standard of care",
+        'generate_rehab_plan': "rehab rehabilitation recovery exercises physiotherapy plan",
+        'emergency_protocol': "emergency protocol resuscitation unstable acute",
+        'mental_health_screening': "mental health screening depression phq gad",
+        'treatment_plan': "treatment plan therapy management medication regimen",
+        'clinical_summary': "clinical summary summarize summarise case overview",
+        'vitals_check': "vitals check blood pressure heart rate temperature oxygen",
+        'check_drug_interaction': "drug interaction medications combine together safe",
+        'daily_checkup': "daily checkup check-in questions how feeling today",
+        'find_icd10_codes': "icd10 codes billing code diagnosis code",
+        'second_opinion': "second opinion another view confirm diagnosis",
+        'specialist_consult': "specialist consult cardiology orthopedics pulmonology endocrinology referral",
+    }
+
+    # Capability active flags are re-read at most this often (changes made by
+    # other workers); writes in this process invalidate immediately.
+    CAPABILITY_TTL_SECONDS = 30.0
+
     def __init__(self):
         # Configure Gemini for Routing
+        self.router_model = None
         self.api_key = os.environ.get("GEMINI_API_KEY")
         if self.api_key:
             genai.configure(api_key=self.api_key)
@@ -54,27 +125,75 @@ class AgentOrchestrator:
             EndocrinologyAgent()
         ]
 
+        self.local_router = LocalIntentRouter(
+            {task: self.TASK_HINTS[task] for task in self.ROUTABLE_TASKS if task in self.TASK_HINTS},
+            self.ROUTING_RULES
+        )
+        self._routing: RoutingTable = None
+        self.routing_table()
+
+        self.workflows = WorkflowEngine(self.dispatch, consent_check=self.consent_error)
+        for workflow in DEFAULT_WORKFLOWS:
+            self.workflows.register(workflow)
+
+    def register_agent(self, agent: BaseAgent):
+        self.agents.append(agent)
+        self.invalidate_routing()
+
+    def invalidate_routing(self):
+        self._routing = None
+
+    def _load_capabilities(self, db: Session) -> Dict[str, bool]:
+        from ..models import AgentCapability
+        capabilities = {}
+        for name, is_active in db.query(AgentCapability.capability_name, AgentCapability.is_active):
+            capabilities.setdefault(name, is_active)
+        return capabilities
+
+    def routing_table(self, db: Session = None) -> RoutingTable:
+        """
+        Current routing table. Rebuilt only after agents change or an
+        AgentCapability row is written; capability rows are (re)loaded when a
+        session is available.
+        """
+        table = self._routing
+        version = capability_version()
+        expired = db is not None and (
+            table is None or table.capabilities is None
+            or time.monotonic() - table.loaded_at > self.CAPABILITY_TTL_SECONDS
+        )
+        if table is None or table.version != version or expired:
+            capabilities = self._load_capabilities(db) if db is not None else None
+            table = RoutingTable(self.agents, self.ROUTABLE_TASKS, capabilities, version)
+            self._routing = table
+        return table
+
+    def route_locally(self, query: str) -> Dict[str, Any]:
+        """
+        Deterministic routing (regex rules, then nearest-neighbour over task
+        hints). Returns None when not confident enough; route_task then asks the LLM.
+        """
+        match = self.local_router.route(query)
+        if not match:
+            return None
+        payload = {"query": query}
+        payload.update(match.payload)
+        return {"task": match.label, "payload": payload, "routed_by": match.method, "confidence": round(match.confidence, 3)}
+
     async def route_task(self, query: str) -> Dict[str, Any]:
         """
         Intelligently routes a natural language query to a specific task and payload.
+        Common queries are resolved locally; only ambiguous ones reach the LLM.
         """
+        local = self.route_locally(query)
+        if local:
+            return local
+
         if not self.router_model:
             return {"error": "Router LLM not configured"}
 
-        # Dynamic Capability List
-        possible_tasks = [
-            'triage', 'diagnose', 'analyze_labs', 'analyze_image', 'check_eligibility', 
-            'estimate_cost', 'coping_strategies', 'research_condition', 'find_guidelines', 
-            'drug_interaction_deep_dive', 'generate_rehab_plan', 'emergency_protocol', 
-            'mental_health_screening', 'treatment_plan', 'review_labs', 'clinical_summary', 
-            'augment_case', 'daily_checkin', 'vitals_check', 'monitor', 'initial_assessment',
-            'check_interactions', 'check_drug_interaction', 'prior_auth', 'chat_with_patient',
-            'daily_checkup', 'crash_cart_recommendation', 'rapid_triage', 'validate_results',
-            'analyze_xray', 'analyze_ct', 'consult_healthcare_data', 'find_icd10_codes', 'research_clinical_guidelines',
-            'general_consultation', 'complex_reasoning', 'second_opinion', 'analyze_medical_structured',
-            'specialist_consult'
-        ]
-        caps_desc = "\n".join([f"- {a.name}: {a.description} (Tasks: {[t for t in possible_tasks if a.can_handle(t)]})" for a in self.agents])
+        # Capability list, rendered once per routing table
+        caps_desc = self.routing_table().prompt_capabilities
 
         prompt = f"""
         ACT AS: AI Agent Router.
@@ -98,19 +217,40 @@ class AgentOrchestrator:
         """
         
         try:
-            response = await self.router_model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await llm_client.generate(self.router_model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": f"Routing failed: {str(e)}"}
 
     def get_agent_for_task(self, task: str) -> BaseAgent:
         """
-        Simple Registry Lookup. 
-        In the future, this could use an LLM to decide which agent is best suited based on the task description.
+        Registry lookup through the precomputed task -> agent table.
         """
-        for agent in self.agents:
-            if agent.can_handle(task):
-                return agent
+        return self.routing_table().agent_for(task)
+
+    def consent_error(self, task: str, context: Dict[str, Any], db: Session) -> Dict[str, Any]:
+        """
+        The error response dispatch would return for this user's consent
+        settings, or None if the task may run.
+        """
+        user_id = context.get("user_id")
+        if not user_id:
+            return None
+        consent = consent_cache.get(db, user_id)
+        if not consent:
+            return None
+        if consent.gdpr_consent is False:
+            # Allow 'coping_strategies' (Psychology) or internal tasks, but block heavy data tasks
+            return {
+                "status": "error",
+                "message": "GDPR Permission Denied: You must enable 'GDPR Consent' in your profile to use AI Agents."
+            }
+        # Check Data Sharing for Research/External
+        if task in ["research_condition", "contribute_data"] and consent.data_sharing_consent is False:
+            return {
+                "status": "error",
+                "message": "Data Sharing Permission Denied: Enable 'Data Sharing' to use Research Agents."
+            }
         return None
 
     async def dispatch(self, task: str, payload: Dict[str, Any], context: Dict[str, Any], db: Session) -> Dict[str, Any]:
@@ -126,11 +266,7 @@ class AgentOrchestrator:
                 domain = classification.get("domain", "General")
             
             # Find the specific agent for this domain
-            target_agent = None
-            for agent in self.agents:
-                if hasattr(agent, 'domain_name') and agent.domain_name == domain:
-                    target_agent = agent
-                    break
+            target_agent = self.routing_table(db).agent_for_domain(domain)
             
             # Fallback to General (DoctorAgent) if specialist not found
             if not target_agent:
@@ -142,48 +278,26 @@ class AgentOrchestrator:
             # Standard Lookup
             agent = self.get_agent_for_task(task)
 
-        # 1. GDPR/Consent Check
+        # 1. GDPR/Consent Check (cached flags, invalidated when the User row changes)
         user_id = context.get("user_id")
-        if user_id:
-            from ..models import User # Delayed import to avoid circular dependency
-            user = db.query(User).filter(User.id == user_id).first()
-            if user:
-                # 1. GDPR/Consent Check
-                if hasattr(user, 'gdpr_consent') and user.gdpr_consent is False:
-                     # Allow 'coping_strategies' (Psychology) or internal tasks, but block heavy data tasks
-                     return {
-                         "status": "error", 
-                         "message": "GDPR Permission Denied: You must enable 'GDPR Consent' in your profile to use AI Agents."
-                     }
-                
-                # Check Data Sharing for Research/External
-                if task in ["research_condition", "contribute_data"] and hasattr(user, 'data_sharing_consent') and user.data_sharing_consent is False:
-                     return {
-                         "status": "error",
-                         "message": "Data Sharing Permission Denied: Enable 'Data Sharing' to use Research Agents."
-                     }
+        denied = self.consent_error(task, context, db)
+        if denied:
+            return denied
 
         if not agent:
              return {"status": "error", "message": f"No agent found capable of handling task: {task}"}
         
-        # Check Admin Configuration (Active Status)
-        from ..models import AgentCapability
-        capability = db.query(AgentCapability).filter(AgentCapability.capability_name == task).first()
-        if capability and not capability.is_active:
+        # Check Admin Configuration (Active Status), from the routing table's capability flags
+        capabilities = self.routing_table(db).capabilities or {}
+        if task in capabilities and not capabilities[task]:
              return {"status": "error", "message": f"Agent Capability '{task}' is currently disabled by Administrators."}
         
-        # Log execution
-        try:
-             import server.models as models
-             log = models.SystemLog(
-                 event_type="ai_query", 
-                 user_id=user_id if user_id else "system", 
-                 details={"task": task, "agent": agent.name, "action": "dispatch", "status": "started"}
-             )
-             db.add(log)
-             db.commit()
-        except Exception as e:
-             print(f"Orchestrator Log Error: {e}")
+        # Log execution (written in the background, batched)
+        audit_writer.enqueue(
+            "ai_query",
+            user_id if user_id else "system",
+            {"task": task, "agent": agent.name, "action": "dispatch", "status": "started"}
+        )
         
         # 2. EXECUTE AGENT
         # Some agents might need specialized method calls, but process() is the standard interface.
@@ -224,84 +338,15 @@ class AgentOrchestrator:
 
         return result
 
-    async def execute_workflow(self, workflow_name: str, payload: Dict[str, Any], context: Dict[str, Any], db: Session):
+    async def execute_workflow(self, workflow_name: str, payload: Dict[str, Any], context: Dict[str, Any], db: Session,
+                               rerun: List[str] = None, previous_run: str = None):
         """
-        Executes a pre-defined multi-step workflow.
+        Executes a registered multi-step workflow (see workflows.py).
+        Each step runs in its own session, so `db` is not shared with the steps.
+        `rerun` names steps to recompute (with everything downstream of them)
+        and `previous_run` is the run_id of an earlier run whose results to reuse.
         """
-        results = {}
-        
-        if workflow_name == "comprehensive_patient_analysis":
-            # Domain-Aware Multi-Agent Consultation
-            import asyncio
-            from ..models import Case
-
-            # 1. Get Case & Identify Domain
-            case_id = payload.get("case_id")
-            if not case_id: return {"error": "Missing case_id"}
-            
-            case = db.query(Case).filter(Case.id == case_id).first()
-            if not case: return {"error": "Case not found"}
-
-            case_text = f"Complaint: {case.complaint}\nHistory: {case.history}\nFindings: {case.findings}"
-            classification = await domain_router.classify_domain(case_text)
-            domain = classification.get("domain", "General")
-            
-            # Helper for conditional tasks
-            async def run_task_or_skip(condition, task_name, task_payload):
-                if condition:
-                    return await self.dispatch(task_name, task_payload, context, db)
-                return {"status": "skipped", "message": "Not applicable"}
-
-            # 2. Parallel Execution of Specialists
-            # - Domain Specialist (Cardio, Ortho, etc.)
-            # - Lab Specialist (if labs exist)
-            # - Radiology Specialist (if imaging exists)
-            
-            has_labs = bool(case.lab_results)
-            has_images = any(f.type in ['CT', 'X-Ray', 'MRI', 'Photo', 'Doppler Scan'] for f in case.files)
-
-            specialist_task = self.dispatch(
-                "specialist_consult", 
-                {"query": "Please provide a comprehensive domain assessment for this case.", "case_data": case_text, "domain": domain}, 
-                context, db
-            )
-            
-            lab_task = run_task_or_skip(has_labs, "analyze_labs", {"case_id": case_id})
-            img_task = run_task_or_skip(has_images, "analyze_image", {"case_id": case_id})
-
-            results = await asyncio.gather(specialist_task, lab_task, img_task)
-            spec_res, lab_res, img_res = results
-
-            # 3. Synthesis by Doctor (Moderator)
-            # We treat the specialist outputs as "expert testimony" for the Doctor to synthesize
-            
-            synthesis_payload = {
-                "case_id": case_id,
-                "extracted_data": { 
-                    "consultation_context": f"Multi-Disciplinary Team Review ({domain})",
-                    "specialist_opinion": spec_res.get("message"),
-                    "lab_analysis": lab_res,
-                    "radiology_analysis": img_res,
-                    "domain_actions": spec_res.get("actions", [])
-                },
-                "baseline_illnesses": case.patientProfile.comorbidities if case.patientProfile else []
-            }
-            
-            # Using 'augment_case' to synthesize findings
-            final_res = await self.dispatch("augment_case", synthesis_payload, context, db)
-            
-            return {
-                "status": "success",
-                "domain": domain,
-                "consultation_summary": {
-                    "specialist": spec_res,
-                    "labs": lab_res,
-                    "imaging": img_res
-                },
-                "final_recommendation": final_res
-            }
-            
-        return {"error": "Unknown workflow"}
+        return await self.workflows.run(workflow_name, payload, context, rerun=rerun, previous_run=previous_run)
 
     def list_capabilities(self):
         caps = []
@@ -4,6 +4,7 @@ import json
 import os
 import google.generativeai as genai
 from .base import BaseAgent
+from ..services.response_cache import response_cache
 
 class ResearcherAgent(BaseAgent):
     def __init__(self):
@@ -48,7 +49,7 @@ class ResearcherAgent(BaseAgent):
         }}
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
@@ -70,9 +71,12 @@ class ResearcherAgent(BaseAgent):
             "url_stub": "string"
         }}
         """
-        try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        async def find():
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
+
+        try:
+            return await response_cache.get_or_generate("find_guidelines", self.model.model_name, prompt, find)
         except Exception as e:
             return {"error": str(e)}
 
@@ -97,7 +101,7 @@ class ResearcherAgent(BaseAgent):
         }}
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
@@ -0,0 +1,74 @@
+from typing import Dict, List, Optional
+import time
+
+from sqlalchemy import event
+
+from .base import BaseAgent
+from ..models import AgentCapability
+
+# Bumped whenever an AgentCapability row is inserted, updated or deleted, so
+# routing tables built from older rows know they are stale.
+_capability_version = 0
+
+
+def capability_version() -> int:
+    return _capability_version
+
+
+def _capabilities_changed(mapper, connection, target):
+    global _capability_version
+    _capability_version += 1
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(AgentCapability, _event, _capabilities_changed)
+
+
+class RoutingTable:
+    """
+    Precomputed routing state for the orchestrator: task -> agent, specialist
+    domain -> agent, the agent list rendered for the LLM router and, when
+    loaded, the admin active flag of each AgentCapability.
+    Built once and replaced (never mutated, apart from the lookup memo) when
+    agents or capability rows change.
+    """
+
+    def __init__(self, agents: List[BaseAgent], routable_tasks: List[str],
+                 capabilities: Optional[Dict[str, bool]] = None, version: int = 0):
+        self.agents = list(agents)
+        self.version = version
+        self.capabilities = capabilities
+        self.loaded_at = time.monotonic()
+
+        # Known task names, misses included; bounded by the code and the capability rows
+        self.task_agents: Dict[str, Optional[BaseAgent]] = {}
+        for task in list(routable_tasks) + list(capabilities or {}):
+            self.task_agents[task] = self._resolve(task)
+
+        # First agent wins, as with the previous linear scans
+        self.domain_agents: Dict[str, BaseAgent] = {}
+        for agent in self.agents:
+            domain = getattr(agent, "domain_name", None)
+            if domain:
+                self.domain_agents.setdefault(domain, agent)
+
+        self.prompt_capabilities = "\n".join(
+            f"- {a.name}: {a.description} (Tasks: {[t for t in routable_tasks if a.can_handle(t)]})" for a in self.agents
+        )
+
+    def _resolve(self, task: str) -> Optional[BaseAgent]:
+        return next((a for a in self.agents if a.can_handle(task)), None)
+
+    def agent_for(self, task: str) -> Optional[BaseAgent]:
+        try:
+            return self.task_agents[task]
+        except KeyError:
+            # Other task names come from callers: only memoise the ones some agent
+            # handles (a fixed set), never misses, so made-up names cannot grow the table
+            agent = self._resolve(task)
+            if agent is not None:
+                self.task_agents[task] = agent
+            return agent
+
+    def agent_for_domain(self, domain: Optional[str]) -> Optional[BaseAgent]:
+        return self.domain_agents.get(domain) if domain else None
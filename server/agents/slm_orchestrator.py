@@ -1,26 +1,181 @@
-import google.generativeai as genai
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import threading
+import time
+
+from ..config import settings
+from ..services.llm_client import llm_client
+
+
+class ModelHealth:
+    """Observed behaviour of one model: EWMA latency / error rate and a recent-latency window for p95."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.latencies: Deque[Tuple[float, float]] = deque(maxlen=window) # (observed_at, seconds)
+        self.calls = 0
+        self.errors = 0
+        self.last_seen = 0.0
+        self.rate_limited_until = 0.0
+
+    def observe(self, latency: float, error: bool, now: float):
+        self.calls += 1
+        self.errors += int(error)
+        self.last_seen = now
+        self.error_ewma = self.alpha * float(error) + (1 - self.alpha) * self.error_ewma
+        if not error:
+            self.latencies.append((now, latency))
+            self.latency_ewma = latency if self.latency_ewma is None else \
+                self.alpha * latency + (1 - self.alpha) * self.latency_ewma
+
+    def recent_latencies(self, since: float) -> List[float]:
+        return [latency for at, latency in self.latencies if at >= since]
+
+    def p95(self, since: float = 0.0) -> Optional[float]:
+        ordered = sorted(self.recent_latencies(since))
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def to_dict(self, now: float) -> dict:
+        p95 = self.p95()
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "error_ewma": round(self.error_ewma, 3),
+            "p95": round(p95, 3) if p95 is not None else None,
+            "rate_limited_for": round(max(0.0, self.rate_limited_until - now), 1)
+        }
+
 
 class SLMOrchestrator:
     """
-    Orchestrates logic to select the most efficient model (SLM vs LLM) 
-    based on query complexity and domain availability.
+    Orchestrates logic to select the most efficient model (SLM vs LLM)
+    based on query complexity, domain availability and observed model health.
+
+    Models are ordered in tiers, fastest/cheapest first. The complexity
+    heuristics (or the caller's preferred model) pick a starting tier; the
+    selector then steps down to faster tiers while the candidate is rate
+    limited, failing too often, or its observed p95 latency exceeds the
+    endpoint's target, and by one tier when the LLM client is near its
+    concurrency limit.
     """
-    
+
+    # p95 latency targets (seconds) per endpoint / task
+    LATENCY_TARGETS: Dict[str, float] = {
+        "chat": 8.0,
+        "daily_questions": 5.0,
+        "extract_case": 10.0,
+        "specialist_consult": 20.0,
+        "patient_report": 25.0,
+        "comprehensive_report": 30.0,
+    }
+    DEFAULT_LATENCY_TARGET = 15.0
+    MAX_ERROR_RATE = 0.3
+    MIN_SAMPLES = 5 # observations before p95 is trusted
+    HEALTH_WINDOW = 300.0 # seconds; older observations stop counting, so a degraded model gets retried
+    RATE_LIMIT_COOLDOWN = 30.0
+    LOAD_THRESHOLD = 0.8 # fraction of LLM client slots in use before degrading
+
+    STRONG_MODEL = "gemini-3-pro-preview"
+    FAST_MODEL = "gemini-3-flash-preview"
+
+    def __init__(self, tiers: List[str] = None):
+        self.tiers = tiers or [t.strip() for t in settings.MODEL_TIERS.split(",") if t.strip()]
+        self._health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+        self._stats = {"selections": 0, "degraded": 0}
+
     @staticmethod
-    def select_model(query: str, domain: str) -> str:
-        """
-        Returns the model name to use.
-        """
+    def _normalize(model_name: str) -> str:
+        return model_name[len("models/"):] if model_name.startswith("models/") else model_name
+
+    def health(self, model_name: str) -> ModelHealth:
+        model_name = self._normalize(model_name)
+        with self._lock:
+            health = self._health.get(model_name)
+            if health is None:
+                health = self._health[model_name] = ModelHealth()
+            return health
+
+    def record(self, model_name: str, latency: float, error: Optional[BaseException] = None):
+        """Observation hook for LLMClient: one finished call of model_name."""
+        health = self.health(model_name)
+        with self._lock:
+            health.observe(latency, error is not None, time.monotonic())
+            if error is not None and self._is_rate_limit(error):
+                health.rate_limited_until = time.monotonic() + self.RATE_LIMIT_COOLDOWN
+
+    @staticmethod
+    def _is_rate_limit(error: BaseException) -> bool:
+        # google.api_core ResourceExhausted / TooManyRequests carry code 429
+        return getattr(error, "code", None) == 429 or "429" in str(error) or "quota" in str(error).lower()
+
+    def preferred_model(self, query: str) -> str:
         # 1. Heuristic: Length check
         if len(query) > 1000:
-             return "gemini-3-pro-preview" # Use stronger model for long context
-        
+            return self.STRONG_MODEL # Use stronger model for long context
+
         # 2. Heuristic: Keywords requiring high reasoning
         complex_triggers = ["analyze", "compare", "synthesize", "treatment plan", "differential diagnosis"]
         if any(trigger in query.lower() for trigger in complex_triggers):
-             return "gemini-3-pro-preview"
-             
+            return self.STRONG_MODEL
+
         # 3. Default to Flash (SLM-tier speed/cost)
-        return "gemini-3-flash-preview"
+        return self.FAST_MODEL
+
+    def _within_budget(self, model_name: str, target: float, now: float) -> bool:
+        health = self._health.get(model_name)
+        if health is None:
+            return True
+        if health.rate_limited_until > now:
+            return False
+        since = now - self.HEALTH_WINDOW
+        if health.last_seen < since:
+            return True
+        if health.calls >= self.MIN_SAMPLES and health.error_ewma > self.MAX_ERROR_RATE:
+            return False
+        recent = health.recent_latencies(since)
+        return len(recent) < self.MIN_SAMPLES or health.p95(since) <= target
+
+    def select_model(self, query: str, domain: str = None, endpoint: str = None, preferred: str = None) -> str:
+        """
+        Returns the model name to use.
+        """
+        wanted = preferred or self.preferred_model(query)
+        if wanted not in self.tiers:
+            return wanted
+        target = self.LATENCY_TARGETS.get(endpoint, self.DEFAULT_LATENCY_TARGET)
+        now = time.monotonic()
+        start = self.tiers.index(wanted)
+
+        load = llm_client.get_stats()
+        if start > 0 and load["in_flight"] >= self.LOAD_THRESHOLD * load["max_concurrency"]:
+            start -= 1
+
+        with self._lock:
+            self._stats["selections"] += 1
+            chosen = next((m for m in reversed(self.tiers[:start + 1]) if self._within_budget(m, target, now)), None)
+            if chosen is None:
+                # Nothing meets the budget: fastest tier that is not rate limited, else the fastest
+                chosen = next((m for m in self.tiers if self._health.get(m) is None or self._health[m].rate_limited_until <= now),
+                              self.tiers[0])
+            if chosen != wanted:
+                self._stats["degraded"] += 1
+        return chosen
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                **self._stats,
+                "tiers": self.tiers,
+                "models": {name: h.to_dict(now) for name, h in self._health.items()}
+            }
+
 
 slm_orchestrator = SLMOrchestrator()
+llm_client.observer = slm_orchestrator.record
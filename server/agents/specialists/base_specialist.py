@@ -88,10 +88,10 @@ class SpecialistAgent(BaseAgent):
         response_text = "AI Service Unavailable"
         try:
             from ..slm_orchestrator import slm_orchestrator
-            model_name = slm_orchestrator.select_model(query, self.domain_name)
+            model_name = slm_orchestrator.select_model(query, self.domain_name, endpoint="specialist_consult")
             
             model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
-            result = await model.generate_content_async(prompt)
+            result = await self.llm.generate(model, prompt)
             response_text = result.text
         except Exception as e:
             response_text = f"Error consulting specialist: {str(e)}"
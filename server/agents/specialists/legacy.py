@@ -39,7 +39,7 @@ class EmergencyAgent(BaseAgent):
         Format: JSON {{ "steps": ["step 1", "step 2"], "equipment_needed": ["item 1"], "alert_level": "RED/YELLOW" }}
         """
         try:
-            response = await self.model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception:
             return {"steps": ["Call 911", "Stabilize patient"], "alert_level": "RED"}
@@ -95,7 +95,7 @@ class LaboratoryAgent(BaseAgent):
         """
         
         try:
-            response = await self.model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
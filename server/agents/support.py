@@ -4,6 +4,7 @@ import google.generativeai as genai
 import os
 import json
 from .base import BaseAgent
+from ..services.response_cache import response_cache
 
 class PatientAgent(BaseAgent):
     def __init__(self):
@@ -43,8 +44,12 @@ class PatientAgent(BaseAgent):
         Use simple, comforting language. Avoid scary jargon.
         Return JSON {{ "explanation": "string", "key_takeaways": ["point 1", "point 2"] }}
         """
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        return json.loads(response.text)
+
+        async def explain():
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
+            return json.loads(response.text)
+
+        return await response_cache.get_or_generate("explain_diagnosis", self.model.model_name, prompt, explain)
 
     async def _daily_checkup(self, payload: Dict[str, Any], context: Dict[str, Any], db: Session):
         """Generates daily checkup questions based on patient profile."""
@@ -71,7 +76,7 @@ class PatientAgent(BaseAgent):
         OUTPUT JSON: {{ "questions": ["q1", "q2", "q3"], "greeting": "string" }}
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"questions": ["How are you feeling today?", "Did you take your medications?", "Any new symptoms?"], "greeting": "Good morning! Let's check in on your health."}
@@ -95,7 +100,7 @@ class PatientAgent(BaseAgent):
         OUTPUT JSON: {{ "reminders": [{{ "name": "med name", "message": "friendly reminder", "timing": "when to take" }}] }}
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
@@ -140,7 +145,7 @@ class PatientAgent(BaseAgent):
         }}
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": str(e)}
@@ -174,7 +179,7 @@ class PatientAgent(BaseAgent):
             # If we want to CHANGE key instruction, we need new model instance.
             model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=sys_instr)
             chat = model.start_chat(history=chat_history)
-            response = chat.send_message(message)
+            response = await self.llm.send_message(chat, message)
             return {"response": response.text}
         except Exception as e:
             return {"response": f"I'm having trouble connecting to my medical brain right now. Please try again. ({str(e)})"}
@@ -218,7 +223,7 @@ class InsuranceAgent(BaseAgent):
         - copay: string (e.g. "$50.00")
         - notes: brief explanation of coverage decision.
         """
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
         return json.loads(response.text)
 
 class PricingAgent(BaseAgent):
@@ -258,7 +263,7 @@ class PricingAgent(BaseAgent):
         - insurance_coverage_est: number
         - patient_responsibility_est: number
         """
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
         return json.loads(response.text)
 
 class RecoveryAgent(BaseAgent):
@@ -303,7 +308,7 @@ class RecoveryAgent(BaseAgent):
         - estimated_recovery_time: string
         """
         try:
-            response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
             return json.loads(response.text)
         except Exception as e:
             return {"error": f"Failed to generate plan: {str(e)}"}
@@ -339,5 +344,5 @@ class PsychologyAgent(BaseAgent):
         - daily_affirmation: string
         - recommended_resources: list of strings (book titles or app types)
         """
-        response = self.model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        response = await self.llm.generate(self.model, prompt, generation_config={"response_mime_type": "application/json"})
         return json.loads(response.text)
@@ -0,0 +1,295 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any] # {"payload": <workflow payload>, "context": <request context>, <step name>: <result>, ...}
+
+SKIPPED = {"status": "skipped", "message": "Not applicable"}
+
+
+def is_error(result: Any) -> bool:
+    """Agents report failures as {"status": "error", ...} or {"error": ...}."""
+    return isinstance(result, dict) and (result.get("status") == "error" or "error" in result)
+
+
+class WorkflowAbort(Exception):
+    """Raised by a step to end the workflow early with `result` as its response."""
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(str(result))
+        self.result = result
+
+
+@dataclass
+class WorkflowStep:
+    """
+    One node of a workflow DAG.
+
+    Either `task` (dispatched to an agent through the orchestrator with
+    inputs(scope) as payload) or `fn` (awaited as fn(inputs, db, context)).
+    Steps whose `when(scope)` is false produce `skip_result` without running.
+    `version(scope)` is folded into the memo key for data the step reads
+    that is not part of its inputs (e.g. a fingerprint of the rows a task loads).
+    """
+    name: str
+    after: List[str] = field(default_factory=list)
+    task: Optional[str] = None
+    fn: Optional[Callable[[Dict[str, Any], Session, Dict[str, Any]], Awaitable[Any]]] = None
+    inputs: Callable[[Scope], Dict[str, Any]] = lambda scope: dict(scope["payload"])
+    when: Optional[Callable[[Scope], bool]] = None
+    version: Optional[Callable[[Scope], Any]] = None
+    skip_result: Any = field(default_factory=lambda: dict(SKIPPED))
+    memoize: bool = True
+
+
+@dataclass
+class Workflow:
+    name: str
+    steps: List[WorkflowStep]
+    output: Callable[[Scope], Dict[str, Any]]
+
+    def __post_init__(self):
+        names = [s.name for s in self.steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Workflow '{self.name}' has duplicate step names")
+        known = set(names)
+        for step in self.steps:
+            missing = set(step.after) - known
+            if missing:
+                raise ValueError(f"Step '{step.name}' depends on unknown steps {sorted(missing)}")
+            if (step.task is None) == (step.fn is None):
+                raise ValueError(f"Step '{step.name}' needs exactly one of task or fn")
+        self.order() # rejects cycles
+
+    def order(self) -> List[str]:
+        """Topological order of the steps (raises ValueError on cycles)."""
+        deps = {s.name: set(s.after) for s in self.steps}
+        ordered: List[str] = []
+        while deps:
+            ready = sorted(name for name, after in deps.items() if not after)
+            if not ready:
+                raise ValueError(f"Workflow '{self.name}' has a dependency cycle among {sorted(deps)}")
+            for name in ready:
+                ordered.append(name)
+                del deps[name]
+            for after in deps.values():
+                after.difference_update(ready)
+        return ordered
+
+    def downstream(self, names: Iterable[str]) -> Set[str]:
+        """The given steps plus everything that (transitively) depends on them."""
+        result = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for step in self.steps:
+                if step.name not in result and result.intersection(step.after):
+                    result.add(step.name)
+                    changed = True
+        return result
+
+
+class WorkflowEngine:
+    """
+    Runs declarative workflow DAGs.
+
+    Every step starts as soon as its dependencies have finished, so
+    independent branches run concurrently; each step gets its own database
+    session. Successful step results are memoised by a hash of (workflow,
+    step, user, inputs); a memoised agent task is only served while
+    `consent_check` still lets the user run it. `rerun` forces the named
+    steps and their dependents to execute again, and `previous_run` (the
+    run_id of an earlier run of the same workflow, user and payload) reuses
+    its step results so only the remaining steps execute. Those results are
+    kept server-side; clients never supply step results themselves.
+    """
+
+    def __init__(self, dispatch: Callable[[str, Dict[str, Any], Dict[str, Any], Session], Awaitable[Dict[str, Any]]],
+                 session_factory: Callable[[], Session] = None, memo_size: int = 512, memo_ttl: float = 600.0,
+                 consent_check: Optional[Callable[[str, Dict[str, Any], Session], Optional[Dict[str, Any]]]] = None):
+        self.dispatch = dispatch
+        self.consent_check = consent_check
+        self._session_factory = session_factory
+        self.memo_size = memo_size
+        self.memo_ttl = memo_ttl
+        self.workflows: Dict[str, Workflow] = {}
+        self._memo: "OrderedDict[str, tuple]" = OrderedDict()
+        # run_id -> (expires_at, owner key, step results)
+        self._runs: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats = {"runs": 0, "steps_run": 0, "memo_hits": 0, "skipped": 0}
+
+    @property
+    def session_factory(self) -> Callable[[], Session]:
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory: Callable[[], Session]):
+        self._session_factory = factory
+
+    def register(self, workflow: Workflow):
+        self.workflows[workflow.name] = workflow
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.workflows
+
+    def _memo_key(self, workflow: str, step: str, user_id: Optional[str], inputs: Dict[str, Any], version: Any = None) -> str:
+        blob = json.dumps([workflow, step, user_id, inputs, version], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _memo_get(self, key: str):
+        entry = self._memo.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._memo.pop(key, None)
+            return None
+        self._memo.move_to_end(key)
+        return entry
+
+    def _memo_set(self, key: str, value: Any):
+        self._memo[key] = (time.monotonic() + self.memo_ttl, copy.deepcopy(value))
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def clear_memo(self):
+        self._memo.clear()
+
+    @staticmethod
+    def _run_owner(workflow: str, payload: Dict[str, Any], context: Dict[str, Any]) -> str:
+        return json.dumps([workflow, context.get("user_id"), payload], sort_keys=True, default=str)
+
+    def _remember_run(self, owner: str, results: Dict[str, Any]) -> str:
+        run_id = uuid.uuid4().hex
+        self._runs[run_id] = (time.monotonic() + self.memo_ttl, owner, copy.deepcopy(results))
+        while len(self._runs) > self.memo_size:
+            self._runs.popitem(last=False)
+        return run_id
+
+    def _previous_results(self, run_id: Optional[str], owner: str) -> Dict[str, Any]:
+        """Step results of an earlier run, if it is still kept and was for the same workflow, user and payload."""
+        entry = self._runs.get(run_id) if run_id else None
+        if entry is None or entry[0] <= time.monotonic() or entry[1] != owner:
+            return {}
+        return copy.deepcopy(entry[2])
+
+    def _consent_error(self, step: WorkflowStep, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """What dispatch would answer instead of running step.task, if anything."""
+        if step.task is None or self.consent_check is None:
+            return None
+        db = self.session_factory()
+        try:
+            return self.consent_check(step.task, context, db)
+        finally:
+            db.close()
+
+    async def _run_step(self, workflow: Workflow, step: WorkflowStep, scope: Scope, use_memo: bool) -> tuple:
+        """Returns (result, how) with how in {"run", "memo", "skipped"}."""
+        if step.when is not None and not step.when(scope):
+            return copy.deepcopy(step.skip_result), "skipped"
+
+        inputs = step.inputs(scope)
+        context = scope["context"]
+        key = None
+        if step.memoize:
+            version = step.version(scope) if step.version else None
+            key = self._memo_key(workflow.name, step.name, context.get("user_id"), inputs, version)
+            if use_memo:
+                cached = self._memo_get(key)
+                if cached is not None:
+                    # The memo skips dispatch, and with it the consent check
+                    denied = self._consent_error(step, context)
+                    if denied:
+                        return denied, "run"
+                    return copy.deepcopy(cached[1]), "memo"
+
+        db = self.session_factory()
+        try:
+            if step.task:
+                result = await self.dispatch(step.task, inputs, context, db)
+            else:
+                result = await step.fn(inputs, db, context)
+        finally:
+            db.close()
+
+        # Errors (consent denied, agent failures) must not outlive their cause
+        if key is not None and not is_error(result):
+            self._memo_set(key, result)
+        return result, "run"
+
+    async def run(self, name: str, payload: Dict[str, Any], context: Dict[str, Any],
+                  rerun: Optional[Iterable[str]] = None, previous_run: Optional[str] = None) -> Dict[str, Any]:
+        workflow = self.workflows.get(name)
+        if workflow is None:
+            return {"error": "Unknown workflow"}
+        self._stats["runs"] += 1
+
+        owner = self._run_owner(name, payload, context)
+        forced = workflow.downstream(rerun or [])
+        scope: Scope = {"payload": payload, "context": context}
+        trace: Dict[str, str] = {}
+        previous = self._previous_results(previous_run, owner)
+        for step in workflow.steps:
+            # Non-memoised steps read live state (e.g. load and check the case) and always run
+            if step.name not in previous or step.name in forced or not step.memoize:
+                continue
+            if is_error(previous[step.name]) or self._consent_error(step, context):
+                continue
+            scope[step.name] = previous[step.name]
+            trace[step.name] = "previous"
+
+        pending = {s.name: s for s in workflow.steps if s.name not in trace}
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while pending or running:
+                for step_name, step in list(pending.items()):
+                    if all(dep in trace for dep in step.after):
+                        del pending[step_name]
+                        task = asyncio.create_task(self._run_step(workflow, step, scope, step_name not in forced))
+                        running[task] = step_name
+                if not running:
+                    raise RuntimeError(f"Workflow '{name}' cannot make progress: {sorted(pending)}")
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    step_name = running.pop(task)
+                    result, how = task.result()
+                    scope[step_name] = result
+                    trace[step_name] = how
+                    if how == "run":
+                        self._stats["steps_run"] += 1
+                    elif how == "memo":
+                        self._stats["memo_hits"] += 1
+                    else:
+                        self._stats["skipped"] += 1
+        except WorkflowAbort as abort:
+            return abort.result
+        finally:
+            for task in running:
+                task.cancel()
+
+        results = {s.name: scope[s.name] for s in workflow.steps}
+        output = workflow.output(scope)
+        output["workflow"] = {
+            "name": name,
+            "run_id": self._remember_run(owner, results),
+            "steps": trace,
+            "results": results
+        }
+        return output
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "memo_size": len(self._memo), "runs_kept": len(self._runs),
+                "workflows": sorted(self.workflows)}
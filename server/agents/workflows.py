@@ -0,0 +1,100 @@
+from typing import Any, Dict
+import hashlib
+import json
+
+from sqlalchemy.orm import Session
+
+from .workflow_engine import Workflow, WorkflowAbort, WorkflowStep
+from ..services.domain_router import domain_router
+
+IMAGING_FILE_TYPES = ['CT', 'X-Ray', 'MRI', 'Photo', 'Doppler Scan']
+
+
+async def load_case(inputs: Dict[str, Any], db: Session, context: Dict[str, Any]) -> Dict[str, Any]:
+    from ..models import Case
+
+    case_id = inputs.get("case_id")
+    if not case_id:
+        raise WorkflowAbort({"error": "Missing case_id"})
+
+    case = db.query(Case).filter(Case.id == case_id).first()
+    if not case:
+        raise WorkflowAbort({"error": "Case not found"})
+
+    case_text = f"Complaint: {case.complaint}\nHistory: {case.history}\nFindings: {case.findings}"
+    labs = [(l.id, l.test, l.value, l.status) for l in case.lab_results]
+    files = sorted((f.id, f.type) for f in case.files)
+    # Plain data only: the session is closed once the step returns
+    return {
+        "case_id": case_id,
+        "case_text": case_text,
+        "has_labs": bool(labs),
+        "has_images": any(file_type in IMAGING_FILE_TYPES for _, file_type in files),
+        "baseline_illnesses": (case.patient.baseline_illnesses or []) if case.patient else [],
+        # Downstream agents re-read the case; their memo entries are keyed on this
+        "fingerprint": hashlib.sha256(json.dumps([case_text, labs, files], default=str).encode("utf-8")).hexdigest()
+    }
+
+
+async def classify_domain(inputs: Dict[str, Any], db: Session, context: Dict[str, Any]) -> str:
+    classification = await domain_router.classify_domain(inputs["case_text"])
+    return classification.get("domain", "General")
+
+
+def _case_version(scope: Dict[str, Any]) -> str:
+    return scope["case"]["fingerprint"]
+
+
+def _synthesis_payload(scope: Dict[str, Any]) -> Dict[str, Any]:
+    # The Doctor moderates: specialist outputs are "expert testimony" to synthesize
+    case, spec_res = scope["case"], scope["specialist"]
+    return {
+        "case_id": case["case_id"],
+        "extracted_data": {
+            "consultation_context": f"Multi-Disciplinary Team Review ({scope['domain']})",
+            "specialist_opinion": spec_res.get("message"),
+            "lab_analysis": scope["labs"],
+            "radiology_analysis": scope["imaging"],
+            "domain_actions": spec_res.get("actions", [])
+        },
+        "baseline_illnesses": case["baseline_illnesses"]
+    }
+
+
+# Domain-Aware Multi-Agent Consultation: labs and imaging start as soon as the
+# case is loaded, the domain specialist once the domain is known, and the
+# synthesis once all three have reported.
+COMPREHENSIVE_PATIENT_ANALYSIS = Workflow(
+    name="comprehensive_patient_analysis",
+    steps=[
+        WorkflowStep("case", fn=load_case, inputs=lambda s: {"case_id": s["payload"].get("case_id")}, memoize=False),
+        WorkflowStep("domain", after=["case"], fn=classify_domain,
+                     inputs=lambda s: {"case_text": s["case"]["case_text"]}),
+        WorkflowStep("specialist", after=["case", "domain"], task="specialist_consult",
+                     inputs=lambda s: {
+                         "query": "Please provide a comprehensive domain assessment for this case.",
+                         "case_data": s["case"]["case_text"],
+                         "domain": s["domain"]
+                     }),
+        WorkflowStep("labs", after=["case"], task="analyze_labs",
+                     inputs=lambda s: {"case_id": s["case"]["case_id"]},
+                     when=lambda s: s["case"]["has_labs"], version=_case_version),
+        WorkflowStep("imaging", after=["case"], task="analyze_image",
+                     inputs=lambda s: {"case_id": s["case"]["case_id"]},
+                     when=lambda s: s["case"]["has_images"], version=_case_version),
+        WorkflowStep("synthesis", after=["case", "domain", "specialist", "labs", "imaging"], task="augment_case",
+                     inputs=_synthesis_payload, version=_case_version),
+    ],
+    output=lambda s: {
+        "status": "success",
+        "domain": s["domain"],
+        "consultation_summary": {
+            "specialist": s["specialist"],
+            "labs": s["labs"],
+            "imaging": s["imaging"]
+        },
+        "final_recommendation": s["synthesis"]
+    }
+)
+
+DEFAULT_WORKFLOWS = [COMPREHENSIVE_PATIENT_ANALYSIS]
@@ -31,6 +31,10 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
+    LLM_MAX_CONCURRENCY: int = 16 # in-flight LLM calls per worker process
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    RESPONSE_CACHE_ENABLED: bool = True
+    MODEL_TIERS: str = "gemini-2.5-flash-lite,gemini-2.5-flash,gemini-3-flash-preview,gemini-3-pro-preview" # fastest first
     
     # Feature Flags
     GOOGLE_CLOUD_PROJECT: str = "intelligent-health-ai"
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
@@ -113,6 +115,94 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # Don't expire objects after commit for better caching
 )
 
+
+def async_database_url(url) -> URL:
+    """The asyncpg / aiosqlite equivalent of a sync database URL."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def create_async_db_engine(sync_engine=None) -> AsyncEngine:
+    """
+    Async engine for the same database as the sync engine: asyncpg for
+    PostgreSQL (including Cloud SQL via the connector's async API), aiosqlite
+    for the local SQLite fallback.
+    """
+    sync_engine = sync_engine or engine
+
+    # 1. Cloud SQL via Python Connector (async API)
+    if settings.INSTANCE_CONNECTION_NAME and sync_engine.url.get_backend_name() == "postgresql":
+        from google.cloud.sql.connector import IPTypes, create_async_connector
+
+        connector = None
+
+        async def getconn():
+            nonlocal connector
+            if connector is None:
+                connector = await create_async_connector()
+            return await connector.connect_async(
+                settings.INSTANCE_CONNECTION_NAME,
+                "asyncpg",
+                user=settings.DB_USER,
+                password=settings.DB_PASS,
+                db=settings.DB_NAME,
+                ip_type=IPTypes.PUBLIC
+            )
+
+        return create_async_engine(
+            "postgresql+asyncpg://",
+            async_creator=getconn,
+            pool_size=10,
+            max_overflow=20,
+            pool_timeout=30,
+            pool_recycle=1800,
+            pool_pre_ping=True,
+        )
+
+    url = async_database_url(sync_engine.url)
+
+    # 2. Standard PostgreSQL
+    if url.get_backend_name() == "postgresql":
+        return create_async_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
+
+    # 3. SQLite (same file as the sync engine, same pragmas)
+    async_engine = create_async_engine(url, pool_pre_ping=True)
+    if url.get_backend_name() == "sqlite":
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def set_sqlite_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+    return async_engine
+
+
+_async_engine = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide async engine, created on first use (the async driver is only needed by async routes)."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+
+# Async session factory; bound to get_async_engine() when a session is opened.
+# expire_on_commit=False matters more here: expired attributes would need
+# implicit IO, which AsyncSession cannot do.
+AsyncSessionLocal = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession
+)
+
 Base = declarative_base()
 
 
@@ -134,14 +224,22 @@ def get_db():
 
 async def get_db_async():
     """
-    Async version of get_db for async endpoints.
-    Note: Still uses sync session but wrapped for async compatibility.
+    Dependency for getting an AsyncSession, so waiting on the database does
+    not block the event loop.
+
+    Usage:
+        @app.get("/items")
+        async def get_items(db: AsyncSession = Depends(get_db_async)):
+            result = await db.execute(select(Item))
+            ...
+
+    AsyncSession never lazy-loads: load relationships up front with
+    selectinload/joinedload. Sync helpers that take a Session can run
+    unchanged through `await db.run_sync(lambda session: helper(session))`,
+    which is the migration path for routes that still depend on them.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
         yield db
-    finally:
-        db.close()
 
 
 def get_pool_status() -> dict:
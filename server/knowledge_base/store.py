@@ -3,11 +3,39 @@ import usearch.index
 import numpy as np
 import json
 import uuid
+import struct
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
 import google.generativeai as genai
 from ..config import settings
+from ..utils.text_processing import content_hash
+from ..services.embedding_pipeline import embed_text
+
+# Write-ahead segment record: (usearch key, metadata length, vector dimension),
+# followed by the UTF-8 JSON metadata and the float32 vector.
+_WAL_HEADER = struct.Struct("<QII")
+
+# Number of appended records after which the segment is folded into the
+# snapshot index by a background compaction.
+WAL_COMPACT_THRESHOLD = 256
+# Compaction also waits until the segment holds this fraction of the snapshot,
+# so snapshots grow geometrically and the total rewrite work stays linear in
+# the number of records instead of quadratic.
+WAL_COMPACT_RATIO = 0.25
+
+# Zones kept open at once; the least recently used zone is dropped beyond this
+# unless a caller still holds it.
+MAX_OPEN_ZONES = 8
+
+_META_COLUMNS = ("id", "text", "source", "reliability", "content_hash", "timestamp")
 
 class DomainKnowledgeBase:
-    _instances = {}
+    _instances = OrderedDict()
+    # Every instance still referenced anywhere, including ones dropped from the LRU
+    _live = weakref.WeakValueDictionary()
+    _instances_lock = threading.Lock()
 
     def __init__(self, zone: str):
         self.zone = zone.lower()
@@ -21,111 +49,355 @@ class DomainKnowledgeBase:
             os.makedirs(self.storage_dir, exist_ok=True)
 
         self.index_path = f"{self.storage_dir}/{self.zone}.usearch"
-        self.meta_path = f"{self.storage_dir}/{self.zone}_meta.json"
-        
+        self.wal_path = f"{self.storage_dir}/{self.zone}.wal"
+        # Metadata lives in a SQLite sidecar; the JSON file is only read to migrate old zones.
+        self.db_path = f"{self.storage_dir}/{self.zone}_meta.sqlite3"
+        self.legacy_meta_path = f"{self.storage_dir}/{self.zone}_meta.json"
+
         # Embeddings config (Gemini)
         if settings.GEMINI_API_KEY:
             genai.configure(api_key=settings.GEMINI_API_KEY)
-            
-        self.metadata = {} # id -> {text, source, ...}
-        
+
         # Initialize index
         # text-embedding-004 output dimension is 768.
-        self.ndim = 768 
-        self.index = usearch.index.Index(ndim=self.ndim)
-        
+        self.ndim = 768
+        # Snapshot index, memory-mapped read-only (view mode) so pages are loaded on demand
+        self.index = None
+        # Records appended since the last snapshot: small in-memory index + exact float32 copies
+        self.delta = usearch.index.Index(ndim=self.ndim)
+        self._delta_vectors = {}
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wal_records = 0
+        self._next_key = 1
+        self._compaction_thread = None
+
         self.load()
 
     @classmethod
     def get_instance(cls, zone: str):
-        if zone not in cls._instances:
-            cls._instances[zone] = cls(zone)
-        return cls._instances[zone]
+        with cls._instances_lock:
+            kb = cls._instances.get(zone)
+            if kb is None:
+                # An evicted zone a caller is still using must be handed out again:
+                # a second instance over the same WAL and sidecar would allocate
+                # the same keys.
+                kb = cls._live.get(zone)
+                if kb is None:
+                    kb = cls(zone)
+                    cls._live[zone] = kb
+                cls._instances[zone] = kb
+            cls._instances.move_to_end(zone)
+            # Evicted zones keep their data on disk (snapshot + WAL + sidecar) and
+            # release their mappings once no caller holds a reference.
+            while len(cls._instances) > MAX_OPEN_ZONES:
+                cls._instances.popitem(last=False)
+            return kb
 
     def load(self):
+        self._open_metadata()
         try:
             if os.path.exists(self.index_path):
-                self.index.load(self.index_path)
-            if os.path.exists(self.meta_path):
-                with open(self.meta_path, 'r') as f:
-                    self.metadata = json.load(f)
+                self.index = usearch.index.Index(ndim=self.ndim)
+                self.index.view(self.index_path)
         except Exception as e:
             print(f"Vector Store Load Error ({self.zone}): {e}")
+        self._replay_wal()
+        with self._db_lock:
+            max_key = self._db.execute("SELECT MAX(key) FROM documents").fetchone()[0]
+        self._next_key = (max_key or 0) + 1
+
+    def _open_metadata(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                key INTEGER PRIMARY KEY,
+                id TEXT,
+                text TEXT NOT NULL,
+                source TEXT,
+                reliability REAL,
+                content_hash TEXT NOT NULL,
+                timestamp TEXT
+            )
+        """)
+        self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash)")
+        self._db.commit()
+
+        empty = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+        if empty and os.path.exists(self.legacy_meta_path):
+            self._import_legacy_metadata()
+
+    def _import_legacy_metadata(self):
+        """One-off migration of a <zone>_meta.json dict into the sidecar."""
+        with open(self.legacy_meta_path, 'r') as f:
+            legacy = json.load(f)
+        rows = [self._row(int(key), meta) for key, meta in legacy.items()]
+        self._db.executemany(
+            "INSERT OR IGNORE INTO documents (key, id, text, source, reliability, content_hash, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._db.commit()
+        print(f"Vector Store ({self.zone}): migrated {len(rows)} metadata records to SQLite")
+
+    @staticmethod
+    def _row(key: int, meta: dict) -> tuple:
+        return (
+            key,
+            meta.get("id"),
+            meta.get("text", ""),
+            meta.get("source"),
+            meta.get("reliability"),
+            meta.get("content_hash") or content_hash(meta.get("text", "")),
+            meta.get("timestamp"),
+        )
+
+    def _insert_metadata(self, rows: list):
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO documents (key, id, text, source, reliability, content_hash, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._db.commit()
+
+    def has_content(self, digest: str) -> bool:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT 1 FROM documents WHERE content_hash = ? LIMIT 1", (digest,)
+            ).fetchone() is not None
+
+    def get_documents(self, keys: list) -> dict:
+        """Fetches metadata for usearch keys: {key: {id, text, source, ...}}."""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT key, {', '.join(_META_COLUMNS)} FROM documents WHERE key IN ({placeholders})",
+                [int(k) for k in keys]
+            ).fetchall()
+        return {row[0]: dict(zip(_META_COLUMNS, row[1:])) for row in rows}
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _in_snapshot(self, key: int) -> bool:
+        return self.index is not None and self.index.contains(key)
+
+    def _replay_wal(self):
+        """
+        Re-applies records appended since the last snapshot.
+        A torn record at the tail (crash mid-write) is truncated away.
+        """
+        if not os.path.exists(self.wal_path):
+            return
+        replayed = 0
+        rows = []
+        try:
+            with open(self.wal_path, 'r+b') as f:
+                good_offset = 0
+                while True:
+                    header = f.read(_WAL_HEADER.size)
+                    if len(header) < _WAL_HEADER.size:
+                        break
+                    key, meta_len, ndim = _WAL_HEADER.unpack(header)
+                    meta_bytes = f.read(meta_len)
+                    vec_bytes = f.read(ndim * 4)
+                    if len(meta_bytes) < meta_len or len(vec_bytes) < ndim * 4:
+                        break
+                    try:
+                        meta = json.loads(meta_bytes.decode("utf-8"))
+                    except ValueError:
+                        break
+                    good_offset = f.tell()
+                    replayed += 1
+                    # Replay is idempotent: the snapshot may already contain the record
+                    # if we crashed between saving it and truncating the segment.
+                    if not self._in_snapshot(key) and key not in self._delta_vectors:
+                        vector = np.frombuffer(vec_bytes, dtype=np.float32).copy()
+                        self.delta.add(key, vector)
+                        self._delta_vectors[key] = vector
+                    rows.append(self._row(key, meta))
+                if f.seek(0, os.SEEK_END) != good_offset:
+                    print(f"Vector Store WAL ({self.zone}): truncating torn tail at byte {good_offset}")
+                    f.truncate(good_offset)
+            self._insert_metadata(rows)
+        except Exception as e:
+            print(f"Vector Store WAL Replay Error ({self.zone}): {e}")
+        self._wal_records = replayed
+
+    def _append_wal(self, key: int, meta: dict, vector: np.ndarray):
+        """Appends a single record to the write-ahead segment and fsyncs it."""
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        vec_bytes = np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+        with open(self.wal_path, 'ab') as f:
+            f.write(_WAL_HEADER.pack(key, len(meta_bytes), len(vec_bytes) // 4))
+            f.write(meta_bytes)
+            f.write(vec_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        self._wal_records += 1
 
-    def save(self):
+    def compact(self):
         """
-        Saves the index and metadata to disk.
-        TODO: For high concurrency, consider append-only logs or DB storage.
+        Folds the write-ahead segment into a fresh snapshot.
+        The merged index is built and written from a copy of the delta taken up
+        front, without holding the zone lock, so adds and searches carry on
+        meanwhile. The lock is only taken again to swap the snapshot in and drop
+        the merged records from the delta and the segment; records added during
+        the rebuild stay in both.
+        """
+        with self._compact_lock:
+            with self._lock:
+                if self._wal_records == 0:
+                    return
+                merged = dict(self._delta_vectors)
+                merged_records = self._wal_records
+                wal_offset = os.path.getsize(self.wal_path) if os.path.exists(self.wal_path) else 0
+
+            snapshot = self._write_snapshot(merged)
+            if snapshot is None:
+                return
+
+            with self._lock:
+                remaining = {key: vector for key, vector in self._delta_vectors.items() if key not in merged}
+                delta = usearch.index.Index(ndim=self.ndim)
+                if remaining:
+                    delta.add(np.array(list(remaining), dtype=np.uint64), np.stack(list(remaining.values())))
+                # Swap the snapshot in before the delta; search() de-duplicates keys
+                self.index = snapshot
+                self.delta = delta
+                self._delta_vectors = remaining
+                self._drop_wal_prefix(wal_offset)
+                self._wal_records -= merged_records
+
+    def _maybe_compact(self):
+        snapshot_size = len(self.index) if self.index is not None else 0
+        if self._wal_records < max(WAL_COMPACT_THRESHOLD, WAL_COMPACT_RATIO * snapshot_size):
+            return
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self.compact, name=f"kb-compact-{self.zone}", daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _write_snapshot(self, merged: dict):
+        """
+        Writes a new snapshot file (previous snapshot + `merged` delta vectors)
+        and returns it memory-mapped, or None on failure. Metadata is already
+        durable in the sidecar; this is called from compact().
         """
         try:
-            self.index.save(self.index_path)
-            # Atomic write for metadata to avoid corruption
-            temp_path = self.meta_path + ".tmp"
-            with open(temp_path, 'w') as f:
-                json.dump(self.metadata, f)
-            os.replace(temp_path, self.meta_path)
+            full = usearch.index.Index(ndim=self.ndim)
+            if os.path.exists(self.index_path):
+                full.load(self.index_path)
+            if merged:
+                keys = np.array(list(merged), dtype=np.uint64)
+                full.add(keys, np.stack(list(merged.values())))
+
+            temp_path = self.index_path + ".tmp"
+            full.save(temp_path)
+            del full
+            # Readers keep the old mapping (and inode) until the swap
+            os.replace(temp_path, self.index_path)
+
+            snapshot = usearch.index.Index(ndim=self.ndim)
+            snapshot.view(self.index_path)
+            return snapshot
         except Exception as e:
             print(f"Vector Store Save Error: {e}")
+            return None
+
+    def _drop_wal_prefix(self, offset: int):
+        """Removes the first `offset` bytes (records now in the snapshot) from the segment."""
+        if not os.path.exists(self.wal_path):
+            return
+        with open(self.wal_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        temp_path = self.wal_path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.wal_path)
 
     def get_embedding(self, text: str, mode="retrieval_document") -> np.ndarray:
         # Use Gemini to get embedding
         # Fallback to random if no key (dev mode)
         if not settings.GEMINI_API_KEY:
              return np.random.rand(self.ndim).astype(np.float32)
-             
-        # Switch to text-embedding-004
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text,
+
+        # text-embedding-004 via the shared pipeline (cached per model/task/text)
+        vector = embed_text(
+            text,
             task_type=mode,
             title="Medical Knowledge" if mode == "retrieval_document" else None
         )
-        return np.array(result['embedding'], dtype=np.float32)
+        if not vector:
+            raise RuntimeError(f"Embedding failed for {self.zone} knowledge base")
+        return np.array(vector, dtype=np.float32)
 
     def add_document(self, text: str, source: str, reliability: float = 1.0):
         # Generate UUID for ID
         doc_id = str(uuid.uuid4())
-        
-        # Check if already exists (content check)
-        for m in self.metadata.values():
-            if m['text'] == text:
-                return # Skip duplicate
+
+        # Check if already exists (content check) before paying for an embedding
+        digest = content_hash(text)
+        if self.has_content(digest):
+            return # Skip duplicate
 
         embedding = self.get_embedding(text)
-        # usearch requires integer keys for add, but we want UUIDs.
-        # We will map int -> UUID in metadata.
-        # Actually, for simplicity in this file-based version, let's keep using a hash or incrementing int for the search index
-        # but store the full UUID in metadata as the primary key.
-        # To keep it simple and compatible with previous code which used len(), let's use a stable hash of the UUID or just a robust counter.
-        # Better: use the current length + random buffer if needed, but since it's in-memory dict, len() is fine for the INT key.
-        
-        internal_id = len(self.metadata) + 1
-        
-        self.index.add(internal_id, embedding)
-        
-        self.metadata[str(internal_id)] = {
-            "id": doc_id,
-            "text": text,
-            "source": source,
-            "reliability": reliability,
-            "timestamp": str(uuid.uuid4())
-        }
-        self.save()
+        # usearch requires integer keys; the UUID is kept in metadata as the public id.
+
+        with self._lock:
+            if self.has_content(digest):
+                return # Added concurrently while we were embedding
+            internal_id = self._next_key
+            self._next_key += 1
+            meta = {
+                "id": doc_id,
+                "text": text,
+                "source": source,
+                "reliability": reliability,
+                "content_hash": digest,
+                "timestamp": str(uuid.uuid4())
+            }
+
+            # Only the new record hits the disk; the snapshot is rebuilt by compaction.
+            self._append_wal(internal_id, meta, embedding)
+            self._insert_metadata([self._row(internal_id, meta)])
+            self.delta.add(internal_id, embedding)
+            self._delta_vectors[internal_id] = embedding
+        self._maybe_compact()
 
     def search(self, query: str, limit: int = 3) -> list:
         if not settings.GEMINI_API_KEY:
              return [{"text": "RAG Unavailable (No API Key)", "source": "System", "reliability": 0}]
-             
+
         query_embedding = self.get_embedding(query, mode="retrieval_query")
-        
-        matches = self.index.search(query_embedding, limit)
-        
-        results = []
-        # matches.keys is a numpy array of IDs
-        for key in matches.keys:
-            str_key = str(key)
-            if str_key in self.metadata:
-                item = self.metadata[str_key]
-                results.append(item)
-                
-        return results
+
+        # Search the mapped snapshot and the in-memory delta, then merge by distance
+        candidates = []
+        for index in (self.index, self.delta):
+            if index is not None and len(index) > 0:
+                matches = index.search(query_embedding, min(limit, len(index)))
+                candidates.extend(zip(matches.keys.tolist(), matches.distances.tolist()))
+        candidates.sort(key=lambda c: c[1])
+
+        keys = []
+        for key, _ in candidates:
+            if key not in keys:
+                keys.append(key)
+            if len(keys) >= limit:
+                break
+
+        documents = self.get_documents(keys)
+        return [documents[key] for key in keys if key in documents]
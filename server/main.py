@@ -106,6 +106,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"], # keyset pagination cursor on list endpoints
 )
 
 # Add Rate Limiting Middleware
@@ -179,6 +180,13 @@ async def startup_event():
         db.close()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write any audit entries still queued by the batched writer
+    from .services.audit_writer import audit_writer
+    audit_writer.flush()
+
+
 # Include Routers via init_app
 init_app(app)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean, JSON, Date, DateTime, Index
 import sqlalchemy
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -306,12 +306,15 @@ class SystemConfig(Base):
 
 class SystemLog(Base):
     __tablename__ = "system_logs"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_system_logs_event_type_timestamp", "event_type", "timestamp"),
+        {"extend_existing": True}
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     event_type = Column(String) # 'ai_query', 'login', 'error'
     user_id = Column(String, nullable=True)
     details = Column(JSON, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
 class CostEstimate(Base):
     __tablename__ = "cost_estimates"
@@ -359,7 +362,10 @@ class AIFeedback(Base):
 
 class MedicalRecord(Base):
     __tablename__ = "medical_records"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_medical_records_uploader_type_created_at", "uploader_id", "type", "created_at"),
+        {"extend_existing": True}
+    )
     
     id = Column(String, primary_key=True)
     patient_id = Column(String, ForeignKey("patients.id"))
@@ -470,7 +476,10 @@ class HealthIntegration(Base):
 
 class HealthData(Base):
     __tablename__ = "health_data"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_health_data_user_type_source_timestamp", "user_id", "data_type", "source_timestamp"),
+        {"extend_existing": True}
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String, ForeignKey("users.id"))
@@ -734,7 +743,10 @@ class Appointment(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_notifications_user_read_created_at", "user_id", "is_read", "created_at"),
+        {"extend_existing": True}
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"))
@@ -823,7 +835,10 @@ class Consultation(Base):
 
 class VitalReading(Base):
     __tablename__ = "vital_readings"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_vital_readings_patient_type_recorded_at", "patient_id", "type", "recorded_at"),
+        {"extend_existing": True}
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id"))
@@ -925,7 +940,10 @@ class EmergencyProfile(Base):
 
 class HealthEvent(Base):
     __tablename__ = "health_events"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("ix_health_events_patient_event_date", "patient_id", "event_date"),
+        {"extend_existing": True}
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id"))
@@ -1034,3 +1052,40 @@ class ReferralCode(Base):
     
     owner = relationship("User", backref="referral_codes_owned")
 
+class PatientContextSnapshot(Base):
+    """
+    Materialised prompt context for one patient (profile, medications, recent
+    records, latest vitals and daily vitals buckets). Kept current
+    incrementally by services/patient_context.py as the source rows change.
+    """
+    __tablename__ = "patient_context_snapshots"
+    __table_args__ = {"extend_existing": True}
+
+    patient_id = Column(String, ForeignKey("patients.id"), primary_key=True)
+    user_id = Column(String, index=True, nullable=True)
+    profile = Column(JSON, default={})
+    medications = Column(JSON, default=[]) # [{id, name, dosage, frequency}]
+    records = Column(JSON, default=[]) # most recent records, oldest first: [{id, created_at, type, title, ai_summary}]
+    vitals_latest = Column(JSON, default={}) # {data_type: {value, unit, at}}
+    vitals_daily = Column(JSON, default={}) # {data_type: {"YYYY-MM-DD": [sum, count]}}
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class StatsRollup(Base):
+    """
+    Daily counters behind the admin dashboard, refreshed by the scheduler
+    (services/stats_rollup.py). dimension "event_type" counts the SystemLog
+    rows written on `day`; "record_type", "case_status" and "total" are
+    snapshots of the current counts as of the refresh on `day`.
+    """
+    __tablename__ = "stats_rollups"
+    __table_args__ = {"extend_existing": True}
+
+    day = Column(Date, primary_key=True)
+    dimension = Column(String, primary_key=True) # 'event_type', 'record_type', 'case_status', 'total'
+    key = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# Registers the mapper events that keep PatientContextSnapshot rows current;
+# imported here so every writer of the source tables has them.
+from .services import patient_context as _patient_context # noqa: E402,F401
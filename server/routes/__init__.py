@@ -68,3 +68,15 @@ def init_app(app):
 
     from .knowledge import router as knowledge_router
     app.include_router(knowledge_router) # Medical knowledge & Master Doctor - prefix defined in router
+
+    from .vitals import router as vitals_router
+    app.include_router(vitals_router) # Prefix defined in router
+
+    from .notifications import router as notifications_router
+    app.include_router(notifications_router, prefix="/api")
+
+    from .appointments import router as appointments_router
+    app.include_router(appointments_router, prefix="/api")
+
+    from .timeline import router as timeline_router
+    app.include_router(timeline_router) # Prefix defined in router
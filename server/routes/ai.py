@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Body, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Body, Depends, UploadFile, File, Form, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
 import shutil
 import uuid
+from contextlib import aclosing
 from datetime import datetime
 import json
 import base64
+import hashlib
 # Import the legacy SDK
 import google.generativeai as genai
 from sqlalchemy.orm import Session
@@ -15,6 +17,12 @@ import server.models as models
 from ..models import SystemConfig, Case as CaseModel, AIFeedback, MedicalRecord, Patient as PatientModel, HealthData
 # SystemLog and LearningLog accessed via models.*
 from server.services.agent_service import agent_service
+from server.services.llm_client import llm_client
+from server.agents.slm_orchestrator import slm_orchestrator
+from server.services.response_cache import response_cache
+from server.services.single_flight import single_flight
+from server.services.patient_context import patient_context
+from ..utils.sse import sse_event, sse_response
 from ..database import get_db
 
 from ..routes.auth import get_current_user
@@ -140,11 +148,30 @@ def log_ai_event(db: Session, event_type: str, user_id: str, details: Dict[str,
     except Exception as e:
         print(f"Log Error: {e}")
 
-async def get_active_model_name(db: Session):
+def select_model(endpoint: str, query: str = "") -> str:
+    # DEFAULT_MODEL unless it is over the endpoint's latency budget, failing or rate limited
+    return slm_orchestrator.select_model(query, endpoint=endpoint, preferred=DEFAULT_MODEL)
+
+async def get_active_model_name(db: Session, endpoint: str = "chat"):
     config = db.query(SystemConfig).filter(SystemConfig.key == "features").first()
     if config and config.value.get("medLM"):
         return MEDLM_MODEL
-    return DEFAULT_MODEL
+    return select_model(endpoint)
+
+def case_version(case: CaseModel) -> str:
+    # Changes whenever a field the AI endpoints read is edited
+    fields = [case.complaint, case.history, case.findings, case.diagnosis]
+    return hashlib.sha1(json.dumps(fields, default=str).encode("utf-8")).hexdigest()
+
+async def coalesced(endpoint: str, case: CaseModel, current_user: User, generate):
+    """
+    Concurrent requests from the same user for the same endpoint and case
+    state (e.g. a double-clicked button or a retried request) share one
+    in-flight generation. The prompts carry the caller's system instruction,
+    which includes their own context, so flights are never shared across users.
+    """
+    key = (endpoint, case.id, case_version(case), current_user.id, current_user.role)
+    return await single_flight.do(key, generate)
 
 def get_model(model_name: str):
     # GenerativeModel wrapper
@@ -193,8 +220,17 @@ async def get_case_insights(case: Case, current_user: User = Depends(get_current
     # Given the previous code used `case` object from argument, using ID is a slight regression if unsaved.
     # However, `DoctorAgent` is backend-centric.
     # Let's pass the ID. The frontend usually saves or we assume it's synced.
-    
-    return await orchestrator.dispatch("clinical_summary", {"case_id": case.id}, context, db)
+
+    stored = db.query(CaseModel).filter(CaseModel.id == case.id).first()
+    if not stored:
+        return await orchestrator.dispatch("clinical_summary", {"case_id": case.id}, context, db)
+
+    # Joining callers did not go through dispatch's consent check
+    denied = orchestrator.consent_error("clinical_summary", context, db)
+    if denied:
+        return denied
+    return await coalesced("insights", stored, current_user,
+                           lambda: orchestrator.dispatch("clinical_summary", {"case_id": case.id}, context, db))
 
 @router.get("/feedback/history/{case_id}")
 async def get_feedback_history(case_id: str, db: Session = Depends(get_db)):
@@ -203,8 +239,27 @@ async def get_feedback_history(case_id: str, db: Session = Depends(get_db)):
 
 # ... (unrated endpoint is fine) ...
 
+async def _stream_chat(chat, message: str):
+    parts = []
+    try:
+        # aclosing: a client disconnect closes this generator, which must close the upstream stream too
+        async with aclosing(llm_client.stream_message(chat, message)) as tokens:
+            async for text in tokens:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+    except Exception as e:
+        print(f"Chat Stream Error: {e}")
+        yield sse_event("error", {"error": f"AI Service Error: {str(e)}"})
+        return
+    yield sse_event("done", {"response": "".join(parts)})
+
 @router.post("/chat")
-async def chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), http_request: Request = None):
+    """
+    Chat with the user's agent. With request.stream the answer is sent as
+    server-sent events: 'token' ({"text"}) per chunk, then 'done' ({"response"})
+    or 'error' ({"error"}). A client disconnect cancels the generation.
+    """
     if not API_KEY:
         return {"response": "AI Service Unavailable. Please configure GEMINI_API_KEY in your environment."}
 
@@ -235,14 +290,18 @@ async def chat(request: ChatRequest, current_user: User = Depends(get_current_us
         # We ensure model_name defaults to meaningful Gemini model if user tries to pass others
         final_model = model_name
         if "gpt" in model_name.lower() or "claude" in model_name.lower():
-            final_model = DEFAULT_MODEL
+            final_model = select_model("chat", request.message)
         if final_model == "gemini-1.5-flash": # Catch old default
-             final_model = DEFAULT_MODEL
+             final_model = select_model("chat", request.message)
             
         chat_model = genai.GenerativeModel(final_model, system_instruction=system_instruction)
         chat = chat_model.start_chat(history=start_chat_history)
+
+        if request.stream:
+            log_ai_event(db, "ai_query", request.userId, {"endpoint": "chat", "model": final_model, "provider": "google", "stream": True})
+            return sse_response(_stream_chat(chat, request.message), http_request)
         
-        response = chat.send_message(request.message)
+        response = await llm_client.send_message(chat, request.message)
         log_ai_event(db, "ai_query", request.userId, {"endpoint": "chat", "model": final_model, "provider": "google"})
         return {"response": response.text}
     except Exception as e:
@@ -250,14 +309,14 @@ async def chat(request: ChatRequest, current_user: User = Depends(get_current_us
         return {"response": f"AI Service Error: {str(e)}"}
 
 @router.post("/general_chat")
-async def general_chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def general_chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), http_request: Request = None):
     """
     Dedicated endpoint for general health chat (Patient Portal).
     """
     # Simply reuse the main chat logic for now, or customize prompt
     # Force context or prompt customization if needed
     request.context = "You are a helpful general health assistant. Do not provide specific medical advice or diagnosis. Advise users to consult a doctor."
-    return await chat(request, current_user, db)
+    return await chat(request, current_user, db, http_request)
 
 
 
@@ -292,6 +351,8 @@ class WorkflowRequest(BaseModel):
     workflow_name: str
     case_id: str
     payload: Optional[Dict[str, Any]] = {}
+    rerun: Optional[List[str]] = None # steps to recompute, with everything downstream
+    previous_run: Optional[str] = None # "workflow.run_id" of an earlier run of this workflow and case
 
 @router.post("/workflow")
 async def execute_workflow(request: WorkflowRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -309,7 +370,8 @@ async def execute_workflow(request: WorkflowRequest, current_user: User = Depend
     payload = request.payload or {}
     payload["case_id"] = request.case_id
     
-    return await orchestrator.execute_workflow(request.workflow_name, payload, context, db)
+    return await orchestrator.execute_workflow(request.workflow_name, payload, context, db,
+                                               rerun=request.rerun, previous_run=request.previous_run)
 
 
 @router.post("/generate_daily_questions")
@@ -324,8 +386,8 @@ async def generate_daily_questions(payload: Dict[str, Any], current_user: User =
     """
     
     try:
-        model = genai.GenerativeModel(DEFAULT_MODEL)
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        model = genai.GenerativeModel(select_model("daily_questions"))
+        response = await llm_client.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
         return json.loads(response.text)
     except Exception as e:
         return {"questions": ["How are you feeling today?", "Did you take your medications?", "Any new symptoms?"]}
@@ -403,9 +465,14 @@ async def search_icd10(request: AnalysisRequest, current_user: User = Depends(ge
     try:
         model = genai.GenerativeModel("gemini-1.5-flash") # Keep flash for speed on search
         prompt = f"Find top 5 ICD-10 codes for '{request.text}'. Return JSON list of {{code: string, description: string}}."
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+
+        async def search():
+            response = await llm_client.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
+            return json.loads(response.text)
+
+        codes = await response_cache.get_or_generate("search_icd10", model.model_name, prompt, search)
         log_ai_event(db, "ai_query", current_user.id, {"endpoint": "search_icd10"})
-        return json.loads(response.text)
+        return codes
     except Exception as e:
         print(f"ICD10 Search Error: {e}")
         return []
@@ -422,10 +489,13 @@ async def generate_patient_report(case_id: str, current_user: User = Depends(get
     if not API_KEY:
         return {"report": "AI Service Unavailable"}
         
-    case = db.query(Case).filter(Case.id == case_id).first()
+    case = db.query(CaseModel).filter(CaseModel.id == case_id).first()
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
-        
+
+    return await coalesced("report/patient", case, current_user, lambda: _patient_report(case, current_user, db))
+
+async def _patient_report(case: CaseModel, current_user: User, db: Session):
     system_instruction = agent_service.get_system_instruction(current_user.id, current_user.role, db)
     system_instruction += "\nYou are a compassionate doctor explaining results to a patient. Use simple language. Avoid medical jargon."
     
@@ -443,8 +513,8 @@ async def generate_patient_report(case_id: str, current_user: User = Depends(get
     """
     
     try:
-        model = genai.GenerativeModel(DEFAULT_MODEL, system_instruction=system_instruction)
-        response = model.generate_content(prompt)
+        model = genai.GenerativeModel(select_model("patient_report"), system_instruction=system_instruction)
+        response = await llm_client.generate(model, prompt)
         return {"report": response.text}
     except Exception as e:
         print(f"Patient Report Error: {e}")
@@ -463,7 +533,14 @@ async def generate_clinical_plan(case_id: str, current_user: User = Depends(get_
         "user_role": current_user.role
     }
 
-    return await orchestrator.dispatch("treatment_plan", {"case_id": case_id}, context, db)
+    case = db.query(CaseModel).filter(CaseModel.id == case_id).first()
+    if not case:
+        return await orchestrator.dispatch("treatment_plan", {"case_id": case_id}, context, db)
+
+    denied = orchestrator.consent_error("treatment_plan", context, db)
+    if denied:
+        return denied
+    return await coalesced("plan", case, current_user, lambda: orchestrator.dispatch("treatment_plan", {"case_id": case_id}, context, db))
 
 @router.post("/augment_case", response_model=List[AIContextualSuggestion])
 async def augment_case(request: AugmentRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -490,15 +567,16 @@ async def extract_case(request: AnalysisRequest, current_user: User = Depends(ge
     system_instruction = agent_service.get_system_instruction(current_user.id, current_user.role, db)
     system_instruction += "\nYou are a medical data extraction specialist. Output strictly JSON."
     
-    model = get_model(await get_active_model_name(db))
+    model = get_model(await get_active_model_name(db, "extract_case"))
     # Note: If get_model returns genai.GenerativeModel, we can't easily change system_instruction locally without re-init 
     # unless we pass it to constructor. get_model creates new instance.
     # We should update get_model or just create instance here.
     # For now, let's just create instance to be safe and support instructions.
-    model = genai.GenerativeModel(await get_active_model_name(db), system_instruction=system_instruction)
+    model = genai.GenerativeModel(await get_active_model_name(db, "extract_case"), system_instruction=system_instruction)
 
     try:
-        response = model.generate_content(
+        response = await llm_client.generate(
+            model,
             f'Extract medical case data from: "{request.text}". Return JSON matching schema.',
             generation_config={"response_mime_type": "application/json"}
         )
@@ -515,7 +593,8 @@ async def analyze_symptoms(request: AnalysisRequest, current_user: User = Depend
     
     try:
         model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=system_instruction)
-        response = model.generate_content(
+        response = await llm_client.generate(
+            model,
             f'Analyze symptoms: "{request.text}". Return JSON array of objects with "condition", "confidence" (number), "explanation".',
             generation_config={"response_mime_type": "application/json"}
         )
@@ -623,7 +702,7 @@ async def _analyze_content(content: bytes, mime_type: str, prompt: Optional[str]
         # Enforce JSON structure in prompt
         final_prompt += " Return strictly valid JSON."
         
-        response = model.generate_content([final_prompt, file_part], generation_config={"response_mime_type": "application/json"})
+        response = await llm_client.generate(model, [final_prompt, file_part], generation_config={"response_mime_type": "application/json"})
         
         log_ai_event(db, "ai_query", current_user.id, {"endpoint": "analyze_content", "file_type": mime_type})
         
@@ -700,7 +779,7 @@ async def transcribe_audio(file: UploadFile = File(...), current_user: User = De
             }
             prompt = "Transcribe this audio file accurately. Return only the transcript."
             
-            response = model.generate_content([prompt, audio_part])
+            response = await llm_client.generate(model, [prompt, audio_part])
             transcript = response.text
             
             log_ai_event(db, "ai_query", current_user.id, {"endpoint": "transcribe", "service": "gemini"})
@@ -744,7 +823,7 @@ async def generate_daily_questions(request: DailyCheckRequest, current_user: Use
     prompt = f"Based on this patient profile: '{request.profile_summary}', generate 3 short, specific daily health check questions to ask them today to monitor their condition. Return JSON with key 'questions' which is a list of strings."
     try:
         model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=system_instruction)
-        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+        response = await llm_client.generate(model, prompt, generation_config={"response_mime_type": "application/json"})
         log_ai_event(db, "ai_query", current_user.id, {"endpoint": "generate_daily_questions"})
         return json.loads(response.text)
     except Exception as e:
@@ -993,59 +1072,18 @@ async def analyze_patient_record(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/patient/chat")
-async def patient_chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # 1. Fetch records & Profile & Health Data
-    records = []
-    profile_text = ""
-    health_data_text = ""
-    
-    if current_user.patient_profile:
-        # A. Records
-        records = db.query(MedicalRecord).filter(MedicalRecord.patient_id == current_user.patient_profile.id).all()
-        
-        # B. Profile (Height/Weight/Conditions)
-        p = current_user.patient_profile
-        profile_text = f"""
-        Patient Profile:
-        - Name: {p.name}
-        - Age: {p.age} | Sex: {p.sex} | Blood: {p.blood_type}
-        - Height: {p.height} cm | Weight: {p.weight} kg
-        - Conditions: {', '.join(p.baseline_illnesses or [])}
-        - Allergies: {', '.join(p.allergies or [])}
-        - Medications: {', '.join([m.name for m in p.medications] if p.medications else [])}
-        """
-        
-        # C. Recent Health Data (Integrations)
-        # Fetch last 3 days
-        from datetime import timedelta
-        since = datetime.utcnow() - timedelta(days=3)
-        h_data = db.query(HealthData).filter(
-            HealthData.user_id == current_user.id,
-            HealthData.source_timestamp >= since
-        ).order_by(HealthData.data_type, HealthData.source_timestamp.desc()).all()
-        
-        if h_data:
-            health_data_text = "\nRecent Health Metrics (Integrations):\n"
-            # simple grouping to show latest of each type or avg
-            seen_types = set()
-            for hd in h_data:
-                if hd.data_type not in seen_types:
-                    health_data_text += f"- {hd.data_type}: {hd.value} {hd.unit} ({hd.source_timestamp.strftime('%Y-%m-%d %H:%M')})\n"
-                    seen_types.add(hd.data_type)
-    
+async def patient_chat(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db), http_request: Request = None):
+    # 1. Profile, medications, recent vitals and records: one precomputed snapshot row
+    snapshot = patient_context.for_user(db, current_user.id)
+
     # 2. Build Context
-    context_str = profile_text + health_data_text + "\nMedical Records:\n"
-    if records:
-        for r in records[-10:]: # limit to last 10
-            context_str += f"- [{r.created_at.strftime('%Y-%m-%d')}] {r.type} - {r.title}: {r.ai_summary}\n"
-    else:
-        context_str += "No uploaded records available."
+    context_str = patient_context.chat_context(snapshot)
 
     # 3. Inject into request
     request.context = context_str + (("\n" + request.context) if request.context else "")
     
     # 4. Call standard chat
-    return await chat(request, current_user, db)
+    return await chat(request, current_user, db, http_request)
 
 @router.get("/report/comprehensive/{patient_id}")
 async def generate_comprehensive_report(patient_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -1064,48 +1102,32 @@ async def generate_comprehensive_report(patient_id: str, current_user: User = De
     if not patient:
          raise HTTPException(status_code=404, detail="Patient not found")
          
-    # 1. Gather Context
-    # Meds
-    meds_list = ", ".join([f"{m.name} ({m.dosage}, {m.frequency})" for m in patient.medications]) if patient.medications else "None"
-    
-    # Conditions
-    conditions = ", ".join(patient.baseline_illnesses or [])
-    
+    # 1. Gather Context (precomputed snapshot: meds, conditions, vitals buckets, recent records)
+    snapshot = patient_context.get(db, patient.id)
+    meds_list = ", ".join([f"{m['name']} ({m['dosage']}, {m['frequency']})" for m in snapshot.medications]) if snapshot.medications else "None"
+    conditions = ", ".join(snapshot.profile.get("baseline_illnesses") or [])
+
     # Health Data (Last 7 Days)
-    from datetime import timedelta
-    since = datetime.utcnow() - timedelta(days=7)
-    h_data = db.query(HealthData).filter(
-        HealthData.user_id == patient.user_id,
-        HealthData.source_timestamp >= since
-    ).all()
-    
-    vitals_summary = ""
-    if h_data:
-        # Simple aggregation: avg heart rate, total steps (avg/day), latest weight
-        steps = [d.value for d in h_data if d.data_type == 'steps']
-        hr = [d.value for d in h_data if d.data_type == 'heart_rate']
-        weights = [d.value for d in h_data if d.data_type == 'weight']
-        
-        avg_steps = sum(steps)/len(steps) if steps else 0
-        avg_hr = sum(hr)/len(hr) if hr else 0
-        latest_weight = weights[0] if weights else (patient.weight or 0)
-        
+    avg_steps = patient_context.vitals_average(snapshot, "steps", 7)
+    avg_hr = patient_context.vitals_average(snapshot, "heart_rate", 7)
+    weight = patient_context.recent_vitals(snapshot, 7).get("weight")
+    if avg_steps is not None or avg_hr is not None or weight:
+        latest_weight = weight["value"] if weight else (patient.weight or 0)
         vitals_summary = f"""
-        - Avg Daily Steps (7d): {int(avg_steps)}
-        - Avg Heart Rate (7d): {int(avg_hr)} bpm
+        - Avg Daily Steps (7d): {int(avg_steps or 0)}
+        - Avg Heart Rate (7d): {int(avg_hr or 0)} bpm
         - Latest Weight: {latest_weight} kg (change vs profile: {latest_weight - (patient.weight or 0):.1f}kg)
         """
     else:
         vitals_summary = "No recent wearable data found."
 
     # Labs/Records
-    records = db.query(MedicalRecord).filter(MedicalRecord.patient_id == patient_id).order_by(MedicalRecord.created_at.desc()).limit(5).all()
-    recent_labs = "\n".join([f"- {r.created_at.strftime('%Y-%m-%d')} [{r.type}]: {r.title} ({r.ai_summary})" for r in records])
+    recent_labs = "\n".join([f"- {(r['created_at'] or '')[:10]} [{r['type']}]: {r['title']} ({r['ai_summary']})" for r in patient_context.recent_records(snapshot, 5)])
 
     prompt = f"""
     Generate a Comprehensive Clinical Status Report for this patient.
     
-    PATIENT: {patient.name} ({patient.sex}, Age: {patient.age})
+    PATIENT: {patient.name} ({patient.sex}, DOB: {patient.dob})
     Biometrics: Height {patient.height}cm, Weight {patient.weight}kg
     
     CLINICAL CONTEXT:
@@ -1130,8 +1152,8 @@ async def generate_comprehensive_report(patient_id: str, current_user: User = De
     
     try:
         system_instruction = agent_service.get_system_instruction(current_user.id, current_user.role, db)
-        model = genai.GenerativeModel(DEFAULT_MODEL, system_instruction=system_instruction)
-        response = model.generate_content(prompt)
+        model = genai.GenerativeModel(select_model("comprehensive_report"), system_instruction=system_instruction)
+        response = await llm_client.generate(model, prompt)
         return {"report": response.text}
     except Exception as e:
         print(f"Comprehensive Report Error: {e}")
@@ -1165,6 +1187,8 @@ async def execute_agent_task(request: AgentTaskRequest, current_user: User = Dep
 class AgentWorkflowRequest(BaseModel):
     workflow: str
     payload: Dict[str, Any] = {}
+    rerun: Optional[List[str]] = None
+    previous_run: Optional[str] = None
 
 @router.post("/agent_workflow")
 async def execute_agent_workflow(request: AgentWorkflowRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -1175,7 +1199,8 @@ async def execute_agent_workflow(request: AgentWorkflowRequest, current_user: Us
         from ..agents.orchestrator import orchestrator
         context = {"user_id": current_user.id}
         
-        result = await orchestrator.execute_workflow(request.workflow, request.payload, context, db)
+        result = await orchestrator.execute_workflow(request.workflow, request.payload, context, db,
+                                                     rerun=request.rerun, previous_run=request.previous_run)
         return result
     except Exception as e:
         print(f"Workflow Error: {e}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -8,6 +8,7 @@ from ..database import get_db
 from ..models import User, Patient, Appointment, Notification
 from ..schemas import AppointmentCreate, AppointmentUpdate, AppointmentSchema
 from .auth import get_current_user
+from ..utils.pagination import Keyset, set_next_cursor
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
@@ -24,15 +25,20 @@ def create_notification(db: Session, user_id: str, type: str, title: str, messag
     db.add(notif)
     return notif
 
+APPOINTMENTS_KEYSET = Keyset(Appointment.scheduled_at, Appointment.id)
+
 @router.get("/", response_model=List[AppointmentSchema])
 async def get_appointments(
+    response: Response,
     status: Optional[str] = Query(None),
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=500),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get appointments filtered by user role"""
+    """Get appointments filtered by user role, latest first; the next page's cursor is in the X-Next-Cursor header"""
     query = db.query(Appointment)
     
     # Filter by role
@@ -54,7 +60,9 @@ async def get_appointments(
     if to_date:
         query = query.filter(Appointment.scheduled_at <= datetime.fromisoformat(to_date))
     
-    appointments = query.order_by(Appointment.scheduled_at.desc()).all()
+    page = APPOINTMENTS_KEYSET.page(APPOINTMENTS_KEYSET.apply(query, cursor, limit).all(), limit)
+    set_next_cursor(response, page)
+    appointments = page.items
     
     # Enrich with names
     result = []
@@ -35,7 +35,7 @@ async def get_audit_logs(
     start_date: Optional[str] = Query(None, description="Start date (ISO format)"),
     end_date: Optional[str] = Query(None, description="End date (ISO format)"),
     limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_compliance_access)
 ):
@@ -69,14 +69,15 @@ async def get_audit_logs(
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid severity. Use: info, warning, error, critical")
     
-    logs = service.get_logs(
+    page = service.get_logs(
         user_id=user_id,
         severity=parsed_severity,
         start_date=parsed_start,
         end_date=parsed_end,
         limit=limit,
-        offset=offset
+        cursor=cursor
     )
+    logs = page.items
     
     return {
         "logs": [
@@ -92,7 +93,7 @@ async def get_audit_logs(
             for log in logs
         ],
         "count": len(logs),
-        "offset": offset,
+        "next_cursor": page.next_cursor,
         "limit": limit
     }
 
@@ -220,7 +221,7 @@ async def export_audit_logs(
         start_date=parsed_start,
         end_date=parsed_end,
         limit=10000  # Max export size
-    )
+    ).items
     
     if format == "csv":
         output = io.StringIO()
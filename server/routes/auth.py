@@ -1,14 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..schemas import User as UserSchema, Role
-from ..database import get_db
+from ..database import get_db, get_db_async
 from ..schemas import User as UserSchema, Role
-from ..database import get_db
 import server.models as models
 # User, DoctorProfile, Patient accessed via models.*
 from ..services.token_service import TokenService
@@ -26,26 +28,45 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_email(token: str) -> str:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if email is None:
+        raise _credentials_exception()
+    return email
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = _token_email(token)
     user = db.query(models.User).options(
         joinedload(models.User.patient_profile),
         joinedload(models.User.doctor_profile)
     ).filter(models.User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db_async)):
+    """get_current_user for routes on AsyncSession; the user belongs to the route's session."""
+    email = _token_email(token)
+    result = await db.execute(
+        select(models.User).options(
+            selectinload(models.User.patient_profile),
+            selectinload(models.User.doctor_profile)
+        ).where(models.User.email == email)
+    )
+    user = result.scalars().first()
+    if user is None:
+        raise _credentials_exception()
     return user
 
 def verify_token_data(token: str) -> dict:
@@ -135,13 +156,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 @router.post("/login", response_model=Token)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db_async)):
     try:
         # Find user by email
-        user = db.query(models.User).options(
-            joinedload(models.User.patient_profile), 
-            joinedload(models.User.doctor_profile)
-        ).filter(models.User.email == request.email).first()
+        result = await db.execute(
+            select(models.User).options(
+                selectinload(models.User.patient_profile),
+                selectinload(models.User.doctor_profile)
+            ).where(models.User.email == request.email)
+        )
+        user = result.scalars().first()
         
         if not user:
             raise HTTPException(
@@ -153,7 +177,8 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
         # Verify password
         if user.hashed_password:
             try:
-                if not verify_password(request.password, user.hashed_password):
+                # pbkdf2 is deliberately slow; keep it off the event loop
+                if not await run_in_threadpool(verify_password, request.password, user.hashed_password):
                      raise HTTPException(
                         status_code=status.HTTP_401_UNAUTHORIZED,
                         detail="Incorrect email or password",
@@ -180,16 +205,15 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
         )
 
         try:
-            logger.log("login", user.id, {"email": user.email, "role": user.role}, "INFO")
+            await run_in_threadpool(logger.log, "login", user.id, {"email": user.email, "role": user.role}, "INFO")
         except Exception as e:
-            logger.log("login_error", user.id, {"error": str(e)}, "ERROR")
+            await run_in_threadpool(logger.log, "login_error", user.id, {"error": str(e)}, "ERROR")
             # Do NOT fail login for logging error
         
         # Daily Token Reward
         try:
             from ..services.token_service import TokenService
-            ts = TokenService(db)
-            ts.issue_reward(user.id, 5.0, "Daily Login Bonus")
+            await db.run_sync(lambda session: TokenService(session).issue_reward(user.id, 5.0, "Daily Login Bonus"))
         except Exception as e:
             print(f"Token Reward Error: {e}")
             import traceback
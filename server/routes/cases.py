@@ -1,31 +1,54 @@
-from fastapi import APIRouter, HTTPException, Body, Depends
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Response
 from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from ..schemas import Case as CaseSchema, CaseCreate, Comment as CommentSchema, Role
-from ..database import get_db
+from ..database import get_db, get_db_async
 import server.models as models
 # Case, Comment, User, SystemLog accessed via models.*
-from ..routes.auth import get_current_user
+from ..routes.auth import get_current_user, get_current_user_async
+from ..utils.pagination import Keyset, set_next_cursor
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+def _case_query():
+    # Everything CaseSchema serializes, loaded up front (AsyncSession cannot lazy-load)
+    return select(models.Case).options(
+        joinedload(models.Case.patient),
+        selectinload(models.Case.files),
+        selectinload(models.Case.lab_results)
+    )
+
+CASES_KEYSET = Keyset(models.Case.created_at, models.Case.id)
+
 @router.get("", response_model=List[CaseSchema])
-async def get_cases(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    query = db.query(models.Case).options(joinedload(models.Case.patient))
+async def get_cases(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db_async),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """Newest cases first; the next page's cursor is in the X-Next-Cursor header."""
+    query = _case_query()
     
     if current_user.role == Role.Patient or current_user.role == "Patient":
         if current_user.patient_profile:
-            query = query.filter(models.Case.patient_id == current_user.patient_profile.id)
+            query = query.where(models.Case.patient_id == current_user.patient_profile.id)
         else:
             return []
             
-    return query.order_by(models.Case.created_at.desc()).limit(100).all()
+    result = await db.execute(CASES_KEYSET.apply(query, cursor, limit))
+    page = CASES_KEYSET.page(result.scalars().unique().all(), limit)
+    set_next_cursor(response, page)
+    return page.items
 
 @router.get("/{case_id}", response_model=CaseSchema)
-async def get_case(case_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    case = db.query(models.Case).options(joinedload(models.Case.patient)).filter(models.Case.id == case_id).first()
+async def get_case(case_id: str, db: AsyncSession = Depends(get_db_async), current_user: models.User = Depends(get_current_user_async)):
+    case = (await db.execute(_case_query().where(models.Case.id == case_id))).scalars().first()
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
         
@@ -38,7 +61,7 @@ async def get_case(case_id: str, db: Session = Depends(get_db), current_user: mo
     return case
 
 @router.post("", response_model=CaseSchema)
-async def create_case(case: CaseCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def create_case(case: CaseCreate, db: AsyncSession = Depends(get_db_async), current_user: models.User = Depends(get_current_user_async)):
     new_case = models.Case(
         id=str(uuid.uuid4()),
         title=case.title,
@@ -64,9 +87,8 @@ async def create_case(case: CaseCreate, db: Session = Depends(get_db), current_u
     except Exception:
         pass
         
-    db.commit()
-    db.refresh(new_case)
-    return new_case
+    await db.commit()
+    return (await db.execute(_case_query().where(models.Case.id == new_case.id))).scalars().one()
 
 @router.put("/{case_id}")
 @router.patch("/{case_id}")
@@ -51,19 +51,9 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user), db
 
 @router.get("/admin/stats", response_model=AdminStats)
 async def get_admin_stats(db: Session = Depends(get_db)):
-    total_users = db.query(models.User).count()
-    active_users = db.query(models.User).count() # Mock for now
-    total_cases = db.query(models.Case).count()
-    active_cases = db.query(models.Case).filter(models.Case.status.in_(["Open", "Under Review"])).count()
-    total_comments = db.query(models.Comment).count()
-    
-    # Calculate AI queries in last 24h from SystemLogs
-    now = datetime.utcnow()
-    day_ago = now - timedelta(hours=24)
-    ai_queries = db.query(models.SystemLog).filter(
-        models.SystemLog.event_type == "ai_query",
-        models.SystemLog.timestamp > day_ago
-    ).count()
+    # Counters come from the scheduler-maintained rollup (one indexed read)
+    from ..services.stats_rollup import stats_rollup
+    stats = stats_rollup.admin_stats(db)
 
     # Gemini Status check
     gemini_status = "Connected" if API_KEY else "Disconnected"
@@ -72,30 +62,16 @@ async def get_admin_stats(db: Session = Depends(get_db)):
     db_status = "Connected"
     
     # Token Usage History (7 days)
-    token_usage_history = []
-    for i in range(7):
-        date_val = (now - timedelta(days=6-i)).date()
-        date_start = datetime.combine(date_val, datetime.min.time())
-        date_end = datetime.combine(date_val, datetime.max.time())
-        
-        daily_queries = db.query(models.SystemLog).filter(
-            models.SystemLog.event_type == "ai_query",
-            models.SystemLog.timestamp >= date_start,
-            models.SystemLog.timestamp <= date_end
-        ).count()
-        
-        token_usage_history.append({"date": date_val.strftime("%a"), "tokens": daily_queries * 1000})
-
-    # Storage Stats
-    medical_images_count = db.query(models.MedicalRecord).filter(models.MedicalRecord.type.in_(["Imaging", "CT", "X-Ray", "MRI"])).count()
-    patient_docs_count = db.query(models.MedicalRecord).filter(models.MedicalRecord.type.in_(["Report", "Lab", "Prescription", "Discharge Summary"])).count()
-    logs_count = db.query(models.SystemLog).count()
+    token_usage_history = [
+        {"date": day.strftime("%a"), "tokens": queries * 1000}
+        for day, queries in stats["ai_queries_by_day"]
+    ]
     
     # Estimate Sizes (GB)
     storage_stats = {
-        "images_size_gb": round(medical_images_count * 0.005, 4),
-        "documents_size_gb": round(patient_docs_count * 0.0005, 4),
-        "logs_size_gb": round(logs_count * 0.000001, 6)
+        "images_size_gb": round(stats["medical_images"] * 0.005, 4),
+        "documents_size_gb": round(stats["patient_documents"] * 0.0005, 4),
+        "logs_size_gb": round(stats["system_logs"] * 0.000001, 6)
     }
 
     # Calculate System Health
@@ -104,9 +80,9 @@ async def get_admin_stats(db: Session = Depends(get_db)):
         system_health = "Degraded"
 
     return {
-        "total_users": total_users,
-        "active_cases": active_cases,
-        "ai_queries_today": ai_queries,
+        "total_users": stats["total_users"],
+        "active_cases": stats["active_cases"],
+        "ai_queries_today": stats["ai_queries_today"],
         "system_health": system_health,
         "gemini_status": gemini_status,
         "db_status": db_status,
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 
-from ..database import get_db
+from ..database import get_db_async
 from ..models import User, Notification, NotificationPreference
 from ..schemas import NotificationSchema, NotificationPreferenceSchema, NotificationPreferenceUpdate
-from .auth import get_current_user
+from .auth import get_current_user_async
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -14,83 +16,91 @@ router = APIRouter(prefix="/notifications", tags=["Notifications"])
 async def get_notifications(
     unread_only: bool = Query(False),
     limit: int = Query(50, le=100),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Get notifications for the current user"""
-    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    query = select(Notification).where(Notification.user_id == current_user.id)
     
     if unread_only:
-        query = query.filter(Notification.is_read == False)
+        query = query.where(Notification.is_read == False)
     
-    notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
-    return notifications
+    result = await db.execute(query.order_by(Notification.created_at.desc()).limit(limit))
+    return result.scalars().all()
 
 @router.get("/count")
 async def get_notification_count(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Get count of unread notifications"""
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).count()
+    count = await db.scalar(
+        select(func.count()).select_from(Notification).where(
+            Notification.user_id == current_user.id,
+            Notification.is_read == False
+        )
+    )
     
     return {"unread_count": count}
 
 @router.post("/{notification_id}/read")
 async def mark_as_read(
     notification_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Mark a notification as read"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user.id
-    ).first()
+    notification = (await db.execute(
+        select(Notification).where(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
     notification.is_read = True
-    db.commit()
+    await db.commit()
     
     return {"status": "read", "id": notification_id}
 
 @router.post("/read-all")
 async def mark_all_as_read(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Mark all notifications as read"""
-    db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).update({"is_read": True})
+    await db.execute(
+        update(Notification).where(
+            Notification.user_id == current_user.id,
+            Notification.is_read == False
+        ).values(is_read=True)
+    )
     
-    db.commit()
+    await db.commit()
     
     return {"status": "all_read"}
 
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Delete a notification"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user.id
-    ).first()
+    notification = (await db.execute(
+        select(Notification).where(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id
+        )
+    )).scalars().first()
     
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    db.delete(notification)
-    db.commit()
+    await db.delete(notification)
+    await db.commit()
     
     return {"status": "deleted", "id": notification_id}
 
@@ -98,13 +108,13 @@ async def delete_notification(
 
 @router.get("/preferences", response_model=NotificationPreferenceSchema)
 async def get_preferences(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Get notification preferences for the current user"""
-    prefs = db.query(NotificationPreference).filter(
-        NotificationPreference.user_id == current_user.id
-    ).first()
+    prefs = (await db.execute(
+        select(NotificationPreference).where(NotificationPreference.user_id == current_user.id)
+    )).scalars().first()
     
     if not prefs:
         # Create defaults
@@ -116,21 +126,21 @@ async def get_preferences(
             types_enabled=["case_update", "appointment", "system", "ai", "lab", "prescription"]
         )
         db.add(prefs)
-        db.commit()
-        db.refresh(prefs)
+        await db.commit()
+        await db.refresh(prefs)
     
     return prefs
 
 @router.put("/preferences", response_model=NotificationPreferenceSchema)
 async def update_preferences(
     updates: NotificationPreferenceUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_db_async)
 ):
     """Update notification preferences"""
-    prefs = db.query(NotificationPreference).filter(
-        NotificationPreference.user_id == current_user.id
-    ).first()
+    prefs = (await db.execute(
+        select(NotificationPreference).where(NotificationPreference.user_id == current_user.id)
+    )).scalars().first()
     
     if not prefs:
         prefs = NotificationPreference(user_id=current_user.id)
@@ -140,8 +150,8 @@ async def update_preferences(
     for key, value in update_data.items():
         setattr(prefs, key, value)
     
-    db.commit()
-    db.refresh(prefs)
+    await db.commit()
+    await db.refresh(prefs)
     
     return prefs
 
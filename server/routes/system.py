@@ -100,14 +100,38 @@ async def get_cache_stats() -> Dict[str, Any]:
     """Get cache statistics."""
     try:
         from ..services.cache_service import cache
+        from ..services.embedding_cache import embedding_cache
+        from ..services.response_cache import response_cache
         return {
             "status": "ok",
-            "stats": cache.get_stats()
+            "stats": cache.get_stats(),
+            "embeddings": embedding_cache.get_stats(),
+            "responses": response_cache.get_stats()
         }
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+@router.get("/dispatch/stats")
+async def get_dispatch_stats() -> Dict[str, Any]:
+    """Get agent dispatch cache, background audit writer and workflow engine statistics."""
+    from ..services.consent_cache import consent_cache
+    from ..services.audit_writer import audit_writer
+    from ..agents.orchestrator import orchestrator
+    return {"status": "ok", "consent": consent_cache.get_stats(), "audit": audit_writer.get_stats(),
+            "workflows": orchestrator.workflows.get_stats()}
+
+
+@router.get("/llm/stats")
+async def get_llm_stats() -> Dict[str, Any]:
+    """Get async LLM client statistics (in-flight calls, timeouts, latency), per-model health and request coalescing."""
+    from ..services.llm_client import llm_client
+    from ..agents.slm_orchestrator import slm_orchestrator
+    from ..services.single_flight import single_flight
+    return {"status": "ok", "stats": llm_client.get_stats(), "models": slm_orchestrator.get_stats(),
+            "coalescing": single_flight.get_stats()}
+
+
 @router.post("/cache/clear")
 async def clear_cache(pattern: str = None) -> Dict[str, Any]:
     """Clear cache entries (admin only in production)."""
@@ -117,7 +141,9 @@ async def clear_cache(pattern: str = None) -> Dict[str, Any]:
             count = await cache.clear_pattern(pattern)
             return {"status": "ok", "cleared": count, "pattern": pattern}
         else:
+            from ..services.response_cache import response_cache
             await cache.clear()
+            response_cache.clear()
             return {"status": "ok", "message": "All cache cleared"}
     except Exception as e:
         return {"status": "error", "error": str(e)}
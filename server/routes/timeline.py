@@ -3,7 +3,7 @@ Health Timeline API Routes
 Patient health history timeline events
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -13,6 +13,7 @@ import uuid
 from ..database import get_db
 from ..models import HealthEvent, Patient, User
 from ..routes.auth import get_current_user
+from ..utils.pagination import Keyset, set_next_cursor
 
 router = APIRouter(prefix="/api/timeline", tags=["timeline"])
 
@@ -113,14 +114,23 @@ async def get_timeline(
     
     return events
 
+TIMELINE_KEYSET = Keyset(HealthEvent.event_date, HealthEvent.id)
+
 @router.get("/grouped", response_model=List[TimelineMonth])
 async def get_timeline_grouped(
+    response: Response,
     event_type: Optional[str] = None,
     months: int = Query(12, ge=1, le=60),
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get health timeline events grouped by month"""
+    """
+    Get health timeline events grouped by month, one page of events at a time.
+    The next page's cursor is in the X-Next-Cursor header; a month can
+    continue on the next page.
+    """
     if not current_user.patient_profile:
         raise HTTPException(status_code=400, detail="No patient profile found")
     
@@ -135,7 +145,9 @@ async def get_timeline_grouped(
     if event_type:
         query = query.filter(HealthEvent.type == event_type)
     
-    events = query.order_by(HealthEvent.event_date.desc()).all()
+    page = TIMELINE_KEYSET.page(TIMELINE_KEYSET.apply(query, cursor, limit).all(), limit)
+    set_next_cursor(response, page)
+    events = page.items
     
     # Group by month
     grouped = {}
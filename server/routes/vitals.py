@@ -4,18 +4,21 @@ Patient health vitals tracking and monitoring
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import uuid
 
-from ..database import get_db
+from ..database import get_db_async
 from ..models import VitalReading, Patient, User
-from ..routes.auth import get_current_user
+from ..routes.auth import get_current_user_async
 
 router = APIRouter(prefix="/api/vitals", tags=["vitals"])
 
+SUMMARY_WINDOW = 10 # readings_count in the summary counts at most this many recent readings
+
 # --- Schemas ---
 
 class VitalCreate(BaseModel):
@@ -149,8 +152,8 @@ def calculate_trend(readings: List[VitalReading]) -> tuple:
 @router.post("/", response_model=VitalResponse)
 async def record_vital(
     vital: VitalCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Record a new vital reading for the current patient"""
     if not current_user.patient_profile:
@@ -182,8 +185,8 @@ async def record_vital(
     )
     
     db.add(new_vital)
-    db.commit()
-    db.refresh(new_vital)
+    await db.commit()
+    await db.refresh(new_vital)
     
     return new_vital
 
@@ -192,8 +195,8 @@ async def get_vitals(
     vital_type: Optional[str] = None,
     days: int = Query(7, ge=1, le=365),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get vital readings for the current patient"""
     if not current_user.patient_profile:
@@ -202,22 +205,22 @@ async def get_vitals(
     patient_id = current_user.patient_profile.id
     since_date = datetime.utcnow() - timedelta(days=days)
     
-    query = db.query(VitalReading).filter(
+    query = select(VitalReading).where(
         VitalReading.patient_id == patient_id,
         VitalReading.recorded_at >= since_date
     )
     
     if vital_type:
-        query = query.filter(VitalReading.type == vital_type)
+        query = query.where(VitalReading.type == vital_type)
     
-    readings = query.order_by(VitalReading.recorded_at.desc()).limit(limit).all()
+    readings = (await db.execute(query.order_by(VitalReading.recorded_at.desc()).limit(limit))).scalars().all()
     
     return readings
 
 @router.get("/summary", response_model=List[VitalsSummary])
 async def get_vitals_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get summary of all vital types for the current patient"""
     if not current_user.patient_profile:
@@ -225,14 +228,36 @@ async def get_vitals_summary(
     
     patient_id = current_user.patient_profile.id
     vital_types = ['blood_pressure', 'heart_rate', 'temperature', 'oxygen', 'weight', 'glucose']
-    summaries = []
     
+    # One round-trip: the two latest readings of each type (all the trend
+    # needs) plus the per-type count, ranked in the database.
+    ranked = select(
+        VitalReading.type,
+        VitalReading.value,
+        VitalReading.unit,
+        VitalReading.status,
+        VitalReading.systolic,
+        VitalReading.recorded_at,
+        func.row_number().over(
+            partition_by=VitalReading.type,
+            order_by=(VitalReading.recorded_at.desc(), VitalReading.id.desc())
+        ).label("rn"),
+        func.count().over(partition_by=VitalReading.type).label("total")
+    ).where(
+        VitalReading.patient_id == patient_id,
+        VitalReading.type.in_(vital_types)
+    ).subquery()
+    rows = (await db.execute(
+        select(ranked).where(ranked.c.rn <= 2).order_by(ranked.c.type, ranked.c.rn)
+    )).all()
+    
+    latest = {}
+    for row in rows:
+        latest.setdefault(row.type, []).append(row)
+    
+    summaries = []
     for vtype in vital_types:
-        readings = db.query(VitalReading).filter(
-            VitalReading.patient_id == patient_id,
-            VitalReading.type == vtype
-        ).order_by(VitalReading.recorded_at.desc()).limit(10).all()
-        
+        readings = latest.get(vtype)
         if readings:
             trend, change = calculate_trend(readings)
             summaries.append(VitalsSummary(
@@ -242,7 +267,7 @@ async def get_vitals_summary(
                 status=readings[0].status,
                 trend=trend,
                 change_percent=change,
-                readings_count=len(readings),
+                readings_count=min(readings[0].total, SUMMARY_WINDOW),
                 recorded_at=readings[0].recorded_at
             ))
     
@@ -251,8 +276,8 @@ async def get_vitals_summary(
 @router.get("/latest/{vital_type}", response_model=Optional[VitalResponse])
 async def get_latest_vital(
     vital_type: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get the latest reading for a specific vital type"""
     if not current_user.patient_profile:
@@ -260,18 +285,20 @@ async def get_latest_vital(
     
     patient_id = current_user.patient_profile.id
     
-    reading = db.query(VitalReading).filter(
-        VitalReading.patient_id == patient_id,
-        VitalReading.type == vital_type
-    ).order_by(VitalReading.recorded_at.desc()).first()
+    reading = (await db.execute(
+        select(VitalReading).where(
+            VitalReading.patient_id == patient_id,
+            VitalReading.type == vital_type
+        ).order_by(VitalReading.recorded_at.desc()).limit(1)
+    )).scalars().first()
     
     return reading
 
 @router.delete("/{vital_id}")
 async def delete_vital(
     vital_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Delete a vital reading"""
     if not current_user.patient_profile:
@@ -279,16 +306,18 @@ async def delete_vital(
     
     patient_id = current_user.patient_profile.id
     
-    reading = db.query(VitalReading).filter(
-        VitalReading.id == vital_id,
-        VitalReading.patient_id == patient_id
-    ).first()
+    reading = (await db.execute(
+        select(VitalReading).where(
+            VitalReading.id == vital_id,
+            VitalReading.patient_id == patient_id
+        )
+    )).scalars().first()
     
     if not reading:
         raise HTTPException(status_code=404, detail="Vital reading not found")
     
-    db.delete(reading)
-    db.commit()
+    await db.delete(reading)
+    await db.commit()
     
     return {"message": "Vital reading deleted"}
 
@@ -299,8 +328,8 @@ async def get_patient_vitals(
     patient_id: str,
     vital_type: Optional[str] = None,
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get vital readings for a specific patient (doctor/admin only)"""
     if current_user.role not in ["Doctor", "Admin", "Nurse"]:
@@ -308,22 +337,22 @@ async def get_patient_vitals(
     
     since_date = datetime.utcnow() - timedelta(days=days)
     
-    query = db.query(VitalReading).filter(
+    query = select(VitalReading).where(
         VitalReading.patient_id == patient_id,
         VitalReading.recorded_at >= since_date
     )
     
     if vital_type:
-        query = query.filter(VitalReading.type == vital_type)
+        query = query.where(VitalReading.type == vital_type)
     
-    readings = query.order_by(VitalReading.recorded_at.desc()).all()
+    readings = (await db.execute(query.order_by(VitalReading.recorded_at.desc()))).scalars().all()
     
     return readings
 
 @router.get("/alerts")
 async def get_vital_alerts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get patients with abnormal vitals (doctor/admin only)"""
     if current_user.role not in ["Doctor", "Admin", "Nurse"]:
@@ -332,10 +361,12 @@ async def get_vital_alerts(
     # Get critical/abnormal readings from last 24 hours
     since = datetime.utcnow() - timedelta(hours=24)
     
-    alerts = db.query(VitalReading).filter(
-        VitalReading.recorded_at >= since,
-        VitalReading.status.in_(["Critical", "High", "Low"])
-    ).order_by(VitalReading.recorded_at.desc()).all()
+    alerts = (await db.execute(
+        select(VitalReading).where(
+            VitalReading.recorded_at >= since,
+            VitalReading.status.in_(["Critical", "High", "Low"])
+        ).order_by(VitalReading.recorded_at.desc())
+    )).scalars().all()
     
     return [
         {
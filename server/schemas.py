@@ -386,6 +386,7 @@ class ChatRequest(BaseModel):
     context: Optional[str] = None
     userId: Optional[str] = None
     userRole: Optional[str] = None
+    stream: bool = False # reply as server-sent events (token, done, error)
 
 
 
@@ -4,6 +4,8 @@ from ..schemas import AgentCapability as AgentCapabilitySchema
 import google.generativeai as genai
 import json
 import os
+import re
+from ..utils.intent_router import LocalIntentRouter
 from .agents.nurse_agent import nurse_agent
 from .agents.billing_agent import billing_agent
 from .agents.pharmacy_agent import pharmacy_agent
@@ -17,6 +19,25 @@ class AgentBusService:
             self.model = genai.GenerativeModel("gemini-2.0-flash-exp") # Fast model for routing
         else:
             self.model = None
+        self._router = None
+        self._router_key = None
+
+    def _local_router(self, caps) -> LocalIntentRouter:
+        """
+        Local router over the active capabilities: a capability named in the
+        query (e.g. 'check drug interaction') matches by rule, otherwise the
+        nearest description wins if confident. Rebuilt only when capabilities change.
+        """
+        key = tuple((c.capability_name, c.agent_role, c.description or "") for c in caps)
+        if key != self._router_key:
+            examples = {c.capability_name: f"{c.agent_role} {c.description or ''}" for c in caps}
+            rules = [
+                (r"\b" + r"[\s_-]+".join(re.escape(w) for w in name.split("_")) + r"\b", name, {})
+                for name in examples
+            ]
+            self._router = LocalIntentRouter(examples, rules)
+            self._router_key = key
+        return self._router
 
     def register_capability(self, db: Session, capability: AgentCapabilitySchema):
         # Check if exists (by name and role)
@@ -54,6 +75,11 @@ class AgentBusService:
         if not caps:
             return []
 
+        # Deterministic local match first; the LLM only sees ambiguous queries
+        match = self._local_router(caps).route(query)
+        if match:
+            return [c for c in caps if c.capability_name == match.label]
+
         # Format for LLM
         tools_desc = "\n".join([f"- {c.capability_name} (Agent: {c.agent_role}): {c.description}" for c in caps])
         
@@ -1,11 +1,18 @@
 import json
 import os
-from typing import Dict, Any, Optional, List
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Union
 from sqlalchemy.orm import Session
 import uuid
 from datetime import datetime
 import server.models as models
 from ..config import settings
+from ..utils.text_processing import content_hash, TextSplitter, TextSource
+from .embedding_pipeline import embedding_pipeline
+from ..utils.bm25 import BM25Index, reciprocal_rank_fusion
+from ..utils.reranking import rerank
 import google.generativeai as genai
 
 # Initialize Gemini Client for legacy SDK
@@ -15,15 +22,32 @@ if API_KEY:
 
 # --- Vector Store Strategy ---
 class VectorStore:
+    # Shared batched/concurrent embedder used by add_many; swap for a fake in tests
+    embedder = embedding_pipeline
+
     def add(self, user_id: str, text: str, metadata: Dict[str, Any]): raise NotImplementedError
     def add_many(self, user_id: str, items: List[tuple]): 
         """items: List of (text, metadata)"""
         for text, meta in items:
             self.add(user_id, text, meta)
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts in batches with bounded concurrency. Failed texts get []."""
+        return self.embedder.embed(texts)
+
+    def indexed_hashes(self, user_id: str, digests: List[str]) -> set:
+        """The content hashes (see content_hash) among digests already stored for user_id."""
+        return set()
             
     def query(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[str]: raise NotImplementedError
     def query_with_scores(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]: return []
-    def get_embedding(self, text: str) -> List[float]: return []
+
+    def keyword_search(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
+        """Lexical (BM25) results as (text, metadata, score), fused with dense results in retrieve_context."""
+        return []
+    def get_embedding(self, text: str) -> List[float]:
+        """Single text through the shared, cached embedder. Returns [] on failure."""
+        return self.embed_many([text])[0]
 
 # --- USearch Implementation (High Performance RAG) ---
 try:
@@ -35,6 +59,9 @@ except ImportError:
     print("WARNING: USearch/Numpy not found. RAG might be limited.")
 
 class USearchVectorStore(VectorStore):
+    # Tenant partitions kept in memory; least recently used ones are dropped (they are on disk)
+    MAX_OPEN_PARTITIONS = 256
+
     def __init__(self):
         self.data_dir = "server/data"
         try:
@@ -53,117 +80,201 @@ class USearchVectorStore(VectorStore):
             with open(self.data_path, 'r') as f:
                 self.metadata_store = json.load(f)
         else:
-            self.metadata_store = {} # Key: str(id), Value: {text, metadata, user_id}
-
-        # Initialize Index
+            self.metadata_store = {} # Key: str(id), Value: {text, metadata, user_id, content_hash}
+
+        # (user_id, content_hash) -> str(id), so dedup is a dict lookup instead of a scan.
+        # Older entries are backfilled here and persisted with the next save.
+        self.hash_index = {}
+        for doc_id, doc in self.metadata_store.items():
+            if not doc.get('content_hash'):
+                doc['content_hash'] = content_hash(doc['text'])
+            self.hash_index[(doc['user_id'], doc['content_hash'])] = doc_id
+
+        # Per-tenant partitions: each user's vectors live in their own index, so a
+        # query only touches that tenant's vectors. Loaded lazily on first use.
+        self.partition_dir = f"{self.data_dir}/rag_partitions"
+        os.makedirs(self.partition_dir, exist_ok=True)
+        self.partitions: "OrderedDict[str, Any]" = OrderedDict()
+        # Per-tenant BM25 indexes over the same chunks, built lazily for hybrid retrieval
+        self.lexical: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self.user_keys: Dict[str, List[int]] = {}
+        for doc_id, doc in self.metadata_store.items():
+            self.user_keys.setdefault(doc['user_id'], []).append(int(doc_id))
+
+        # Legacy global index (pre-partitioning); memory-mapped and only read to migrate tenants
+        self.index = None
         try:
-            self.index = Index(ndim=self.ndim, metric="cos")
             if os.path.exists(self.index_path):
-                self.index.load(self.index_path)
+                self.index = Index(ndim=self.ndim, metric="cos")
+                self.index.view(self.index_path)
         except Exception as e:
             print(f"USearch Init Error: {e}")
             self.index = None
 
-    def get_embedding(self, text: str) -> List[float]:
-        if not API_KEY: return []
-        try:
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
-            )
-            return result['embedding']
-        except Exception as e:
-            print(f"Embedding Failed: {e}")
-            return []
-
     def _save_metadata(self):
         with open(self.data_path, 'w') as f:
             json.dump(self.metadata_store, f)
 
+    def _partition_path(self, user_id: str) -> str:
+        # Hashed so arbitrary user ids are safe file names
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:20]
+        return f"{self.partition_dir}/{digest}.usearch"
+
+    def _get_partition(self, user_id: str, create: bool = False):
+        partition = self.partitions.get(user_id)
+        if partition is not None:
+            self.partitions.move_to_end(user_id)
+            return partition
+
+        keys = self.user_keys.get(user_id)
+        if not keys and not create:
+            return None
+
+        partition = Index(ndim=self.ndim, metric="cos")
+        path = self._partition_path(user_id)
+        if os.path.exists(path):
+            partition.load(path)
+        elif keys and self.index is not None:
+            # Migrate this tenant's vectors out of the legacy global index
+            legacy = [k for k in keys if self.index.contains(k)]
+            if legacy:
+                vectors = np.stack([np.asarray(self.index.get(k), dtype=np.float32) for k in legacy])
+                partition.add(np.array(legacy, dtype=np.uint64), vectors)
+                partition.save(path)
+        self.partitions[user_id] = partition
+        while len(self.partitions) > self.MAX_OPEN_PARTITIONS:
+            self.partitions.popitem(last=False)
+        return partition
+
+    def _get_lexical(self, user_id: str) -> Optional[BM25Index]:
+        index = self.lexical.get(user_id)
+        if index is not None:
+            self.lexical.move_to_end(user_id)
+            return index
+        keys = self.user_keys.get(user_id)
+        if not keys:
+            return None
+        index = BM25Index()
+        for key in keys:
+            doc = self.metadata_store.get(str(key))
+            if doc:
+                index.add(str(key), doc['text'])
+        self.lexical[user_id] = index
+        while len(self.lexical) > self.MAX_OPEN_PARTITIONS:
+            self.lexical.popitem(last=False)
+        return index
+
+    def keyword_search(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
+        index = self._get_lexical(user_id)
+        if index is None: return []
+        results = []
+        for doc_id, score in index.search(query_text, None if filter else n_results):
+            doc = self.metadata_store.get(doc_id)
+            if not doc: continue
+            if filter and any(doc.get('metadata', {}).get(k) != v for k, v in filter.items()):
+                continue
+            results.append((doc['text'], doc.get('metadata', {}), score / (score + 1.0)))
+            if len(results) >= n_results:
+                break
+        return results
+
+    def _search_partition(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
+        """
+        Returns up to n_results (doc, similarity) pairs from the tenant's partition.
+        With a metadata filter the search widens until enough matches are found.
+        """
+        partition = self._get_partition(user_id)
+        if partition is None or len(partition) == 0: return []
+
+        query_vector = self.get_embedding(query_text)
+        if not query_vector: return []
+
+        vector = np.array(query_vector, dtype=np.float32)
+        count = min(n_results, len(partition))
+        while True:
+            matches = partition.search(vector, count)
+            results = []
+            for match_id, dist in zip(matches.keys, matches.distances):
+                doc = self.metadata_store.get(str(match_id))
+                if not doc: continue
+                if filter and any(doc.get('metadata', {}).get(k) != v for k, v in filter.items()):
+                    continue
+                # For Cosine metric in USearch, distance is 1 - cos_sim.
+                results.append((doc, 1.0 - float(dist)))
+                if len(results) >= n_results:
+                    return results
+            if count >= len(partition):
+                return results
+            count = min(count * 4, len(partition))
+
     def add(self, user_id: str, text: str, metadata: Dict[str, Any]):
-        if self.index is None: return
-        
-        # Create unique integer ID for USearch (simple hash or incremental)
-        # Using simple hash of text + user_id collision prone but okay for demo, 
-        # better to use incremental or mapped ID.
-        # Let's use simple incremental based on current store size.
-        
-        # Check duplicates in metadata to avoid re-embedding
-        for k, v in self.metadata_store.items():
-            if v['user_id'] == user_id and v['text'] == text:
-                return
+        self.add_many(user_id, [(text, metadata)])
 
-        vector = self.get_embedding(text)
-        if not vector: return
-        
-        # Generate ID
-        import random
-        # Ensure positive
-        doc_id = int(str(uuid.uuid4().int)[:16])
-        
+    def indexed_hashes(self, user_id: str, digests: List[str]) -> set:
+        return {digest for digest in digests if (user_id, digest) in self.hash_index}
+
+    def add_many(self, user_id: str, items: List[tuple]):
+        """
+        Embeds new chunks through the batch pipeline, then saves the tenant's
+        partition and the metadata once for the whole batch.
+        items: List of (text, metadata)
+        """
+        # Check duplicates (stored, or repeated within the batch) to avoid re-embedding
+        pending = []
+        seen = set()
+        for text, metadata in items:
+            digest = content_hash(text)
+            if (user_id, digest) in self.hash_index or digest in seen:
+                continue
+            seen.add(digest)
+            pending.append((text, metadata, digest))
+        if not pending: return
+
+        vectors = self.embed_many([text for text, _, _ in pending])
+
+        added = 0
         try:
-            self.index.add(doc_id, np.array(vector, dtype=np.float32))
-            self.index.save(self.index_path)
-            
-            self.metadata_store[str(doc_id)] = {
-                "text": text,
-                "metadata": metadata,
-                "user_id": user_id
-            }
-            self._save_metadata()
+            partition = self._get_partition(user_id, create=True)
+            for (text, metadata, digest), vector in zip(pending, vectors):
+                if not vector: continue
+                # Generate ID (positive, fits in uint64)
+                doc_id = int(str(uuid.uuid4().int)[:16])
+                partition.add(doc_id, np.array(vector, dtype=np.float32))
+                self.metadata_store[str(doc_id)] = {
+                    "text": text,
+                    "metadata": metadata,
+                    "user_id": user_id,
+                    "content_hash": digest
+                }
+                self.hash_index[(user_id, digest)] = str(doc_id)
+                self.user_keys.setdefault(user_id, []).append(doc_id)
+                if user_id in self.lexical:
+                    self.lexical[user_id].add(str(doc_id), text)
+                added += 1
+
+            if added:
+                partition.save(self._partition_path(user_id))
+                self._save_metadata()
         except Exception as e:
             print(f"Vector Add Error: {e}")
 
-    def query(self, user_id: str, query_text: str, n_results: int) -> List[str]:
-        if self.index is None or len(self.metadata_store) == 0: return []
-        
-        query_vector = self.get_embedding(query_text)
-        if not query_vector: return []
-        
+    def query(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[str]:
         try:
-            # Search global index
-            matches = self.index.search(np.array(query_vector, dtype=np.float32), n_results * 5) # Fetch more to filter by user
-            
-            results = []
-            for match_id in matches.keys:
-                doc = self.metadata_store.get(str(match_id))
-                if doc and doc['user_id'] == user_id:
-                    results.append(doc['text'])
-                    if len(results) >= n_results:
-                        break
-                        
-            return results
+            return [doc['text'] for doc, _ in self._search_partition(user_id, query_text, n_results, filter)]
         except Exception as e:
             print(f"Vector Search Error: {e}")
             return []
 
-    def query_with_scores(self, user_id: str, query_text: str, n_results: int) -> List[tuple]:
+    def query_with_scores(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
         """
         USearch implementation of query_with_scores.
         Returns list of (text, metadata, score)
         """
-        if self.index is None or len(self.metadata_store) == 0: return []
-        
-        query_vector = self.get_embedding(query_text)
-        if not query_vector: return []
-        
         try:
-            # Search global index
-            matches = self.index.search(np.array(query_vector, dtype=np.float32), n_results * 5)
-            
-            results = []
-            for match_id, dist in zip(matches.keys, matches.distances):
-                doc = self.metadata_store.get(str(match_id))
-                if doc and doc['user_id'] == user_id:
-                    # USearch returns distance (often cosine distance 1-sim)
-                    # Convert to similarity: 1 / (1 + dist) or 1 - dist
-                    # For Cosine metric in USearch, it's 1 - cos_sim.
-                    sim = 1.0 - dist
-                    results.append((doc['text'], doc.get('metadata', {}), sim))
-                    if len(results) >= n_results:
-                        break
-            return results
+            return [
+                (doc['text'], doc.get('metadata', {}), sim)
+                for doc, sim in self._search_partition(user_id, query_text, n_results, filter)
+            ]
         except Exception as e:
             print(f"Vector Search Error: {e}")
             return []
@@ -175,20 +286,6 @@ class VertexAIVectorStore(VectorStore):
         self.location = "us-central1"
         self.index_endpoint = settings.VERTEX_AI_INDEX_ENDPOINT
         
-    def get_embedding(self, text: str) -> List[float]:
-        try:
-            if not API_KEY: return []
-            # Legacy SDK embedding call
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
-            )
-            return result['embedding']
-        except Exception as e:
-            print(f"Embedding error: {e}")
-            return []
-
     def add(self, user_id: str, text: str, metadata: Dict[str, Any]):
         # In a real heavy-duty setup, this would push to Vertex AI Vector Search
         # For now, we fallback to local storage or just logging
@@ -198,6 +295,10 @@ class VertexAIVectorStore(VectorStore):
         return []
 
 class SimpleJSONVectorStore(VectorStore):
+    """
+    Offline (no API key) store: user_knowledge.json held in memory with a
+    per-user BM25 inverted index, updated incrementally on add.
+    """
     def __init__(self):
         self.data_dir = "server/data"
         try:
@@ -211,6 +312,12 @@ class SimpleJSONVectorStore(VectorStore):
         if not os.path.exists(self.path):
             with open(self.path, 'w') as f:
                 json.dump({}, f)
+
+        self._mtime = None
+        self.data: Dict[str, list] = {}
+        self._indexes: Dict[str, BM25Index] = {}
+        self._items: Dict[str, Dict[str, dict]] = {}
+        self._refresh()
     
     def _load(self):
         try:
@@ -221,66 +328,92 @@ class SimpleJSONVectorStore(VectorStore):
     def _save(self, data):
         with open(self.path, 'w') as f:
             json.dump(data, f)
+        self._mtime = os.path.getmtime(self.path)
+
+    def _refresh(self):
+        """Reloads only if another process rewrote the file since we last saw it."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self.data = self._load()
+        self._mtime = mtime
+        self._indexes = {}
+        self._items = {}
+
+    def _user_index(self, user_id: str) -> BM25Index:
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = BM25Index()
+            items = {}
+            for item in self.data.get(user_id, []):
+                items[item['id']] = item
+                index.add(item['id'], item['text'])
+            self._indexes[user_id] = index
+            self._items[user_id] = items
+        return index
             
     def add(self, user_id: str, text: str, metadata: Dict[str, Any]):
-        data = self._load()
-        if user_id not in data:
-            data[user_id] = []
+        self.add_many(user_id, [(text, metadata)])
+
+    def indexed_hashes(self, user_id: str, digests: List[str]) -> set:
+        self._refresh()
+        stored = {content_hash(item['text']) for item in self.data.get(user_id, [])}
+        return stored.intersection(digests)
+
+    def add_many(self, user_id: str, items: List[tuple]):
+        """Keyword store: no embeddings, one save for the whole batch."""
+        self._refresh()
+        user_data = self.data.setdefault(user_id, [])
+        index = self._user_index(user_id)
         
         # Avoid duplicates
-        for item in data[user_id]:
-            if item['text'] == text:
-                return
-                
-        data[user_id].append({
-            "text": text,
-            "metadata": metadata,
-            "id": str(uuid.uuid4())
-        })
-        self._save(data)
-        
-    def query(self, user_id: str, query_text: str, n_results: int) -> List[str]:
-        data = self._load()
-        user_data = data.get(user_id, [])
-        if not user_data: return []
-        
-        import re
-        def tokenize(text):
-            return set(re.findall(r'\w+', text.lower()))
-            
-        # Simple keyword overlap scoring
-        query_words = tokenize(query_text)
-        scored = []
-        for item in user_data:
-            text_words = tokenize(item['text'])
-            overlap = len(query_words.intersection(text_words))
-            scored.append((overlap, item['text']))
-            
-        # Sort by score desc, filter 0 overlap
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [s[1] for s in scored if s[0] > 0][:n_results]
-
-    def query_with_scores(self, user_id: str, query_text: str, n_results: int) -> List[tuple]:
-        data = self._load()
-        user_data = data.get(user_id, [])
-        if not user_data: return []
-        
-        import re
-        def tokenize(text):
-            return set(re.findall(r'\w+', text.lower()))
-            
-        query_words = tokenize(query_text)
-        scored = []
-        for item in user_data:
-            text_words = tokenize(item['text'])
-            overlap = len(query_words.intersection(text_words))
-            # Basic score: overlap count normalized by query length
-            score = overlap / len(query_words) if query_words else 0
-            if score > 0:
-                scored.append((item['text'], item.get('metadata', {}), score))
-            
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return scored[:n_results]
+        existing = {item['text'] for item in user_data}
+        added = 0
+        for text, metadata in items:
+            if text in existing:
+                continue
+            existing.add(text)
+            item = {
+                "text": text,
+                "metadata": metadata,
+                "id": str(uuid.uuid4())
+            }
+            user_data.append(item)
+            index.add(item['id'], text)
+            self._items[user_id][item['id']] = item
+            added += 1
+        if added:
+            self._save(self.data)
+
+    def _search(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
+        self._refresh()
+        if not self.data.get(user_id): return []
+        index = self._user_index(user_id)
+        items = self._items[user_id]
+
+        hits = index.search(query_text, None if filter else n_results)
+        results = []
+        for doc_id, score in hits:
+            item = items[doc_id]
+            if filter and any(item.get('metadata', {}).get(k) != v for k, v in filter.items()):
+                continue
+            results.append((item, score))
+            if len(results) >= n_results:
+                break
+        return results
+        
+    def query(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[str]:
+        return [item['text'] for item, _ in self._search(user_id, query_text, n_results, filter)]
+
+    def query_with_scores(self, user_id: str, query_text: str, n_results: int, filter: Optional[Dict] = None) -> List[tuple]:
+        """Returns (text, metadata, score) sorted by BM25 score, squashed into 0-1."""
+        return [
+            (item['text'], item.get('metadata', {}), score / (score + 1.0))
+            for item, score in self._search(user_id, query_text, n_results, filter)
+        ]
 
 # --- PostgreSQL PGVector Implementation (Production RAG) ---
 class PGVectorStore(VectorStore):
@@ -309,50 +442,63 @@ class PGVectorStore(VectorStore):
             # Silent fail - rely on migrations
             pass
 
-    def get_embedding(self, text: str) -> List[float]:
+    def indexed_hashes(self, user_id: str, digests: List[str]) -> set:
+        digests = list(digests)
+        if not digests: return set()
         try:
-            if not API_KEY: return []
-            result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
-            )
-            return result['embedding']
+            from sqlalchemy import text
+            with self.engine.connect() as conn:
+                result = conn.execute(
+                    text("SELECT content_hash FROM embeddings WHERE user_id = :user_id AND content_hash = ANY(:digests)"),
+                    {"user_id": user_id, "digests": digests}
+                )
+                return {row[0] for row in result}
         except Exception as e:
-            print(f"Embedding error: {e}")
-            return []
+            print(f"PGVector Hash Lookup Error: {e}")
+            return set()
 
     def add_many(self, user_id: str, items: List[tuple]):
         """
         Optimized batch insert for PostgreSQL.
         items: List of (text, metadata)
+        Chunks already stored for the user (same content hash) are neither
+        embedded nor inserted again; the unique (user_id, content_hash) index
+        settles races between concurrent writers.
         """
         if not items: return
-        
-        # 1. Compute Embeddings (We could batch this if API allows, but loop for now)
-        # Note: We can parallelism this with ThreadPool if needed
-        rows = []
+
+        # 1. Drop duplicates (repeated in the batch, or already stored) before paying for embeddings
+        pending = {}
         for text, meta in items:
-            vec = self.get_embedding(text)
+            pending.setdefault(content_hash(text), (text, meta))
+        for digest in self.indexed_hashes(user_id, list(pending)):
+            del pending[digest]
+        if not pending: return
+
+        # 2. Compute Embeddings (batched, bounded concurrency, retried)
+        vectors = self.embed_many([text for text, _ in pending.values()])
+        rows = []
+        for (digest, (text, meta)), vec in zip(pending.items(), vectors):
             if vec:
-                import json
                 rows.append({
                     "user_id": user_id,
                     "content": text,
+                    "content_hash": digest,
                     "metadata": json.dumps(meta),
                     "embedding": str(vec)
                 })
         
         if not rows: return
 
-        # 2. Bulk Insert
+        # 3. Bulk Insert
         try:
              with self.engine.begin() as conn: # Transactional
                 from sqlalchemy import text
                 conn.execute(
                     text("""
-                    INSERT INTO embeddings (user_id, content, metadata, embedding)
-                    VALUES (:user_id, :content, :metadata, :embedding)
+                    INSERT INTO embeddings (user_id, content, content_hash, metadata, embedding)
+                    VALUES (:user_id, :content, :content_hash, :metadata, :embedding)
+                    ON CONFLICT (user_id, content_hash) DO NOTHING
                     """),
                     rows
                 )
@@ -454,6 +600,12 @@ elif not vector_store:
     vector_store = SimpleJSONVectorStore()
 
 class AgentService:
+    # Re-ranking defaults (see utils/reranking.py)
+    RERANK_SIMILARITY_WEIGHT = 0.7
+    RERANK_RECENCY_WEIGHT = 0.3
+    RERANK_DECAY = "linear"
+    RERANK_HALF_LIFE_DAYS = 90.0
+
     def __init__(self):
         self.vector_store = vector_store
 
@@ -495,38 +647,75 @@ class AgentService:
         db.commit()
         
         # Also index as knowledge
-        self.vector_store.add(user_id, point, {"type": "learning_point", "source": "interaction", "timestamp": datetime.utcnow().isoformat()})
+        self.vector_store.add(user_id, point, {"type": "learning_point", "source": "interaction", "timestamp": datetime.utcnow().isoformat(), "ts": time.time()})
         print(f"Agent learned for {user_id}: {point}")
 
     def add_preference(self, user_id: str, text: str):
         """
         Explicitly adds a user preference to the vector store.
         """
-        self.vector_store.add(user_id, f"User Preference: {text}", {"type": "preference", "timestamp": datetime.utcnow().isoformat()})
+        self.vector_store.add(user_id, f"User Preference: {text}", {"type": "preference", "timestamp": datetime.utcnow().isoformat(), "ts": time.time()})
+
+    @staticmethod
+    def medical_record_item(record_id: str, content: str, summary: str) -> tuple:
+        """(text, metadata) pair stored in the vector store for a medical record."""
+        return content, {
+            "type": "medical_record",
+            "record_id": record_id,
+            "summary": summary,
+            "timestamp": datetime.utcnow().isoformat(),
+            "ts": time.time()
+        }
+
+    def index_medical_record(self, user_id: str, record_id: str, content: str, summary: str):
+        """
+        Indexes a medical record's extracted content for RAG.
+        Every vector store skips content already stored for the user (by
+        content hash), so re-indexing unchanged content is safe.
+        """
+        text, meta = self.medical_record_item(record_id, content, summary)
+        self.vector_store.add(user_id, text, meta)
+
+    def index_medical_records(self, user_id: str, records: List[tuple]):
+        """Bulk variant of index_medical_record: (record_id, content, summary) tuples, one store write."""
+        items = [self.medical_record_item(*r) for r in records]
+        if items:
+            self.vector_store.add_many(user_id, items)
+
+    # Chunks handed to the vector store per add_many call while streaming
+    INGEST_BATCH_SIZE = 64
 
-    def add_knowledge(self, user_id: str, text: str, metadata: Dict[str, Any], db: Session = None):
+    def add_knowledge(self, user_id: str, text: Union[str, TextSource], metadata: Dict[str, Any], db: Session = None):
         """
         Adds knowledge to both the Vector Store (for RAG) and the Database (KnowledgeItem) for persistence.
         Uses Advanced Chunking for better retrieval.
+        `text` may also be a file object or iterator of strings; it is then chunked
+        and indexed as a stream (constant memory) and not copied into KnowledgeItem.
         """
-        from ..utils.text_processing import TextSplitter
-        
-        # 1. Chunking
-        chunks = TextSplitter.recursive_split(text, chunk_size=800, overlap=100)
+        # 1. Chunking (streamed, with overlap and source offsets)
+        chunks = TextSplitter.stream_split(text, chunk_size=800, overlap=100)
         
         # 2. Add Chunks to Vector Store (Optimized Batch)
         batch_items = []
-        for i, chunk in enumerate(chunks):
+        ingested_at = datetime.utcnow().isoformat()
+        ingested_ts = time.time() # epoch seconds, so re-ranking never parses dates
+        for chunk in chunks:
             meta = metadata.copy()
-            meta['chunk_index'] = i
-            meta['total_chunks'] = len(chunks)
-            meta['timestamp'] = datetime.utcnow().isoformat()
-            batch_items.append((chunk, meta))
+            meta['chunk_index'] = chunk.index
+            meta['char_start'] = chunk.start
+            meta['char_end'] = chunk.end
+            meta['timestamp'] = ingested_at
+            meta['ts'] = ingested_ts
+            batch_items.append((chunk.text, meta))
+            if len(batch_items) >= self.INGEST_BATCH_SIZE:
+                self.vector_store.add_many(user_id, batch_items)
+                batch_items = []
             
-        self.vector_store.add_many(user_id, batch_items)
+        if batch_items:
+            self.vector_store.add_many(user_id, batch_items)
         
         # 3. Add Original Full Text to Database (for reference/display)
-        if db:
+        if db and isinstance(text, str):
             try:
                 # Check duplication
                 existing = db.query(models.KnowledgeItem).filter(
@@ -547,55 +736,35 @@ class AgentService:
                 print(f"Failed to persist KnowledgeItem to DB: {e}")
                 db.rollback()
 
-    def retrieve_context(self, user_id: str, query: str, n_results: int = 3, filter: Optional[Dict[str, Any]] = None) -> str:
+    def retrieve_context(self, user_id: str, query: str, n_results: int = 3, filter: Optional[Dict[str, Any]] = None,
+                         decay: Optional[str] = None, mmr_lambda: Optional[float] = None) -> str:
         """
         Retrieves context with basic Re-Ranking (Similarity + Recency).
-        Supports metadata filtering.
+        Dense and BM25 candidates are fused when the store supports both.
+        Supports metadata filtering, a choice of recency decay curve
+        ("linear", "exponential", "none") and MMR diversification.
         """
         # Fetch more candidates for re-ranking
         candidates = self.vector_store.query_with_scores(user_id, query, n_results * 3, filter=filter)
+
+        # Hybrid retrieval: fuse lexical (BM25) hits with the dense ones by reciprocal rank
+        lexical = self.vector_store.keyword_search(user_id, query, n_results * 3, filter=filter)
+        if lexical:
+            candidates = reciprocal_rank_fusion([candidates, lexical])
         
         if not candidates: return ""
 
-        # Re-Ranking Logic
+        # Re-Ranking Logic (vectorised)
         # Score = (VectorSim * 0.7) + (Recency * 0.3)
-        ranked_results = []
-        now = datetime.utcnow()
-        
-        import dateutil.parser
-        
-        for text, meta, score in candidates:
-            # Parse timestamp
-            recency_score = 0.0
-            if meta and 'timestamp' in meta:
-                try:
-                    ts = dateutil.parser.parse(meta['timestamp'])
-                    if ts.tzinfo: ts = ts.replace(tzinfo=None) # naive comparison
-                    # Decay: 1 day old = 1.0, 365 days = 0.0
-                    days_old = (now - ts).days
-                    recency_score = max(0, 1.0 - (days_old / 365.0))
-                except: pass
-            
-            # Hybrid Score
-            # Vector score is usually distance (lower is better) or similarity (higher is better). 
-            # Assuming store returns cosine similarity (0-1).
-            # If store returns distance, convert to similarity approx (1 / (1+d))
-            
-            final_score = (score * 0.7) + (recency_score * 0.3)
-            ranked_results.append((final_score, text))
-            
-        # Sort desc
-        ranked_results.sort(key=lambda x: x[0], reverse=True)
-        
-        # Deduplicate texts roughly
-        seen = set()
-        final_texts = []
-        for _, txt in ranked_results:
-            if txt not in seen:
-                final_texts.append(txt)
-                seen.add(txt)
-            if len(final_texts) >= n_results: break
-            
+        final_texts = rerank(
+            candidates,
+            n_results,
+            similarity_weight=self.RERANK_SIMILARITY_WEIGHT,
+            recency_weight=self.RERANK_RECENCY_WEIGHT,
+            decay=decay or self.RERANK_DECAY,
+            half_life_days=self.RERANK_HALF_LIFE_DAYS,
+            mmr_lambda=mmr_lambda
+        )
         return "\n".join(final_texts)
 
     def retrieve_lessons(self, query: str, n_results: int = 3) -> str:
@@ -647,13 +816,16 @@ class AgentService:
             if user.doctor_profile:
                  user_details += f"\n- Specialty: {user.doctor_profile.specialty}"
 
-        if user and user.patient_profile:
-            p = user.patient_profile
-            user_details += f"\n- Patient Details: Age {p.dob} (DOB), Sex {p.sex}, Blood {p.blood_type}"
-            if p.baseline_illnesses:
-                user_details += f"\n- Chronic Conditions: {', '.join(p.baseline_illnesses)}"
-            if p.allergies:
-                user_details += f"\n- Allergies: {', '.join(p.allergies)}"
+        # Patient details from the precomputed context snapshot (one row)
+        from .patient_context import patient_context
+        snapshot = patient_context.for_user(db, user_id) if user else None
+        if snapshot:
+            p = snapshot.profile or {}
+            user_details += f"\n- Patient Details: Age {p.get('dob')} (DOB), Sex {p.get('sex')}, Blood {p.get('blood_type')}"
+            if p.get("baseline_illnesses"):
+                user_details += f"\n- Chronic Conditions: {', '.join(p['baseline_illnesses'])}"
+            if p.get("allergies"):
+                user_details += f"\n- Allergies: {', '.join(p['allergies'])}"
         
         # Structured System Instruction
         instruction = f"""## Role
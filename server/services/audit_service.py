@@ -8,6 +8,7 @@ and system monitoring purposes.
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
+from ..utils.pagination import Keyset, Page
 from enum import Enum
 import json
 import logging
@@ -193,12 +194,13 @@ class AuditLogService:
         end_date: Optional[datetime] = None,
         severity: Optional[AuditSeverity] = None,
         limit: int = 100,
-        offset: int = 0
-    ) -> list:
+        cursor: Optional[str] = None
+    ) -> Page:
         """
-        Query audit logs with filters.
+        Query audit logs with filters, newest first.
         
-        Returns list of audit log entries matching the criteria.
+        Returns a Page of audit log entries matching the criteria; pass its
+        next_cursor back as `cursor` for the following page.
         """
         from ..models import SystemLog
         
@@ -216,20 +218,18 @@ class AuditLogService:
         if end_date:
             query = query.filter(SystemLog.timestamp <= end_date)
         
-        query = query.order_by(SystemLog.timestamp.desc())
-        query = query.offset(offset).limit(limit)
-        
-        return query.all()
+        keyset = Keyset(SystemLog.timestamp, SystemLog.id)
+        return keyset.page(keyset.apply(query, cursor, limit).all(), limit)
     
     def get_user_activity(self, user_id: str, days: int = 30) -> list:
         """Get recent activity for a specific user."""
         from datetime import timedelta
         start_date = datetime.utcnow() - timedelta(days=days)
-        return self.get_logs(user_id=user_id, start_date=start_date)
+        return self.get_logs(user_id=user_id, start_date=start_date).items
     
     def get_patient_access_log(self, patient_id: str) -> list:
         """Get all access logs for a specific patient (HIPAA compliance)."""
-        return self.get_logs(resource_type="patient", limit=1000)
+        return self.get_logs(resource_type="patient", limit=1000).items
 
 
 # Convenience functions for common audit operations
@@ -0,0 +1,119 @@
+"""
+Batched Audit Writer for Intelligent Health Platform
+
+Takes SystemLog inserts off the request path: callers enqueue an entry and
+return immediately, and a background thread writes queued entries in batches
+(one session and one commit per batch).
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import atexit
+import logging
+import queue
+import threading
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedAuditWriter:
+    def __init__(self, session_factory: Callable[[], Session] = None, batch_size: int = 100,
+                 flush_interval: float = 0.5, max_queue: int = 10000):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0}
+
+    @property
+    def session_factory(self) -> Callable[[], Session]:
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @session_factory.setter
+    def session_factory(self, factory: Callable[[], Session]):
+        self._session_factory = factory
+
+    def enqueue(self, event_type: str, user_id: Optional[str], details: Dict[str, Any]):
+        """Queues a SystemLog row; never blocks the caller."""
+        entry = {"event_type": event_type, "user_id": user_id, "details": details, "timestamp": datetime.utcnow()}
+        try:
+            self._queue.put_nowait(entry)
+            self._stats["enqueued"] += 1
+        except queue.Full:
+            self._stats["dropped"] += 1
+            logger.warning(f"Audit queue full, dropped {event_type} entry")
+            return
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _drain(self, first: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        from ..models import SystemLog
+        with self._write_lock:
+            db = self.session_factory()
+            try:
+                db.bulk_insert_mappings(SystemLog, batch)
+                db.commit()
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+            except Exception as e:
+                db.rollback()
+                self._stats["failed"] += len(batch)
+                logger.error(f"Audit batch of {len(batch)} failed: {e}")
+            finally:
+                db.close()
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Synchronously writes everything queued so far (tests, shutdown), then
+        waits up to `timeout` seconds for a batch the worker thread has taken
+        but not written yet. Returns False if that batch is still pending.
+        """
+        while not self._queue.empty():
+            self._write(self._drain())
+        done = self._queue.all_tasks_done
+        with done:
+            return done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "queued": self._queue.qsize()}
+
+
+# Global audit writer instance
+audit_writer = BatchedAuditWriter()
+atexit.register(audit_writer.flush)
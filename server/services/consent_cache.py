@@ -0,0 +1,79 @@
+"""
+Consent Cache for Intelligent Health Platform
+
+Short-TTL cache of each user's GDPR / data-sharing consent flags, read on
+every agent dispatch. Entries are dropped as soon as the User row is updated
+or deleted in this process; the TTL bounds staleness for changes made by
+other workers.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models import User
+
+
+class ConsentFlags(NamedTuple):
+    gdpr_consent: Optional[bool]
+    data_sharing_consent: Optional[bool]
+
+
+class ConsentCache:
+    def __init__(self, ttl_seconds: float = 30.0, max_items: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        # user_id -> (expires_at, flags or None when the user does not exist)
+        self._entries: Dict[str, Tuple[float, Optional[ConsentFlags]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, db: Session, user_id: str) -> Optional[ConsentFlags]:
+        """Consent flags for user_id, or None if there is no such user."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        row = db.query(User.gdpr_consent, User.data_sharing_consent).filter(User.id == user_id).first()
+        flags = ConsentFlags(row[0], row[1]) if row else None
+        with self._lock:
+            if len(self._entries) >= self.max_items:
+                # Drop expired entries, then the soonest-expiring half if still full
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_items:
+                    keep = sorted(self._entries.items(), key=lambda kv: kv[1][0])[len(self._entries) // 2:]
+                    self._entries = dict(keep)
+            self._entries[user_id] = (now + self.ttl_seconds, flags)
+        return flags
+
+    def invalidate(self, user_id: str = None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+
+# Global consent cache instance
+consent_cache = ConsentCache()
+
+
+def _user_changed(mapper, connection, target):
+    consent_cache.invalidate(target.id)
+
+
+event.listen(User, "after_insert", _user_changed)
+event.listen(User, "after_update", _user_changed)
+event.listen(User, "after_delete", _user_changed)
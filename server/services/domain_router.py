@@ -1,6 +1,9 @@
 import google.generativeai as genai
 from ..config import settings
+from .llm_client import llm_client
+from .response_cache import response_cache
 from typing import Dict
+import json
 
 class DomainRouter:
     """
@@ -31,9 +34,12 @@ class DomainRouter:
         
         try:
             model = genai.GenerativeModel("gemini-2.5-flash", generation_config={"response_mime_type": "application/json"})
-            response = await model.generate_content_async(prompt)
-            import json
-            return json.loads(response.text)
+
+            async def classify():
+                response = await llm_client.generate(model, prompt)
+                return json.loads(response.text)
+
+            return await response_cache.get_or_generate("classify_domain", model.model_name, prompt, classify)
         except Exception as e:
             print(f"Router Error: {e}")
             return {"domain": "General", "confidence": "Low", "reason": "Error in classification"}
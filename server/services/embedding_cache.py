@@ -0,0 +1,168 @@
+"""
+Embedding Cache for Intelligent Health Platform
+
+Two-tier cache for embedding vectors keyed by (model, task_type, text hash):
+an in-memory LRU in front of an on-disk SQLite table, so fixed prompts and
+re-ingested chunks are embedded once per deployment instead of per call.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_key(model: str, task_type: str, text: str) -> str:
+    """Cache key for an embedding; the text itself is never stored."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}|{task_type}|{digest}"
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU (memory) + SQLite (disk) embedding cache.
+
+    Vectors are stored on disk as raw float32 blobs. Pass path=None for a
+    memory-only cache.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 4096):
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._max_memory_items = max_memory_items
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self.path = path
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache disk tier disabled ({path}): {e}")
+            self._conn = None
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_items:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Looks up texts in order; misses are returned as None."""
+        keys = [embedding_key(model, task_type, t) for t in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        with self._lock:
+            disk_lookup: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    results[i] = vector
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup and self._conn is not None:
+                try:
+                    lookup_keys = list(disk_lookup)
+                    # Stay well under SQLite's bound-parameter limit
+                    for start in range(0, len(lookup_keys), 500):
+                        chunk = lookup_keys[start:start + 500]
+                        placeholders = ",".join("?" * len(chunk))
+                        rows = self._conn.execute(
+                            f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", chunk
+                        ).fetchall()
+                        for key, blob in rows:
+                            vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                            self._remember(key, vector)
+                            for i in disk_lookup.pop(key):
+                                results[i] = vector
+                                self._stats["disk_hits"] += 1
+                except Exception as e:
+                    logger.warning(f"Embedding cache read failed: {e}")
+
+            self._stats["misses"] += sum(len(v) for v in disk_lookup.values())
+        return results
+
+    def get(self, model: str, task_type: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, task_type, [text])[0]
+
+    def set_many(self, model: str, task_type: str, texts: List[str], vectors: List[List[float]]):
+        """Stores non-empty vectors in both tiers."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if not vector:
+                    continue
+                key = embedding_key(model, task_type, text)
+                self._remember(key, list(vector))
+                rows.append((key, np.asarray(vector, dtype=np.float32).tobytes()))
+            self._stats["writes"] += len(rows)
+            if rows and self._conn is not None:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)", rows
+                    )
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+    def set(self, model: str, task_type: str, text: str, vector: List[float]):
+        self.set_many(model, task_type, [text], [vector])
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embedding_cache")
+                self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            total = hits + self._stats["misses"]
+            hit_rate = (hits / total * 100) if total > 0 else 0
+            disk_size = None
+            if self._conn is not None:
+                try:
+                    disk_size = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                except Exception:
+                    pass
+            return {
+                **self._stats,
+                "memory_size": len(self._memory),
+                "max_memory_items": self._max_memory_items,
+                "disk_size": disk_size,
+                "hit_rate": f"{hit_rate:.1f}%"
+            }
+
+
+def _default_cache_path() -> str:
+    data_dir = "server/data"
+    try:
+        os.makedirs(data_dir, exist_ok=True)
+    except OSError:
+        data_dir = "/tmp/server/data"
+    return f"{data_dir}/embedding_cache.sqlite3"
+
+
+# Global cache instance
+embedding_cache = EmbeddingCache(path=_default_cache_path(), max_memory_items=4096)
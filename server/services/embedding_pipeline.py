@@ -0,0 +1,160 @@
+"""
+Embedding Pipeline for Intelligent Health Platform
+
+Batches texts into multi-input embedding requests and runs the batches
+with bounded concurrency and exponential-backoff retries. Results are
+memoised in the shared EmbeddingCache. Every VectorStore backend and the
+domain knowledge bases embed through here (see embed_text).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import logging
+import random
+import threading
+import time
+
+import google.generativeai as genai
+
+from ..config import settings
+from .embedding_cache import EmbeddingCache, embedding_cache
+
+logger = logging.getLogger(__name__)
+
+if settings.GEMINI_API_KEY:
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Gemini accepts up to 100 inputs per embed_content request
+MAX_BATCH_SIZE = 100
+
+# (texts, task_type, title) -> vectors
+EmbedBatchFn = Callable[[List[str], str, Optional[str]], List[List[float]]]
+
+
+def gemini_embed_batch(texts: List[str], task_type: str = "retrieval_document", title: Optional[str] = None) -> List[List[float]]:
+    """Embeds a batch of texts with a single Gemini request."""
+    if not settings.GEMINI_API_KEY:
+        return [[] for _ in texts]
+    kwargs = {"title": title} if title else {}
+    result = genai.embed_content(
+        model=EMBEDDING_MODEL,
+        content=texts,
+        task_type=task_type,
+        **kwargs
+    )
+    return result['embedding']
+
+
+class EmbeddingPipeline:
+    """
+    Bounded-concurrency, batched embedding stage.
+
+    The embed function is injectable so tests (and offline dev) can run
+    against a local fake embedder. With a cache attached, only texts not
+    already cached for (model, task_type) are sent upstream.
+    """
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn = gemini_embed_batch,
+        batch_size: int = 32,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+        cache: Optional[EmbeddingCache] = None,
+        model: str = EMBEDDING_MODEL
+    ):
+        self.embed_batch = embed_batch
+        self.cache = cache
+        self.model = model
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._sleep = sleep
+        self._stats = {"requests": 0, "retries": 0, "failed_batches": 0, "texts": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += n
+
+    def _embed_with_retry(self, batch: List[str], task_type: str, title: Optional[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._count("requests")
+                vectors = self.embed_batch(batch, task_type, title)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedder returned {len(vectors)} vectors for {len(batch)} texts")
+                return [list(v) if v is not None else [] for v in vectors]
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    self._count("failed_batches")
+                    logger.error(f"Embedding batch of {len(batch)} failed after {attempt + 1} attempts: {e}")
+                    return [[] for _ in batch]
+                self._count("retries")
+                delay = self.backoff_base * (2 ** attempt)
+                # Full jitter keeps parallel batches from retrying in lockstep
+                self._sleep(random.uniform(0, delay) if delay else 0)
+        return [[] for _ in batch]
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document", title: Optional[str] = None) -> List[List[float]]:
+        """
+        Embeds texts in order. Texts whose batch ultimately failed get an
+        empty vector, matching get_embedding's failure convention.
+        """
+        if not texts:
+            return []
+        self._count("texts", len(texts))
+
+        # The title changes document embeddings, so it is part of the cache key
+        cache_task = f"{task_type}:{title}" if title else task_type
+        output: List[List[float]] = [[] for _ in texts]
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, cache_task, texts)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    output[i] = vector
+            # Embed each distinct missing text once
+            missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        else:
+            missing = list(texts)
+        if not missing:
+            return output
+
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        embed = lambda batch: self._embed_with_retry(batch, task_type, title)
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [embed(b) for b in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                results = list(pool.map(embed, batches))
+        vectors = [vector for batch in results for vector in batch]
+
+        if self.cache is None:
+            return vectors
+
+        self.cache.set_many(self.model, cache_task, missing, vectors)
+        fresh = dict(zip(missing, vectors))
+        for i, text in enumerate(texts):
+            if not output[i]:
+                output[i] = fresh.get(text, [])
+        return output
+
+    def get_stats(self) -> dict:
+        return dict(self._stats, batch_size=self.batch_size, max_concurrency=self.max_concurrency)
+
+
+# Global pipeline instance
+embedding_pipeline = EmbeddingPipeline(cache=embedding_cache)
+
+
+def embed_text(text: str, task_type: str = "retrieval_document", title: Optional[str] = None) -> List[float]:
+    """
+    Single-text embedding through the shared pipeline and cache.
+    Returns [] on failure (or without an API key).
+    """
+    return embedding_pipeline.embed([text], task_type=task_type, title=title)[0]
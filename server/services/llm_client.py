@@ -0,0 +1,180 @@
+"""
+Async LLM Client for Intelligent Health Platform
+
+Shared, non-blocking entry point for Gemini calls made from async code.
+Calls go through the SDK's native async methods (generate_content_async,
+send_message_async) so a slow model never blocks the event loop. A
+concurrency bound queues excess calls instead of piling them onto the API,
+and every call has a timeout; cancelling the awaiting request cancels the
+underlying call.
+"""
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+import weakref
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call (including time queued for a slot) exceeded its timeout."""
+
+
+class LLMClient:
+    """
+    Bounded-concurrency async wrapper around Gemini model and chat objects.
+    """
+
+    def __init__(self, max_concurrency: int = 16, timeout: float = 60.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        # asyncio primitives are bound to one event loop; keep a semaphore per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._in_flight = 0
+        # Optional observer(model_name, latency_seconds, error_or_None) called after each model call
+        self.observer: Optional[Callable[[str, float, Optional[BaseException]], None]] = None
+        self._stats = {"calls": 0, "timeouts": 0, "cancelled": 0, "errors": 0, "total_latency": 0.0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _bounded(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore():
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                return await call()
+            finally:
+                self._in_flight -= 1
+                self._stats["total_latency"] += time.perf_counter() - started
+
+    def _observe(self, model_name: Optional[str], started: float, error: Optional[BaseException]):
+        if self.observer is None or not model_name:
+            return
+        try:
+            self.observer(model_name, time.perf_counter() - started, error)
+        except Exception as e:
+            logger.warning(f"LLM observer failed: {e}")
+
+    async def run(self, async_fn: Callable[..., Awaitable[Any]], *args, timeout: Optional[float] = None,
+                  model_name: Optional[str] = None, **kwargs) -> Any:
+        """
+        Awaits async_fn(*args, **kwargs) within the concurrency bound and timeout.
+        Raises LLMTimeoutError on timeout; CancelledError propagates unchanged.
+        Calls made for model_name are reported to the observer.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._stats["calls"] += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._bounded(lambda: async_fn(*args, **kwargs)), timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            logger.warning(f"LLM call timed out after {timeout}s")
+            error = LLMTimeoutError(f"LLM call timed out after {timeout}s")
+            self._observe(model_name, started, error)
+            raise error
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            self._stats["errors"] += 1
+            self._observe(model_name, started, e)
+            raise
+        self._observe(model_name, started, None)
+        return result
+
+    async def generate(self, model, contents, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Non-blocking model.generate_content(contents, **kwargs)."""
+        return await self.run(model.generate_content_async, contents, timeout=timeout,
+                              model_name=getattr(model, "model_name", None), **kwargs)
+
+    async def send_message(self, chat, message, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Non-blocking chat.send_message(message, **kwargs)."""
+        return await self.run(chat.send_message_async, message, timeout=timeout,
+                              model_name=getattr(getattr(chat, "model", None), "model_name", None), **kwargs)
+
+    async def stream_message(self, chat, message, timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Streams chat.send_message(message, stream=True) as text chunks.
+
+        Holds one concurrency slot for the whole stream. The timeout applies to
+        the wait for each chunk rather than the full answer. Chunks are pulled
+        only as fast as the consumer takes them, and closing or cancelling the
+        consumer cancels the upstream generation.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._stats["calls"] += 1
+        semaphore = self._semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise LLMTimeoutError(f"No LLM slot free after {timeout}s")
+        self._in_flight += 1
+        started = time.perf_counter()
+        chunks = None
+        error: Optional[BaseException] = None
+        observe = True
+        try:
+            response = await asyncio.wait_for(chat.send_message_async(message, stream=True, **kwargs), timeout)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+                text = getattr(chunk, "text", "")
+                if text:
+                    yield text
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            logger.warning(f"LLM stream stalled for {timeout}s")
+            error = LLMTimeoutError(f"LLM stream stalled for {timeout}s")
+            raise error
+        except (asyncio.CancelledError, GeneratorExit):
+            self._stats["cancelled"] += 1
+            observe = False # a partial stream says nothing about the model's latency
+            raise
+        except Exception as e:
+            self._stats["errors"] += 1
+            error = e
+            raise
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+            self._in_flight -= 1
+            self._stats["total_latency"] += time.perf_counter() - started
+            semaphore.release()
+            if observe:
+                self._observe(getattr(getattr(chat, "model", None), "model_name", None), started, error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self._stats["calls"]
+        return {
+            "calls": calls,
+            "in_flight": self._in_flight,
+            "timeouts": self._stats["timeouts"],
+            "cancelled": self._stats["cancelled"],
+            "errors": self._stats["errors"],
+            "avg_latency_seconds": round(self._stats["total_latency"] / calls, 4) if calls else 0.0,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout
+        }
+
+
+# Global client instance
+llm_client = LLMClient(max_concurrency=settings.LLM_MAX_CONCURRENCY, timeout=settings.LLM_TIMEOUT_SECONDS)
@@ -0,0 +1,316 @@
+"""
+Patient Context Snapshots for Intelligent Health Platform
+
+Prompt context for a patient (profile, medications, recent records, recent
+vitals) is kept in one PatientContextSnapshot row per patient instead of
+being rebuilt from half a dozen queries on every chat turn. A snapshot is
+built on first use; after that, mapper events patch it in the same
+transaction as the change to a record, vital, medication or profile, so
+readers only need one row. Changes that cannot be applied incrementally
+(deletes, moving a row to another patient) drop the snapshot, and the next
+reader rebuilds it.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import copy
+import logging
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import HealthData, MedicalRecord, Medication, Patient, PatientContextSnapshot
+
+logger = logging.getLogger(__name__)
+
+RECENT_RECORDS = 10
+VITALS_DAYS = 7 # daily vitals buckets kept, the longest window any reader uses
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def profile_dict(patient: Patient) -> Dict[str, Any]:
+    return {
+        "name": patient.name,
+        "dob": patient.dob,
+        "sex": patient.sex,
+        "blood_type": patient.blood_type,
+        "height": patient.height,
+        "weight": patient.weight,
+        "baseline_illnesses": list(patient.baseline_illnesses or []),
+        "allergies": list(patient.allergies or [])
+    }
+
+
+def medication_dict(medication: Medication) -> Dict[str, Any]:
+    return {"id": medication.id, "name": medication.name, "dosage": medication.dosage, "frequency": medication.frequency}
+
+
+def record_dict(record: MedicalRecord) -> Dict[str, Any]:
+    return {
+        "id": record.id,
+        "created_at": _iso(record.created_at),
+        "type": record.type,
+        "title": record.title,
+        "ai_summary": record.ai_summary
+    }
+
+
+def _vital_time(data: HealthData) -> datetime:
+    return data.source_timestamp or data.recorded_at or datetime.utcnow()
+
+
+def _add_vital(latest: Dict[str, Any], daily: Dict[str, Any], data: HealthData):
+    at = _vital_time(data)
+    current = latest.get(data.data_type)
+    if current is None or (current.get("at") or "") <= at.isoformat():
+        latest[data.data_type] = {"value": data.value, "unit": data.unit, "at": at.isoformat()}
+    if data.value is not None:
+        bucket = daily.setdefault(data.data_type, {}).setdefault(at.date().isoformat(), [0.0, 0])
+        bucket[0] += data.value
+        bucket[1] += 1
+
+
+def _prune_daily(daily: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    oldest = (now - timedelta(days=VITALS_DAYS)).date().isoformat()
+    pruned = {}
+    for data_type, days in daily.items():
+        kept = {day: bucket for day, bucket in days.items() if day >= oldest}
+        if kept:
+            pruned[data_type] = kept
+    return pruned
+
+
+class PatientContextService:
+    def build(self, db: Session, patient: Patient) -> PatientContextSnapshot:
+        """Full rebuild from the source tables."""
+        records = db.query(MedicalRecord).filter(MedicalRecord.patient_id == patient.id)\
+            .order_by(MedicalRecord.created_at.desc()).limit(RECENT_RECORDS).all()
+
+        latest, daily = {}, {}
+        if patient.user_id:
+            now = datetime.utcnow()
+            since = datetime.combine((now - timedelta(days=VITALS_DAYS)).date(), datetime.min.time())
+            # Same timestamp _vital_time() buckets by, so a rebuild matches the incremental path
+            taken_at = func.coalesce(HealthData.source_timestamp, HealthData.recorded_at)
+            vitals = db.query(HealthData).filter(HealthData.user_id == patient.user_id, taken_at >= since).all()
+            for data in vitals:
+                _add_vital(latest, daily, data)
+            daily = _prune_daily(daily, now)
+
+        return PatientContextSnapshot(
+            patient_id=patient.id,
+            user_id=patient.user_id,
+            profile=profile_dict(patient),
+            medications=[medication_dict(m) for m in patient.medications],
+            records=[record_dict(r) for r in reversed(records)],
+            vitals_latest=latest,
+            vitals_daily=daily,
+            updated_at=datetime.utcnow()
+        )
+
+    def _store(self, db: Session, patient: Patient) -> PatientContextSnapshot:
+        # A SAVEPOINT, not a commit: the caller's transaction may hold changes of
+        # its own, and the snapshot is kept when (and if) the caller commits
+        snapshot = self.build(db, patient)
+        try:
+            with db.begin_nested():
+                db.add(snapshot)
+        except IntegrityError:
+            # Another request built it first
+            return db.get(PatientContextSnapshot, patient.id)
+        return snapshot
+
+    def get(self, db: Session, patient_id: str) -> Optional[PatientContextSnapshot]:
+        """The snapshot for patient_id, built on first use; None if there is no such patient."""
+        snapshot = db.get(PatientContextSnapshot, patient_id)
+        if snapshot is not None:
+            return snapshot
+        patient = db.get(Patient, patient_id)
+        return self._store(db, patient) if patient else None
+
+    def for_user(self, db: Session, user_id: str) -> Optional[PatientContextSnapshot]:
+        """The snapshot of the patient profile linked to user_id, if any."""
+        snapshot = db.query(PatientContextSnapshot).filter(PatientContextSnapshot.user_id == user_id).first()
+        if snapshot is not None:
+            return snapshot
+        patient = db.query(Patient).filter(Patient.user_id == user_id).first()
+        return self._store(db, patient) if patient else None
+
+    @staticmethod
+    def recent_vitals(snapshot: PatientContextSnapshot, days: int) -> Dict[str, Dict[str, Any]]:
+        """Latest reading of each data type taken within the last `days` days."""
+        since = (datetime.utcnow() - timedelta(days=days)).isoformat()
+        return {t: v for t, v in sorted((snapshot.vitals_latest or {}).items()) if (v.get("at") or "") >= since}
+
+    @staticmethod
+    def vitals_average(snapshot: PatientContextSnapshot, data_type: str, days: int) -> Optional[float]:
+        """Mean of the readings of data_type over the last `days` calendar days."""
+        oldest = (datetime.utcnow() - timedelta(days=days)).date().isoformat()
+        buckets = [b for day, b in (snapshot.vitals_daily or {}).get(data_type, {}).items() if day >= oldest]
+        count = sum(b[1] for b in buckets)
+        return sum(b[0] for b in buckets) / count if count else None
+
+    @staticmethod
+    def recent_records(snapshot: PatientContextSnapshot, limit: int = RECENT_RECORDS) -> List[Dict[str, Any]]:
+        """Most recent records, newest first."""
+        return list(reversed((snapshot.records or [])[-limit:]))
+
+    def chat_context(self, snapshot: Optional[PatientContextSnapshot], vitals_days: int = 3) -> str:
+        """Patient context block injected into chat prompts."""
+        profile_text = ""
+        health_data_text = ""
+        if snapshot is not None:
+            p = snapshot.profile or {}
+            meds = ", ".join(m["name"] for m in (snapshot.medications or []) if m.get("name"))
+            profile_text = f"""
+        Patient Profile:
+        - Name: {p.get('name')}
+        - DOB: {p.get('dob')} | Sex: {p.get('sex')} | Blood: {p.get('blood_type')}
+        - Height: {p.get('height')} cm | Weight: {p.get('weight')} kg
+        - Conditions: {', '.join(p.get('baseline_illnesses') or [])}
+        - Allergies: {', '.join(p.get('allergies') or [])}
+        - Medications: {meds}
+        """
+            vitals = self.recent_vitals(snapshot, vitals_days)
+            if vitals:
+                health_data_text = "\nRecent Health Metrics (Integrations):\n"
+                for data_type, v in vitals.items():
+                    at = datetime.fromisoformat(v["at"]).strftime('%Y-%m-%d %H:%M')
+                    health_data_text += f"- {data_type}: {v['value']} {v['unit']} ({at})\n"
+
+        context_str = profile_text + health_data_text + "\nMedical Records:\n"
+        records = snapshot.records if snapshot is not None else []
+        if records:
+            for r in records:
+                day = r["created_at"][:10] if r.get("created_at") else ""
+                context_str += f"- [{day}] {r['type']} - {r['title']}: {r['ai_summary']}\n"
+        else:
+            context_str += "No uploaded records available."
+        return context_str
+
+
+# Global patient context service instance
+patient_context = PatientContextService()
+
+
+# --- Incremental maintenance (runs inside the flush that changes the source row) ---
+
+_snapshots = PatientContextSnapshot.__table__
+
+
+def _load(connection, patient_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    The snapshot row, locked until the flushing transaction ends: every patch
+    is a read-modify-write, and two transactions patching the same patient
+    must not both start from the same version and drop each other's change.
+    """
+    if not patient_id:
+        return None
+    query = select(_snapshots).where(_snapshots.c.patient_id == patient_id).with_for_update()
+    row = connection.execute(query).mappings().first()
+    return copy.deepcopy(dict(row)) if row else None
+
+
+def _save(connection, patient_id: str, **values):
+    connection.execute(_snapshots.update().where(_snapshots.c.patient_id == patient_id)
+                       .values(updated_at=datetime.utcnow(), **values))
+
+
+def _invalidate(connection, patient_id: Optional[str]):
+    if patient_id:
+        connection.execute(_snapshots.delete().where(_snapshots.c.patient_id == patient_id))
+
+
+def _previous(target, attr: str):
+    """Value of attr before this flush if it changed, else None."""
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else None
+
+
+def _record_changed(mapper, connection, target):
+    moved_from = _previous(target, "patient_id")
+    if moved_from and moved_from != target.patient_id:
+        _invalidate(connection, moved_from)
+    snapshot = _load(connection, target.patient_id)
+    if snapshot is None:
+        return
+    entry = record_dict(target)
+    if entry in (snapshot["records"] or []):
+        return # e.g. only the embedding changed
+    records = [r for r in snapshot["records"] or [] if r["id"] != target.id] + [entry]
+    records.sort(key=lambda r: r.get("created_at") or "")
+    _save(connection, target.patient_id, records=records[-RECENT_RECORDS:])
+
+
+def _record_deleted(mapper, connection, target):
+    snapshot = _load(connection, target.patient_id)
+    if snapshot is not None and any(r["id"] == target.id for r in snapshot["records"] or []):
+        _invalidate(connection, target.patient_id) # an older record has to be backfilled
+
+
+def _medication_changed(mapper, connection, target):
+    moved_from = _previous(target, "patient_id")
+    if moved_from and moved_from != target.patient_id:
+        _invalidate(connection, moved_from)
+    snapshot = _load(connection, target.patient_id)
+    if snapshot is None:
+        return
+    medications = [m for m in snapshot["medications"] or [] if m["id"] != target.id] + [medication_dict(target)]
+    _save(connection, target.patient_id, medications=medications)
+
+
+def _medication_deleted(mapper, connection, target):
+    snapshot = _load(connection, target.patient_id)
+    if snapshot is not None:
+        _save(connection, target.patient_id, medications=[m for m in snapshot["medications"] or [] if m["id"] != target.id])
+
+
+def _patient_changed(mapper, connection, target):
+    moved_from = _previous(target, "user_id")
+    if moved_from and moved_from != target.user_id:
+        _invalidate(connection, target.id) # vitals belong to the old user
+        return
+    snapshot = _load(connection, target.id)
+    if snapshot is not None and (snapshot["profile"] != profile_dict(target) or snapshot["user_id"] != target.user_id):
+        _save(connection, target.id, profile=profile_dict(target), user_id=target.user_id)
+
+
+def _patient_deleted(mapper, connection, target):
+    _invalidate(connection, target.id)
+
+
+def _patient_for_user(connection, user_id: Optional[str]) -> Optional[str]:
+    if not user_id:
+        return None
+    patients = Patient.__table__
+    return connection.execute(select(patients.c.id).where(patients.c.user_id == user_id)).scalar()
+
+
+def _vital_added(mapper, connection, target):
+    patient_id = _patient_for_user(connection, target.user_id)
+    snapshot = _load(connection, patient_id)
+    if snapshot is None:
+        return
+    latest, daily = snapshot["vitals_latest"] or {}, snapshot["vitals_daily"] or {}
+    _add_vital(latest, daily, target)
+    _save(connection, patient_id, vitals_latest=latest, vitals_daily=_prune_daily(daily, datetime.utcnow()))
+
+
+def _vital_changed(mapper, connection, target):
+    _invalidate(connection, _patient_for_user(connection, target.user_id))
+
+
+for _event in ("after_insert", "after_update"):
+    event.listen(MedicalRecord, _event, _record_changed)
+    event.listen(Medication, _event, _medication_changed)
+event.listen(MedicalRecord, "after_delete", _record_deleted)
+event.listen(Medication, "after_delete", _medication_deleted)
+event.listen(Patient, "after_update", _patient_changed)
+event.listen(Patient, "after_delete", _patient_deleted)
+event.listen(HealthData, "after_insert", _vital_added)
+event.listen(HealthData, "after_update", _vital_changed)
+event.listen(HealthData, "after_delete", _vital_changed)
@@ -0,0 +1,232 @@
+"""
+Semantic Response Cache for Intelligent Health Platform
+
+Caches results of idempotent LLM calls (ICD-10 search, diagnosis
+explanations, guideline lookups, domain classification) in two tiers:
+
+1. Exact: keyed by endpoint, model and the normalised prompt.
+2. Semantic: on an exact miss, the prompt embedding is compared with cached
+   prompts of the same endpoint/model; a close enough match is served.
+
+Each endpoint has its own TTL and similarity threshold. The clinical
+endpoints are exact-match only: embeddings put "left" next to "right", "type
+1" next to "type 2" and a finding next to its negation, so a semantic hit can
+be a wrong answer. Where the tier is enabled, a match must also agree on the
+prompt's numbers, laterality and negations. Prompts carrying patient
+identifiers are never cached (or embedded for lookup).
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import copy
+import hashlib
+import logging
+import re
+import time
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (ttl seconds, semantic similarity threshold or None to disable the tier)
+ENDPOINT_POLICIES: Dict[str, Tuple[int, Optional[float]]] = {
+    "search_icd10": (7 * 86400, None),
+    "find_guidelines": (7 * 86400, None),
+    "classify_domain": (86400, None),
+    "explain_diagnosis": (86400, None),
+}
+DEFAULT_POLICY: Tuple[int, Optional[float]] = (3600, None)
+
+# Structured patient identifiers. Free-text names cannot be detected reliably;
+# callers handling such prompts should pass phi=True.
+PHI_PATTERNS = [
+    re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b"), # email
+    re.compile(r"\b\d{3}-\d{2}-\d{4}\b"), # SSN
+    re.compile(r"(?:\+\d{1,3}[\s.-]?)?\(?\d{3}\)?[\s.-]\d{3}[\s.-]\d{4}\b"), # phone
+    re.compile(r"\b(?:mrn|medical record (?:no|number)|patient id|dob|date of birth)\b\W{0,3}\w", re.IGNORECASE),
+    re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE), # record/user UUIDs
+]
+
+_WS_RE = re.compile(r"\s+")
+# Tokens that change a clinical answer while barely moving the embedding
+_SIGNATURE_RE = re.compile(
+    r"\d+(?:\.\d+)?|\b(?:left|right|bilateral|unilateral|upper|lower|"
+    r"no|not|non|without|denies|denied|negative|absent|free of|rule out|r/o)\b"
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt, used for exact keys."""
+    return _WS_RE.sub(" ", prompt).strip().lower()
+
+
+def clinical_signature(prompt: str) -> Tuple[str, ...]:
+    """Numbers, laterality and negation tokens of a normalised prompt, in order."""
+    return tuple(_SIGNATURE_RE.findall(prompt))
+
+
+def contains_phi(prompt: str) -> bool:
+    return any(p.search(prompt) for p in PHI_PATTERNS)
+
+
+def _default_embed(text: str) -> List[float]:
+    if not settings.GEMINI_API_KEY:
+        return []
+    from .embedding_pipeline import embedding_pipeline
+    return embedding_pipeline.embed([text], task_type="semantic_similarity")[0]
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "namespace", "vector", "signature")
+
+    def __init__(self, value: Any, expires_at: float, namespace: str, vector: Optional[np.ndarray],
+                 signature: Tuple[str, ...] = ()):
+        self.value = value
+        self.expires_at = expires_at
+        self.namespace = namespace
+        self.vector = vector
+        self.signature = signature
+
+
+class SemanticResponseCache:
+    """
+    LRU of LLM results with an embedding-similarity fallback tier.
+    Meant to be used from the event loop only (no locking).
+    """
+
+    def __init__(self, max_items: int = 2000, embed_fn: Callable[[str], List[float]] = _default_embed,
+                 policies: Optional[Dict[str, Tuple[int, Optional[float]]]] = None, enabled: bool = True):
+        self.max_items = max_items
+        self.embed_fn = embed_fn
+        self.policies = dict(ENDPOINT_POLICIES if policies is None else policies)
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # namespace -> key -> unit vector, for the semantic tier
+        self._vectors: Dict[str, "OrderedDict[str, np.ndarray]"] = {}
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "phi_skips": 0,
+                       "stores": 0, "evictions": 0, "expired": 0}
+        self._by_endpoint: Dict[str, Dict[str, int]] = {}
+
+    def policy(self, endpoint: str) -> Tuple[int, Optional[float]]:
+        return self.policies.get(endpoint, DEFAULT_POLICY)
+
+    def _count(self, endpoint: str, stat: str):
+        self._stats[stat] += 1
+        counters = self._by_endpoint.setdefault(endpoint, {"hits": 0, "misses": 0, "phi_skips": 0})
+        if stat.endswith("hits"):
+            counters["hits"] += 1
+        elif stat in counters:
+            counters[stat] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.vector is not None:
+            self._vectors.get(entry.namespace, {}).pop(key, None)
+
+    def _lookup_exact(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _lookup_semantic(self, namespace: str, vector: np.ndarray, threshold: float,
+                         signature: Tuple[str, ...]) -> Optional[_Entry]:
+        candidates = self._vectors.get(namespace)
+        if not candidates:
+            return None
+        keys = list(candidates.keys())
+        similarities = np.stack(list(candidates.values())) @ vector
+        for i in np.argsort(-similarities):
+            if similarities[i] < threshold:
+                return None
+            entry = self._lookup_exact(keys[i])
+            if entry is not None and entry.signature == signature:
+                return entry
+        return None
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Response cache embedding failed: {e}")
+            return None
+        norm = np.linalg.norm(vector) if vector.size else 0.0
+        return vector / norm if norm else None
+
+    def _store(self, key: str, namespace: str, value: Any, ttl: int, vector: Optional[np.ndarray],
+               signature: Tuple[str, ...] = ()):
+        self._remove(key)
+        while len(self._entries) >= self.max_items:
+            oldest, _ = next(iter(self._entries.items()))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+        self._entries[key] = _Entry(value, time.time() + ttl, namespace, vector, signature)
+        if vector is not None:
+            self._vectors.setdefault(namespace, OrderedDict())[key] = vector
+        self._stats["stores"] += 1
+
+    async def get_or_generate(self, endpoint: str, model: str, prompt: str,
+                              generate: Callable[[], Awaitable[Any]], phi: bool = False) -> Any:
+        """
+        Returns the cached result for (endpoint, model, prompt) or awaits
+        generate() and caches what it returns. Exceptions are not cached.
+        phi=True (or identifiers detected in the prompt) bypasses the cache.
+        """
+        if not self.enabled:
+            return await generate()
+        if phi or contains_phi(prompt):
+            self._count(endpoint, "phi_skips")
+            return await generate()
+
+        ttl, threshold = self.policy(endpoint)
+        normalized = normalize_prompt(prompt)
+        namespace = f"{endpoint}|{model}"
+        key = hashlib.sha256(f"{namespace}|{normalized}".encode("utf-8")).hexdigest()
+
+        entry = self._lookup_exact(key)
+        if entry is not None:
+            self._count(endpoint, "exact_hits")
+            return copy.deepcopy(entry.value)
+
+        vector = None
+        signature = clinical_signature(normalized)
+        if threshold is not None:
+            # Embedding is a blocking network call; keep it off the event loop
+            vector = await asyncio.to_thread(self._embed, normalized)
+            if vector is not None:
+                entry = self._lookup_semantic(namespace, vector, threshold, signature)
+                if entry is not None:
+                    self._count(endpoint, "semantic_hits")
+                    return copy.deepcopy(entry.value)
+
+        self._count(endpoint, "misses")
+        value = await generate()
+        self._store(key, namespace, copy.deepcopy(value), ttl, vector, signature)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+
+    def get_stats(self) -> dict:
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_size": self.max_items,
+            "hit_rate": f"{(hits / lookups * 100) if lookups else 0:.1f}%",
+            "endpoints": {name: dict(counters) for name, counters in self._by_endpoint.items()}
+        }
+
+
+# Global response cache instance
+response_cache = SemanticResponseCache(enabled=settings.RESPONSE_CACHE_ENABLED)
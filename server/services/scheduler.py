@@ -8,6 +8,8 @@ from .integrations.manager import IntegrationManager
 
 logger = logging.getLogger("scheduler")
 
+STATS_ROLLUP_INTERVAL = 300 # seconds between admin stats rollup refreshes
+
 async def start_scheduler():
     """
     Background task to run periodic jobs.
@@ -15,12 +17,18 @@ async def start_scheduler():
     logger.info("Scheduler started.")
     print("SCHEDULER: Background service started.")
     
+    # Run every 60 minutes
+    # For demo purposes, we might want it faster, but let's stick to 60m
+    await asyncio.gather(
+        run_every(3600, run_periodic_sync),
+        run_every(STATS_ROLLUP_INTERVAL, run_stats_rollup)
+    )
+
+async def run_every(interval: float, job):
     while True:
         try:
-            # Run every 60 minutes
-            # For demo purposes, we might want it faster, but let's stick to 60m
-            await run_periodic_sync()
-            await asyncio.sleep(3600) 
+            await job()
+            await asyncio.sleep(interval)
         except asyncio.CancelledError:
             logger.info("Scheduler cancelled.")
             break
@@ -41,6 +49,22 @@ async def run_periodic_sync():
     except Exception as e:
          print(f"SCHEDULER: Job Error: {e}")
 
+async def run_stats_rollup():
+    loop = asyncio.get_event_loop()
+    try:
+        rows = await loop.run_in_executor(None, refresh_stats_rollup_sync)
+        logger.info(f"Stats rollup refreshed ({rows} rows)")
+    except Exception as e:
+        print(f"SCHEDULER: Stats rollup error: {e}")
+
+def refresh_stats_rollup_sync() -> int:
+    from .stats_rollup import stats_rollup
+    db = SessionLocal()
+    try:
+        return stats_rollup.refresh(db)
+    finally:
+        db.close()
+
 def sync_health_integrations_sync() -> bool:
     """
     Synchronous wrapper for integration sync.
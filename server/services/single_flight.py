@@ -0,0 +1,71 @@
+"""
+Single-Flight Request Coalescing for Intelligent Health Platform
+
+Concurrent callers asking for the same thing (same key) share one in-flight
+generation instead of each starting their own. Nothing is kept once the
+flight lands: the next caller after completion starts a fresh one.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        # asyncio tasks belong to one event loop; keep the in-flight table per loop
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = weakref.WeakKeyDictionary()
+        self._stats = {"flights": 0, "coalesced": 0, "abandoned": 0}
+
+    def _table(self) -> Dict[Hashable, _Flight]:
+        loop = asyncio.get_running_loop()
+        table = self._flights.get(loop)
+        if table is None:
+            table = self._flights[loop] = {}
+        return table
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the result of fn(), run at most once at a time per key.
+        A caller that goes away (cancellation) does not cancel the flight for
+        the others; the flight is cancelled only when every caller has gone.
+        """
+        table = self._table()
+        flight = table.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            table[key] = flight
+            flight.task.add_done_callback(lambda _: table.pop(key, None) if table.get(key) is flight else None)
+            self._stats["flights"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                self._stats["abandoned"] += 1
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self) -> int:
+        return sum(len(table) for table in self._flights.values())
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "in_flight": self.in_flight()}
+
+
+# Global single-flight instance
+single_flight = SingleFlight()
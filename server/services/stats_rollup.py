@@ -0,0 +1,168 @@
+"""
+Admin Statistics Rollup for Intelligent Health Platform
+
+The admin dashboard reads pre-aggregated daily counters (StatsRollup) instead
+of counting users, cases, records and system logs on every request. The
+scheduler refreshes the rollup every few minutes.
+
+SystemLog counters are maintained incrementally: a refresh only recounts the
+days from the last rolled-up day onwards (a range on the indexed
+system_logs.timestamp), so its cost follows recent log volume, not the size
+of the table. Records, cases and users grow with platform data rather than
+traffic and are snapshotted with one GROUP BY each.
+
+Every worker runs the scheduler, so refreshes can overlap. A refresh is one
+transaction: on PostgreSQL it first takes a transaction-scoped advisory lock
+and skips the round if another worker holds it, and rows are written with an
+upsert, so a refresh racing one it could not see (SQLite, inline refreshes)
+overwrites counters instead of failing on the primary key.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import Case, MedicalRecord, StatsRollup, SystemLog, User
+
+HISTORY_DAYS = 7
+IMAGE_TYPES = ["Imaging", "CT", "X-Ray", "MRI"]
+DOCUMENT_TYPES = ["Report", "Lab", "Prescription", "Discharge Summary"]
+ACTIVE_CASE_STATUSES = ["Open", "Under Review"]
+SNAPSHOT_DIMENSIONS = ["record_type", "case_status", "total"]
+# pg_try_advisory_xact_lock key serialising refreshes across workers
+REFRESH_LOCK_KEY = 0x53544154 # "STAT"
+
+
+def _day(value) -> date:
+    # func.date() gives a string on SQLite and a date on PostgreSQL
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _try_lock(db: Session) -> bool:
+    """False if another worker is refreshing; the lock is released when the transaction ends."""
+    if _dialect(db) != "postgresql":
+        return True # SQLite serialises writers itself
+    return bool(db.execute(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_KEY))).scalar())
+
+
+def _upsert(db: Session, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    dialect = _dialect(db)
+    if dialect not in ("postgresql", "sqlite"):
+        for row in rows:
+            db.merge(StatsRollup(**row))
+        return
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(StatsRollup).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[StatsRollup.day, StatsRollup.dimension, StatsRollup.key],
+        set_={"count": statement.excluded.count, "updated_at": statement.excluded.updated_at}
+    ))
+
+
+class StatsRollupService:
+    def __init__(self):
+        self._stats = {"refreshes": 0, "skipped_refreshes": 0, "inline_refreshes": 0, "last_refresh": None}
+
+    def refresh(self, db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Brings the rollup up to date; returns the number of rows written (0 if
+        another worker was already refreshing).
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+
+        if not _try_lock(db):
+            db.rollback()
+            self._stats["skipped_refreshes"] += 1
+            return 0
+
+        # Recount from the last rolled-up day onwards, it was probably partial
+        since = db.query(func.max(StatsRollup.day)).filter(StatsRollup.dimension == "event_type").scalar()
+        since = _day(since) if since is not None else None
+        log_day = func.date(SystemLog.timestamp)
+        query = db.query(log_day, SystemLog.event_type, func.count()).filter(SystemLog.timestamp.isnot(None))
+        if since is not None:
+            query = query.filter(SystemLog.timestamp >= datetime.combine(since, datetime.min.time()))
+        events: Dict[tuple, int] = {}
+        for day, event_type, count in query.group_by(log_day, SystemLog.event_type):
+            key = (_day(day), event_type or "")
+            events[key] = events.get(key, 0) + count
+
+        stale = db.query(StatsRollup).filter(StatsRollup.dimension == "event_type")
+        if since is not None:
+            stale = stale.filter(StatsRollup.day >= since)
+        stale.delete(synchronize_session=False)
+        db.query(StatsRollup).filter(
+            StatsRollup.day == today, StatsRollup.dimension.in_(SNAPSHOT_DIMENSIONS)
+        ).delete(synchronize_session=False)
+
+        rows = [dict(day=day, dimension="event_type", key=key, count=count, updated_at=now)
+                for (day, key), count in events.items()]
+        for record_type, count in db.query(MedicalRecord.type, func.count()).group_by(MedicalRecord.type):
+            rows.append(dict(day=today, dimension="record_type", key=record_type or "", count=count, updated_at=now))
+        for status, count in db.query(Case.status, func.count()).group_by(Case.status):
+            rows.append(dict(day=today, dimension="case_status", key=status or "", count=count, updated_at=now))
+        _upsert(db, rows)
+
+        logs_total = db.query(func.coalesce(func.sum(StatsRollup.count), 0)).filter(StatsRollup.dimension == "event_type").scalar()
+        totals = {"users": db.query(func.count(User.id)).scalar(), "system_logs": int(logs_total)}
+        _upsert(db, [dict(day=today, dimension="total", key=key, count=count, updated_at=now)
+                     for key, count in totals.items()])
+        db.commit()
+
+        self._stats["refreshes"] += 1
+        self._stats["last_refresh"] = now.isoformat()
+        return len(rows) + len(totals)
+
+    def admin_stats(self, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Counters for the admin dashboard from one range read of the rollup."""
+        now = now or datetime.utcnow()
+        today = now.date()
+        first = today - timedelta(days=HISTORY_DAYS - 1)
+
+        rows = db.query(StatsRollup).filter(StatsRollup.day >= first).all()
+        if not any(r.dimension == "total" for r in rows):
+            # Never refreshed (or the scheduler has been down for a week)
+            self._stats["inline_refreshes"] += 1
+            self.refresh(db, now)
+            rows = db.query(StatsRollup).filter(StatsRollup.day >= first).all()
+
+        events: Dict[tuple, int] = {}
+        snapshot: Dict[str, Dict[str, int]] = {}
+        # Snapshot dimensions are written together; read them from the latest refresh
+        latest = max((r.day for r in rows if r.dimension == "total"), default=None)
+        for r in rows:
+            if r.dimension == "event_type":
+                events[(r.day, r.key)] = r.count
+            elif r.day == latest:
+                snapshot.setdefault(r.dimension, {})[r.key] = r.count
+
+        records = snapshot.get("record_type", {})
+        cases = snapshot.get("case_status", {})
+        totals = snapshot.get("total", {})
+        return {
+            "total_users": totals.get("users", 0),
+            "active_cases": sum(cases.get(s, 0) for s in ACTIVE_CASE_STATUSES),
+            "ai_queries_today": events.get((today, "ai_query"), 0),
+            "ai_queries_by_day": [(first + timedelta(days=i), events.get((first + timedelta(days=i), "ai_query"), 0))
+                                  for i in range(HISTORY_DAYS)],
+            "medical_images": sum(records.get(t, 0) for t in IMAGE_TYPES),
+            "patient_documents": sum(records.get(t, 0) for t in DOCUMENT_TYPES),
+            "system_logs": totals.get("system_logs", 0)
+        }
+
+    def get_stats(self) -> dict:
+        return dict(self._stats)
+
+
+# Global stats rollup instance
+stats_rollup = StatsRollupService()
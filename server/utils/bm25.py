@@ -0,0 +1,115 @@
+import math
+import re
+import heapq
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Very common English words carry no retrieval signal and bloat postings
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its me my of on or our
+so that the their them then there these they this to was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring.
+
+    Documents can be added or removed one at a time; corpus statistics
+    (document frequencies, average length) are kept up to date so no
+    rebuild is needed.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_len: Dict[Hashable, int] = {}
+        self._doc_terms: Dict[Hashable, Counter] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self.doc_len
+
+    def add(self, doc_id: Hashable, text: str):
+        if doc_id in self.doc_len:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self.doc_len[doc_id] = length
+        self._total_len += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def add_many(self, docs: Iterable[Tuple[Hashable, str]]):
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: Hashable):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_len -= self.doc_len.pop(doc_id)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query: str, n_results: Optional[int] = 10) -> List[Tuple[Hashable, float]]:
+        """
+        Returns (doc_id, score) pairs, best first. Only documents sharing at
+        least one query term are scored. n_results=None returns all matches.
+        """
+        n_docs = len(self.doc_len)
+        if n_docs == 0:
+            return []
+        avg_len = self._total_len / n_docs if self._total_len else 1.0
+
+        scores: Dict[Hashable, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+        if n_results is None:
+            return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return heapq.nlargest(n_results, scores.items(), key=lambda x: x[1])
+
+
+def reciprocal_rank_fusion(result_lists: List[List[tuple]], k: int = 60) -> List[tuple]:
+    """
+    Fuses ranked (text, metadata, score) lists by reciprocal rank.
+    Returns (text, metadata, fused_score) best first, with scores min-max
+    scaled over the candidates: the top hit is 1.0 and the weakest 0.0. Raw
+    1/(k + rank) values differ by ~1.6% between adjacent ranks at k=60, which
+    would leave the recency term of re-ranking to decide the order.
+    """
+    fused: Dict[str, float] = {}
+    meta_by_text: Dict[str, dict] = {}
+    for results in result_lists:
+        for rank, (text, meta, _) in enumerate(results):
+            fused[text] = fused.get(text, 0.0) + 1.0 / (k + rank + 1)
+            meta_by_text.setdefault(text, meta)
+    if not fused:
+        return []
+    top, bottom = max(fused.values()), min(fused.values())
+    spread = top - bottom
+    ranked = sorted(fused.items(), key=lambda x: x[1], reverse=True)
+    return [(text, meta_by_text[text], (score - bottom) / spread if spread else 1.0) for text, score in ranked]
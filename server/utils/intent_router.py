@@ -0,0 +1,97 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .bm25 import tokenize
+
+
+class RouteMatch(NamedTuple):
+    label: str
+    confidence: float
+    payload: Dict[str, Any]
+    method: str # "rule" or "nearest"
+
+
+class IntentRule(NamedTuple):
+    pattern: "re.Pattern"
+    label: str
+    payload: Dict[str, Any] # static payload; named groups of the pattern are added to it
+
+
+def _stem(token: str) -> str:
+    """Crude suffix stripping so 'guidelines'/'guideline' or 'interactions'/'interaction' meet."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def route_terms(text: str) -> List[str]:
+    # Label names like 'analyze_labs' should match 'analyze labs'
+    return [_stem(t) for t in tokenize(text.replace("_", " "))]
+
+
+class LocalIntentRouter:
+    """
+    Deterministic, in-process intent classifier used before any LLM router.
+
+    Stage 1: regex rules, checked in order; a hit is certain (confidence 1.0).
+    Stage 2: nearest neighbour over TF-IDF vectors of each label's example
+    text, accepted only when the best cosine similarity clears min_confidence
+    and beats the runner-up by min_margin, and the query shares at least
+    min_terms distinct terms with the vocabulary. Anything else returns None,
+    and the caller falls back to its LLM.
+    """
+
+    def __init__(self, examples: Dict[str, str], rules: Iterable[Tuple[str, str, Dict[str, Any]]] = (),
+                 min_confidence: float = 0.35, min_margin: float = 0.1, min_terms: int = 2):
+        self.rules = [IntentRule(re.compile(p, re.IGNORECASE), label, payload or {}) for p, label, payload in rules]
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.min_terms = min_terms
+        self.labels = list(examples.keys())
+
+        docs = [Counter(route_terms(f"{label} {text}")) for label, text in examples.items()]
+        df = Counter(term for doc in docs for term in doc)
+        self.vocab = {term: i for i, term in enumerate(df)}
+        n = max(len(docs), 1)
+        self.idf = np.array([math.log((1 + n) / (1 + df[t])) + 1.0 for t in self.vocab], dtype=np.float32)
+        self.matrix = np.stack([self._vector(doc) for doc in docs]) if docs else np.zeros((0, len(self.vocab)), dtype=np.float32)
+
+    def _vector(self, terms: Counter) -> np.ndarray:
+        vector = np.zeros(len(self.vocab), dtype=np.float32)
+        for term, tf in terms.items():
+            i = self.vocab.get(term)
+            if i is not None:
+                vector[i] = (1.0 + math.log(tf)) * self.idf[i]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def match_rule(self, query: str) -> Optional[RouteMatch]:
+        for rule in self.rules:
+            m = rule.pattern.search(query)
+            if m:
+                payload = dict(rule.payload)
+                payload.update({k: v.strip() for k, v in m.groupdict().items() if v})
+                return RouteMatch(rule.label, 1.0, payload, "rule")
+        return None
+
+    def nearest(self, query: str) -> Optional[RouteMatch]:
+        if not self.labels:
+            return None
+        terms = Counter(route_terms(query))
+        if sum(1 for t in terms if t in self.vocab) < self.min_terms:
+            return None
+        scores = self.matrix @ self._vector(terms)
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+        if best < self.min_confidence or best - runner_up < self.min_margin:
+            return None
+        return RouteMatch(self.labels[order[0]], best, {"query": query}, "nearest")
+
+    def route(self, query: str) -> Optional[RouteMatch]:
+        return self.match_rule(query) or self.nearest(query)
@@ -0,0 +1,113 @@
+"""
+Keyset Pagination for Intelligent Health Platform
+
+List endpoints page on (sort column, id) instead of OFFSET. The cursor
+carries the key of the last row served and the next page starts strictly
+after it, so any page is one index seek plus `limit` rows, however deep.
+Cursors are opaque to clients (URL-safe base64 JSON) and only meaningful for
+the ordering that produced them.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, List, Optional
+import base64
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(HTTPException):
+    """A cursor that was not produced by encode_cursor; surfaces as a 400."""
+
+    def __init__(self, cursor: str):
+        super().__init__(status_code=400, detail=f"Invalid cursor: {cursor!r}")
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(key: tuple) -> str:
+    raw = json.dumps([_dump(v) for v in key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return tuple(_load(v) for v in json.loads(raw))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+class Keyset:
+    """
+    Keyset pagination over (sort_column, id_column), newest first by default.
+
+        keyset = Keyset(Case.created_at, Case.id)
+        rows = db.execute(keyset.apply(select(Case), cursor, limit)).scalars().all()
+        page = keyset.page(rows, limit)
+
+    apply() works on both select() statements and legacy Query objects.
+    Rows whose sort column is NULL are never returned past the first page, so
+    sort on a column that is always set.
+    """
+
+    def __init__(self, sort_column, id_column, descending: bool = True):
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+
+    def apply(self, query, cursor: Optional[str], limit: int):
+        key = tuple_(self.sort_column, self.id_column)
+        if cursor:
+            after = decode_cursor(cursor)
+            if len(after) != 2:
+                raise InvalidCursor(cursor)
+            after = tuple_(literal(after[0], self.sort_column.type), literal(after[1], self.id_column.type))
+            query = query.where(key < after if self.descending else key > after)
+        if self.descending:
+            query = query.order_by(self.sort_column.desc(), self.id_column.desc())
+        else:
+            query = query.order_by(self.sort_column.asc(), self.id_column.asc())
+        # One extra row tells whether there is a next page
+        return query.limit(limit + 1)
+
+    def key(self, row) -> tuple:
+        return (getattr(row, self.sort_column.key), getattr(row, self.id_column.key))
+
+    def page(self, rows: List[Any], limit: int) -> Page:
+        rows = list(rows)
+        if len(rows) <= limit:
+            return Page(items=rows)
+        items = rows[:limit]
+        return Page(items=items, next_cursor=encode_cursor(self.key(items[-1])))
+
+
+def set_next_cursor(response: Response, page: Page):
+    """List endpoints that return a bare JSON array carry the cursor in a header."""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .bm25 import tokenize
+
+SECONDS_PER_DAY = 86400.0
+
+# Recency decay curves: "linear" (1.0 today -> 0.0 at horizon_days, the original
+# behaviour), "exponential" (halves every half_life_days) or "none".
+DECAY_CURVES = ("linear", "exponential", "none")
+
+
+def epoch_timestamp(meta: Optional[Dict[str, Any]]) -> float:
+    """
+    Ingest time of a chunk as epoch seconds. New chunks carry 'ts'; older
+    ones only have the ISO 'timestamp' (naive UTC). NaN when unknown.
+    """
+    if not meta:
+        return float("nan")
+    ts = meta.get("ts")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    iso = meta.get("timestamp")
+    if isinstance(iso, str):
+        try:
+            parsed = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except ValueError:
+            pass
+    return float("nan")
+
+
+def recency_scores(timestamps: np.ndarray, now: Optional[float] = None, decay: str = "linear",
+                   horizon_days: float = 365.0, half_life_days: float = 90.0) -> np.ndarray:
+    """Maps epoch timestamps to [0, 1] recency scores; unknown timestamps score 0."""
+    if decay not in DECAY_CURVES:
+        raise ValueError(f"Unknown decay curve '{decay}'. Expected one of {DECAY_CURVES}")
+    if decay == "none":
+        return np.zeros(len(timestamps))
+    now = time.time() if now is None else now
+    age_days = np.maximum(0.0, (now - timestamps) / SECONDS_PER_DAY)
+    if decay == "linear":
+        scores = np.clip(1.0 - np.floor(age_days) / horizon_days, 0.0, 1.0)
+    else:
+        scores = np.power(0.5, age_days / half_life_days)
+    return np.nan_to_num(scores, nan=0.0)
+
+
+def _text_similarity_matrix(texts: List[str]) -> np.ndarray:
+    """Cosine similarity between candidates' bag-of-words vectors."""
+    vocab: Dict[str, int] = {}
+    rows = []
+    for text in texts:
+        rows.append([vocab.setdefault(t, len(vocab)) for t in set(tokenize(text))])
+    matrix = np.zeros((len(texts), max(len(vocab), 1)), dtype=np.float32)
+    for i, cols in enumerate(rows):
+        matrix[i, cols] = 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1.0, norms)
+    return matrix @ matrix.T
+
+
+def mmr_select(relevance: np.ndarray, similarity: np.ndarray, n_results: int, mmr_lambda: float) -> List[int]:
+    """
+    Maximal Marginal Relevance: greedily picks the candidate maximising
+    lambda * relevance - (1 - lambda) * max similarity to those already picked.
+    """
+    n = len(relevance)
+    selected: List[int] = []
+    max_sim = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(n_results, n)):
+        mmr = mmr_lambda * relevance - (1.0 - mmr_lambda) * max_sim
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        available[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+    return selected
+
+
+def rerank(candidates: List[tuple], n_results: int, similarity_weight: float = 0.7, recency_weight: float = 0.3,
+           decay: str = "linear", horizon_days: float = 365.0, half_life_days: float = 90.0,
+           mmr_lambda: Optional[float] = None, now: Optional[float] = None) -> List[str]:
+    """
+    Re-ranks (text, metadata, similarity) candidates by
+    similarity_weight * similarity + recency_weight * recency, computed as array ops.
+    Without mmr_lambda exact duplicate texts are dropped; with it, MMR picks a
+    diverse top n_results instead.
+    """
+    if not candidates:
+        return []
+    texts = [c[0] for c in candidates]
+    similarity = np.fromiter((c[2] for c in candidates), dtype=np.float64, count=len(candidates))
+    timestamps = np.fromiter((epoch_timestamp(c[1]) for c in candidates), dtype=np.float64, count=len(candidates))
+
+    scores = similarity_weight * similarity + recency_weight * recency_scores(
+        timestamps, now=now, decay=decay, horizon_days=horizon_days, half_life_days=half_life_days
+    )
+
+    if mmr_lambda is not None:
+        order = mmr_select(scores, _text_similarity_matrix(texts), n_results, mmr_lambda)
+        return [texts[i] for i in order]
+
+    # Stable sort keeps the store's order for ties, like the previous list.sort
+    order = np.argsort(-scores, kind="stable")
+    seen = set()
+    final_texts = []
+    for i in order:
+        if texts[i] not in seen:
+            final_texts.append(texts[i])
+            seen.add(texts[i])
+        if len(final_texts) >= n_results:
+            break
+    return final_texts
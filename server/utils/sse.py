@@ -0,0 +1,62 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+try:
+    from sse_starlette.sse import EventSourceResponse
+    sse_starlette_available = True
+except ImportError:
+    sse_starlette_available = False
+
+# Keep-alive comment interval, so idle proxies don't drop slow streams
+PING_SECONDS = 15
+
+
+def sse_event(event: str, data: Any) -> Dict[str, str]:
+    return {"event": event, "data": json.dumps(data)}
+
+
+def format_sse(message: Dict[str, str]) -> str:
+    """Wire format of one event (used when sse-starlette is not installed)."""
+    lines = [f"event: {message['event']}"] if message.get("event") else []
+    lines += [f"data: {line}" for line in message.get("data", "").splitlines() or [""]]
+    return "\n".join(lines) + "\n\n"
+
+
+async def _until_disconnect(request: Optional[Request], events: AsyncIterator[Dict[str, str]]) -> AsyncIterator[Dict[str, str]]:
+    """
+    Pulls the next event only after the previous one was handed to the
+    server (natural backpressure) and stops, closing `events` and thus the
+    upstream generation, once the client has gone away.
+    """
+    try:
+        async for message in events:
+            if request is not None and await request.is_disconnected():
+                break
+            yield message
+    finally:
+        await events.aclose()
+
+
+def sse_response(events: AsyncIterator[Dict[str, str]], request: Optional[Request] = None) -> StreamingResponse:
+    """
+    Server-sent events response for an async iterator of sse_event() dicts.
+    Uses sse-starlette (pings, disconnect handling) when installed.
+    """
+    stream = _until_disconnect(request, events)
+    if sse_starlette_available:
+        return EventSourceResponse(stream, ping=PING_SECONDS)
+
+    async def body():
+        try:
+            async for message in stream:
+                yield format_sse(message)
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(body(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # disable nginx/Cloud Run proxy buffering
+    })
@@ -1,77 +1,189 @@
 import re
-from typing import List
+import hashlib
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Union, IO
+
+
+def content_hash(text: str) -> str:
+    """
+    Stable digest of a chunk's exact text, used as the dedup key in vector stores.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def word_token_count(text: str) -> int:
+    """Cheap tokenizer stand-in: counts whitespace-separated words."""
+    return len(text.split())
+
+
+class TextChunk(NamedTuple):
+    text: str
+    start: int # character offset into the source (inclusive)
+    end: int # character offset into the source (exclusive)
+    index: int
+
+
+TextSource = Union[str, IO[str], Iterable[str]]
+
 
 class TextSplitter:
     """
     Utility for splitting text into overlapping chunks for RAG.
     """
-    
+
+    SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+    # Unconsumed input kept while streaming; a cut is forced at the best
+    # available separator once the buffer grows past this.
+    MAX_BUFFER_CHARS = 65536
+    READ_BLOCK_CHARS = 65536
+
     @staticmethod
     def recursive_split(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """
-        Splits text recursively by separators (paragraphs, newlines, sentences).
+        Splits text recursively by separators (paragraphs, newlines, sentences),
+        with up to `overlap` characters repeated between consecutive chunks.
         """
         if not text: return []
-        
-        separators = ["\n\n", "\n", ". ", " ", ""]
-        final_chunks = []
-        
-        # Simple recursive strategy
-        def _split(current_text: str, current_seps: List[str]):
-            if len(current_text) <= chunk_size:
-                final_chunks.append(current_text)
-                return
-
-            if not current_seps:
-                # No more separators, force split
-                for i in range(0, len(current_text), chunk_size - overlap):
-                    final_chunks.append(current_text[i:i + chunk_size])
-                return
-
-            sep = current_seps[0]
-            next_seps = current_seps[1:]
-            
-            # Split by current separator
-            if sep == "":
-                # Character split
-                splits = list(current_text)
-                sep = "" # Ensure re-join works or logic handles it
-            else:
-                splits = current_text.split(sep)
-            
-            # Re-assemble nicely
-            current_chunk = []
-            current_len = 0
-            
-            for s in splits:
-                s_len = len(s)
-                if current_len + s_len > chunk_size:
-                    # Flush current chunk
-                    if current_chunk:
-                        joined = sep.join(current_chunk)
-                        if len(joined) > chunk_size:
-                            # If single chunk is too big, recurse
-                            _split(joined, next_seps)
-                        else:
-                            final_chunks.append(joined)
-                        
-                        # Start new chunk, keeping some overlap if possible (simplified here: just reset)
-                        current_chunk = []
-                        current_len = 0
-                
-                current_chunk.append(s)
-                current_len += s_len
-            
-            # Flush remainder
-            if current_chunk:
-                joined = sep.join(current_chunk)
-                if len(joined) > chunk_size:
-                    _split(joined, next_seps)
+        return [c.text for c in TextSplitter.stream_split(text, chunk_size=chunk_size, overlap=overlap)]
+
+    @staticmethod
+    def _iter_source(source: TextSource) -> Iterator[str]:
+        if isinstance(source, str):
+            yield source
+        elif hasattr(source, "read"):
+            yield from iter(lambda: source.read(TextSplitter.READ_BLOCK_CHARS), "")
+        else:
+            yield from source
+
+    @staticmethod
+    def _iter_blocks(source: TextSource) -> Iterator[str]:
+        """
+        Re-blocks streamed input so every block ends on the strongest separator
+        available; only the unfinished tail is buffered.
+        """
+        buffer = ""
+        for piece in TextSplitter._iter_source(source):
+            buffer += piece
+            while buffer:
+                cut = buffer.rfind("\n\n")
+                if cut != -1:
+                    cut += 2
+                elif len(buffer) > TextSplitter.MAX_BUFFER_CHARS:
+                    for sep in TextSplitter.SEPARATORS[1:-1]:
+                        cut = buffer.rfind(sep)
+                        if cut != -1:
+                            cut += len(sep)
+                            break
+                    if cut == -1:
+                        cut = len(buffer)
                 else:
-                    final_chunks.append(joined)
+                    break
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+        if buffer:
+            yield buffer
+
+    @staticmethod
+    def _units(text: str, chunk_size: int, length: Callable[[str], int], separators: List[str],
+               overlap: int = 0) -> Iterator[str]:
+        """
+        Yields consecutive pieces of `text` (separators kept, so they join back to
+        the exact input), each within chunk_size where possible. Hard-split pieces
+        stop `overlap` short of chunk_size so a carried tail still fits beside them.
+        """
+        if length(text) <= chunk_size:
+            yield text
+            return
+        if not separators or separators[0] == "":
+            # Hard split: slice proportionally to the measured length
+            step = max(1, len(text) * (chunk_size - overlap) // max(length(text), 1))
+            for i in range(0, len(text), step):
+                yield text[i:i + step]
+            return
+
+        sep, rest = separators[0], separators[1:]
+        parts = text.split(sep)
+        for i, part in enumerate(parts):
+            piece = part + sep if i < len(parts) - 1 else part
+            if not piece:
+                continue
+            yield from TextSplitter._units(piece, chunk_size, length, rest, overlap)
+
+    @staticmethod
+    def _tail(unit: tuple, budget: int, length: Callable[[str], int]) -> Optional[tuple]:
+        """Returns the longest (text, start, length) suffix of a window unit within budget."""
+        text, start, unit_len = unit
+        n = min(len(text), len(text) * budget // max(unit_len, 1))
+        while n > 0 and length(text[-n:]) > budget:
+            n -= 1
+        if n <= 0:
+            return None
+        return text[-n:], start + len(text) - n, length(text[-n:])
+
+    @staticmethod
+    def stream_split(
+        source: TextSource,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        length_function: Callable[[str], int] = len,
+        separators: List[str] = None
+    ) -> Iterator[TextChunk]:
+        """
+        Lazily splits a string, file object or iterator of strings into chunks.
+
+        chunk_size and overlap are measured with length_function (characters by
+        default; pass a tokenizer's counter for token budgets). Each chunk carries
+        its character offsets in the source. Memory use is bounded by the buffer
+        and one chunk, independent of the document size.
+        """
+        if overlap >= chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        separators = separators or TextSplitter.SEPARATORS
+
+        window: List[tuple] = [] # (text, start, length) units of the chunk being built
+        window_len = 0
+        fresh = 0 # units in the window not already emitted as overlap
+        offset = 0
+        index = 0
+
+        def flush():
+            text = "".join(u[0] for u in window)
+            stripped = text.strip()
+            if not stripped:
+                return None
+            start = window[0][1] + (len(text) - len(text.lstrip()))
+            return TextChunk(stripped, start, start + len(stripped), index)
+
+        for block in TextSplitter._iter_blocks(source):
+            for unit in TextSplitter._units(block, chunk_size, length_function, separators, overlap):
+                unit_len = length_function(unit)
+                if window and window_len + unit_len > chunk_size:
+                    chunk = flush()
+                    if chunk:
+                        yield chunk
+                        index += 1
+                    # Carry trailing units (up to `overlap`) into the next chunk
+                    carried, carried_len = [], 0
+                    for u in reversed(window[1:]):
+                        if carried_len + u[2] > overlap or carried_len + u[2] + unit_len > chunk_size:
+                            break
+                        carried.insert(0, u)
+                        carried_len += u[2]
+                    if not carried and overlap:
+                        # No whole unit fits (e.g. hard-split runs): carry the tail of the last one
+                        tail = TextSplitter._tail(window[-1], min(overlap, chunk_size - unit_len), length_function)
+                        if tail:
+                            carried, carried_len = [tail], tail[2]
+                    window, window_len, fresh = carried, carried_len, 0
+                window.append((unit, offset, unit_len))
+                window_len += unit_len
+                fresh += 1
+                offset += len(unit)
 
-        _split(text, separators)
-        return final_chunks
+        if fresh:
+            chunk = flush()
+            if chunk:
+                yield chunk
 
     @staticmethod
     def semantic_cleanup(text: str) -> str:
@@ -0,0 +1,87 @@
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from server.database import Base
+from server.models import HealthData, HealthEvent, MedicalRecord, Notification, SystemLog, VitalReading
+
+# Opt-in: seeding takes minutes. RUN_BENCHMARKS=1 pytest tests/benchmark
+BENCH_ROWS = int(os.getenv("BENCH_ROWS", "1000000")) # per table
+BENCH_OWNERS = 10000 # distinct patients / users the rows are spread over
+BATCH = 50000
+
+VITAL_TYPES = ["blood_pressure", "heart_rate", "temperature", "oxygen", "weight", "glucose"]
+RECORD_TYPES = ["Lab", "Imaging", "Vitals", "Prescription", "Note", "External AI"]
+EVENT_TYPES = ["ai_query", "login", "error", "create_case", "case_status_update"]
+NOTIFICATION_TYPES = ["case_update", "appointment", "system", "ai", "lab", "prescription"]
+
+NOW = datetime(2026, 1, 1)
+
+
+def owner(i: int) -> str:
+    return f"owner-{i % BENCH_OWNERS}"
+
+
+def _at(rng: random.Random) -> datetime:
+    return NOW - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def _rows(model, rng: random.Random, start: int, count: int):
+    for i in range(start, start + count):
+        at = _at(rng)
+        if model is VitalReading:
+            yield {"id": str(uuid.UUID(int=i)), "patient_id": owner(i), "type": rng.choice(VITAL_TYPES),
+                   "value": str(rng.randint(40, 180)), "unit": "", "status": "Normal", "source": "Manual",
+                   "recorded_at": at, "created_at": at}
+        elif model is HealthEvent:
+            yield {"id": str(uuid.UUID(int=i)), "patient_id": owner(i), "type": "note", "title": "Event",
+                   "event_date": at, "created_at": at}
+        elif model is Notification:
+            yield {"id": str(uuid.UUID(int=i)), "user_id": owner(i), "type": rng.choice(NOTIFICATION_TYPES),
+                   "title": "Notice", "message": "", "is_read": rng.random() < 0.9, "created_at": at}
+        elif model is SystemLog:
+            yield {"event_type": rng.choice(EVENT_TYPES), "user_id": owner(i), "details": {}, "timestamp": at}
+        elif model is MedicalRecord:
+            yield {"id": str(uuid.UUID(int=i)), "patient_id": owner(i), "uploader_id": owner(i),
+                   "type": rng.choice(RECORD_TYPES), "title": "Record", "created_at": at}
+        elif model is HealthData:
+            yield {"user_id": owner(i), "data_type": rng.choice(VITAL_TYPES), "value": rng.uniform(40, 180),
+                   "unit": "", "source_timestamp": at, "recorded_at": at}
+
+
+@pytest.fixture(scope="session")
+def bench_engine():
+    """
+    A SQLite database with BENCH_ROWS rows in each table behind the hot
+    time-range queries, spread over BENCH_OWNERS owners and one year,
+    ANALYZEd so the planner sees realistic statistics.
+    """
+    if not os.getenv("RUN_BENCHMARKS"):
+        pytest.skip("set RUN_BENCHMARKS=1 to seed the benchmark database")
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+    for model in (VitalReading, HealthEvent, Notification, SystemLog, MedicalRecord, HealthData):
+        for start in range(0, BENCH_ROWS, BATCH):
+            with engine.begin() as conn:
+                conn.execute(model.__table__.insert(), list(_rows(model, rng, start, min(BATCH, BENCH_ROWS - start))))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"\nseeded {BENCH_ROWS} rows x 6 tables in {time.perf_counter() - started:.1f}s")
+
+    yield engine
+    engine.dispose()
+    os.remove(path)
@@ -0,0 +1,82 @@
+"""
+Query plans of the hot time-range queries against a seeded database: each
+must be an index SEARCH on its composite index, and where the route orders
+by the range column the index must also provide the order (no temp B-tree).
+"""
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from server.models import HealthData, HealthEvent, MedicalRecord, Notification, SystemLog, VitalReading
+
+from .conftest import NOW, owner
+
+SINCE = NOW - timedelta(days=30)
+
+# (index, statement, index provides ORDER BY) -- mirrors the route queries
+QUERIES = {
+    "vitals_summary": (
+        "ix_vital_readings_patient_type_recorded_at",
+        select(VitalReading).where(VitalReading.patient_id == owner(1), VitalReading.type == "heart_rate")
+        .order_by(VitalReading.recorded_at.desc()).limit(10),
+        True,
+    ),
+    "timeline": (
+        "ix_health_events_patient_event_date",
+        select(HealthEvent).where(HealthEvent.patient_id == owner(1), HealthEvent.event_date >= SINCE)
+        .order_by(HealthEvent.event_date.desc()),
+        True,
+    ),
+    "unread_notifications": (
+        "ix_notifications_user_read_created_at",
+        select(Notification).where(Notification.user_id == owner(1), Notification.is_read == False)
+        .order_by(Notification.created_at.desc()).limit(50),
+        True,
+    ),
+    "unread_count": (
+        "ix_notifications_user_read_created_at",
+        select(func.count()).select_from(Notification).where(Notification.user_id == owner(1), Notification.is_read == False),
+        False,
+    ),
+    "dashboard_ai_queries": (
+        "ix_system_logs_event_type_timestamp",
+        select(func.count()).select_from(SystemLog).where(SystemLog.event_type == "ai_query", SystemLog.timestamp > SINCE),
+        False,
+    ),
+    "metrics_latest": (
+        "ix_medical_records_uploader_type_created_at",
+        select(MedicalRecord).where(MedicalRecord.uploader_id == owner(1), MedicalRecord.type == "Vitals")
+        .order_by(MedicalRecord.created_at.desc()).limit(50),
+        True,
+    ),
+    "health_data_by_type": (
+        "ix_health_data_user_type_source_timestamp",
+        select(HealthData).where(HealthData.user_id == owner(1), HealthData.data_type == "heart_rate",
+                                 HealthData.source_timestamp >= SINCE)
+        .order_by(HealthData.source_timestamp.desc()),
+        True,
+    ),
+}
+
+
+def explain(conn, statement) -> str:
+    compiled = statement.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_query_uses_composite_index(bench_engine, name):
+    index, statement, ordered = QUERIES[name]
+    with bench_engine.connect() as conn:
+        plan = explain(conn, statement)
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+        if ordered:
+            assert "USE TEMP B-TREE FOR ORDER BY" not in plan, plan
+
+        started = time.perf_counter()
+        conn.execute(statement).all()
+        print(f"\n{name}: {(time.perf_counter() - started) * 1000:.1f}ms\n{plan}")
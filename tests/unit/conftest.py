@@ -1,14 +1,20 @@
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
-from server.database import Base, get_db
+from server.database import Base, async_database_url, get_db, get_db_async
 from server.main import app
 
-# Setup in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Setup a throwaway SQLite database for testing. A file rather than :memory:
+# so that async routes (aiosqlite, separate connections) see the same data
+# as the sync session the tests seed through.
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -17,6 +23,10 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: aiosqlite connections are bound to the event loop that opened them
+async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -40,8 +50,13 @@ def client(db_session):
             yield db_session
         finally:
             pass # Session is closed in fixture
+
+    async def override_get_db_async():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_db_async] = override_get_db_async
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
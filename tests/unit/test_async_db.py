@@ -0,0 +1,42 @@
+from sqlalchemy import select
+
+from server.database import async_database_url
+from server.models import Notification, User, VitalReading
+
+
+def test_async_database_url():
+    assert str(async_database_url("sqlite:////tmp/health.db")) == "sqlite+aiosqlite:////tmp/health.db"
+    assert async_database_url("postgresql://u:p@db/health").drivername == "postgresql+asyncpg"
+    assert async_database_url("postgresql+pg8000://u:p@db/health").drivername == "postgresql+asyncpg"
+
+
+def test_vitals_round_trip_on_async_session(client, patient_auth, db):
+    response = client.post("/api/vitals/", json={"type": "heart_rate", "value": "130", "unit": "bpm"}, headers=patient_auth)
+    assert response.status_code == 200
+    vital = response.json()
+    assert vital["status"] == "Critical"
+
+    # Written through the async engine, visible to the sync session
+    assert db.get(VitalReading, vital["id"]).value == "130"
+
+    assert [v["id"] for v in client.get("/api/vitals/", headers=patient_auth).json()] == [vital["id"]]
+    assert client.get("/api/vitals/latest/heart_rate", headers=patient_auth).json()["id"] == vital["id"]
+    assert client.delete(f"/api/vitals/{vital['id']}", headers=patient_auth).status_code == 200
+    assert client.get("/api/vitals/", headers=patient_auth).json() == []
+
+
+def test_notifications_on_async_session(client, patient_auth, db):
+    user = db.query(User).filter(User.email == "test_patient_qa@example.com").first()
+    for i in range(3):
+        db.add(Notification(id=f"n-{i}", user_id=user.id, type="system", title=f"T{i}", message="m"))
+    db.commit()
+
+    assert client.get("/api/notifications/count", headers=patient_auth).json() == {"unread_count": 3}
+    assert client.post("/api/notifications/n-0/read", headers=patient_auth).status_code == 200
+    assert client.get("/api/notifications/count", headers=patient_auth).json() == {"unread_count": 2}
+    assert client.post("/api/notifications/read-all", headers=patient_auth).status_code == 200
+    assert client.get("/api/notifications/count", headers=patient_auth).json() == {"unread_count": 0}
+    assert client.get("/api/notifications/preferences", headers=patient_auth).json()["emailEnabled"] is True
+
+    db.expire_all()
+    assert all(n.is_read for n in db.scalars(select(Notification)))
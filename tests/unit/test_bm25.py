@@ -0,0 +1,64 @@
+from server.utils.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from server.utils.reranking import rerank
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the dose of Aspirin?") == ["dose", "aspirin"]
+
+
+def test_rare_terms_rank_higher():
+    index = BM25Index()
+    index.add_many([
+        ("1", "patient reports chest pain radiating to left arm"),
+        ("2", "patient reports mild headache"),
+        ("3", "patient reports fatigue and patient reports poor sleep"),
+    ])
+
+    results = index.search("chest pain", n_results=3)
+
+    assert results[0][0] == "1"
+    assert {doc_id for doc_id, _ in results} == {"1"}
+
+
+def test_incremental_add_and_remove():
+    index = BM25Index()
+    index.add("1", "metformin for type 2 diabetes")
+    assert index.search("insulin") == []
+
+    index.add("2", "insulin glargine at bedtime")
+    assert [d for d, _ in index.search("insulin")] == ["2"]
+
+    index.remove("2")
+    assert index.search("insulin") == []
+    assert len(index) == 1
+    assert "insulin" not in index.postings
+
+    # Re-adding an id replaces its text
+    index.add("1", "insulin pump settings")
+    assert [d for d, _ in index.search("insulin")] == ["1"]
+    assert index.search("metformin") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    dense = [("a", {}, 0.9), ("b", {}, 0.8), ("c", {}, 0.7)]
+    lexical = [("b", {}, 3.0), ("c", {}, 2.0)]
+
+    fused = reciprocal_rank_fusion([dense, lexical])
+
+    assert [text for text, _, _ in fused] == ["b", "c", "a"]
+    assert fused[0][2] == 1.0
+
+
+def test_fused_scores_span_the_candidates_so_recency_does_not_dominate():
+    now = 1_800_000_000.0
+    # Best-fused hits are a year old, the weakest one is brand new
+    dense = [(f"d{i}", {"ts": now - 365 * 86400}, 0.9 - i * 0.01) for i in range(20)]
+    dense[-1] = ("fresh", {"ts": now}, 0.7)
+    lexical = [("d0", {}, 5.0), ("d1", {}, 4.0)]
+
+    fused = reciprocal_rank_fusion([dense, lexical])
+    assert fused[0][2] == 1.0 and fused[-1] == ("fresh", {"ts": now}, 0.0)
+    assert reciprocal_rank_fusion([[("only", {}, 0.5)]])[0][2] == 1.0
+
+    # Rank 3 of 20 must still beat a perfectly fresh last-ranked hit
+    assert rerank(reciprocal_rank_fusion([dense]), 3, now=now) == ["d0", "d1", "d2"]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from server.routes import ai
+from server.services.llm_client import LLMClient
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, texts, delay=0.0):
+        self.texts = texts
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            for text in self.texts:
+                await asyncio.sleep(self.delay)
+                yield Chunk(text)
+        finally:
+            self.closed = True
+
+
+class FakeChat:
+    def __init__(self, texts, delay=0.0):
+        self.stream = FakeStream(texts, delay)
+
+    async def send_message_async(self, message, stream=False):
+        assert stream
+        return self.stream
+
+
+class FakeModel:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start_chat(self, history=None):
+        return FakeChat(["Take ", "it ", "easy."])
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_chat_streams_tokens_as_sse(client, patient_auth, monkeypatch):
+    monkeypatch.setattr(ai, "API_KEY", "test-key")
+    monkeypatch.setattr(ai.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(ai.agent_service, "get_system_instruction", lambda *a, **k: "You are helpful.")
+
+    response = client.post("/api/ai/chat", json={"message": "Any advice?", "stream": True}, headers=patient_auth)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert parse_events(response.text) == [
+        ("token", {"text": "Take "}),
+        ("token", {"text": "it "}),
+        ("token", {"text": "easy."}),
+        ("done", {"response": "Take it easy."}),
+    ]
+
+
+async def test_closing_stream_cancels_upstream():
+    client = LLMClient(max_concurrency=1, timeout=5)
+    chat = FakeChat(["a", "b", "c", "d"], delay=0.01)
+
+    tokens = client.stream_message(chat, "hi")
+    assert await tokens.__anext__() == "a"
+    await tokens.aclose()
+
+    assert chat.stream.closed
+    stats = client.get_stats()
+    assert stats["in_flight"] == 0 and stats["cancelled"] == 1
+    # The slot was released
+    assert [t async for t in client.stream_message(FakeChat(["x"]), "again")] == ["x"]
+
+
+async def test_stalled_stream_times_out():
+    from server.services.llm_client import LLMTimeoutError
+
+    client = LLMClient(max_concurrency=1, timeout=0.05)
+    with pytest.raises(LLMTimeoutError):
+        async for _ in client.stream_message(FakeChat(["slow"], delay=1), "hi"):
+            pass
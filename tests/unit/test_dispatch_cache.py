@@ -0,0 +1,94 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server.database import Base
+from server.models import AgentCapability, SystemLog, User
+from server.services.audit_writer import BatchedAuditWriter
+from server.services.consent_cache import ConsentCache
+
+
+def make_user(db, consent=True):
+    user = User(id="u-consent", email="consent@example.com", role="Patient", gdpr_consent=consent)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_consent_cache_hits_and_invalidates_on_update(db):
+    cache = ConsentCache(ttl_seconds=60)
+    user = make_user(db, consent=True)
+
+    assert cache.get(db, user.id).gdpr_consent is True
+    assert cache.get(db, user.id).gdpr_consent is True
+    assert cache.get_stats()["hits"] == 1
+
+    # The global cache is invalidated by the mapper event; mirror it for this instance
+    user.gdpr_consent = False
+    db.commit()
+    cache.invalidate(user.id)
+    assert cache.get(db, user.id).gdpr_consent is False
+    assert cache.get(db, "missing-user") is None
+
+
+def test_global_consent_cache_follows_user_updates(db):
+    from server.services.consent_cache import consent_cache
+
+    user = make_user(db, consent=True)
+    assert consent_cache.get(db, user.id).gdpr_consent is True
+
+    user.gdpr_consent = False
+    db.commit()
+
+    assert consent_cache.get(db, user.id).gdpr_consent is False
+
+
+def test_audit_writer_batches_inserts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    writer = BatchedAuditWriter(session_factory=Session, batch_size=50, flush_interval=0.05)
+
+    for i in range(120):
+        writer.enqueue("ai_query", "u1", {"task": "triage", "n": i})
+    writer.flush()
+
+    db = Session()
+    assert db.query(SystemLog).count() == 120
+    assert writer.get_stats()["written"] == 120
+    assert writer.get_stats()["batches"] <= 4
+    db.close()
+
+
+async def test_dispatch_uses_cached_checks_and_background_audit(db, monkeypatch):
+    from server.agents import orchestrator as orchestrator_module
+    from server.agents.orchestrator import AgentOrchestrator
+
+    orch = AgentOrchestrator()
+    queued = []
+    monkeypatch.setattr(orchestrator_module.audit_writer, "enqueue", lambda *args: queued.append(args))
+    calls = []
+
+    async def fake_process(task, payload, context, db):
+        calls.append(task)
+        return {"status": "success"}
+
+    agent = orch.get_agent_for_task("vitals_check")
+    monkeypatch.setattr(agent, "process", fake_process)
+    user = make_user(db, consent=True)
+
+    result = await orch.dispatch("vitals_check", {}, {"user_id": user.id}, db)
+    assert result == {"status": "success"}
+    assert queued and queued[0][0] == "ai_query"
+
+    # Admin disables the capability: the routing table reloads immediately
+    db.add(AgentCapability(id="cap-v", agent_role="NurseAgent", capability_name="vitals_check", is_active=False))
+    db.commit()
+    disabled = await orch.dispatch("vitals_check", {}, {"user_id": user.id}, db)
+    assert "disabled" in disabled["message"]
+
+    # Consent withdrawn: the cached flags are invalidated by the update
+    user.gdpr_consent = False
+    db.commit()
+    denied = await orch.dispatch("triage", {}, {"user_id": user.id}, db)
+    assert "GDPR" in denied["message"]
+    assert calls == ["vitals_check"]
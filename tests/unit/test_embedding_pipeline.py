@@ -0,0 +1,127 @@
+import threading
+import time
+
+from server.services.embedding_cache import EmbeddingCache
+from server.services.embedding_pipeline import EmbeddingPipeline
+
+
+class FakeEmbedder:
+    """Local stand-in for the Gemini batch endpoint."""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.batches = []
+        self.fail_times = fail_times
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts, task_type="retrieval_document", title=None):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            should_fail = self.fail_times > 0
+            if should_fail:
+                self.fail_times -= 1
+        try:
+            time.sleep(self.delay)
+            if should_fail:
+                raise RuntimeError("429 Resource exhausted")
+            return [[float(len(t)), 1.0] for t in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_embeds_in_batches_preserving_order():
+    fake = FakeEmbedder()
+    pipeline = EmbeddingPipeline(fake, batch_size=4, max_concurrency=3)
+    texts = ["x" * i for i in range(1, 11)]
+
+    vectors = pipeline.embed(texts)
+
+    assert [v[0] for v in vectors] == [float(i) for i in range(1, 11)]
+    assert sorted(len(b) for b in fake.batches) == [2, 4, 4]
+
+
+def test_concurrency_is_bounded():
+    fake = FakeEmbedder(delay=0.02)
+    pipeline = EmbeddingPipeline(fake, batch_size=1, max_concurrency=2)
+
+    pipeline.embed([f"chunk {i}" for i in range(8)])
+
+    assert fake.max_in_flight <= 2
+    assert len(fake.batches) == 8
+
+
+def test_retries_with_backoff_then_succeeds():
+    fake = FakeEmbedder(fail_times=2)
+    sleeps = []
+    pipeline = EmbeddingPipeline(fake, max_retries=3, backoff_base=0.5, sleep=sleeps.append)
+
+    vectors = pipeline.embed(["chest pain"])
+
+    assert vectors == [[10.0, 1.0]]
+    assert len(sleeps) == 2
+    assert sleeps[0] <= 0.5 and sleeps[1] <= 1.0
+    assert pipeline.get_stats()["retries"] == 2
+
+
+def test_exhausted_retries_return_empty_vectors():
+    fake = FakeEmbedder(fail_times=10)
+    pipeline = EmbeddingPipeline(fake, batch_size=2, max_retries=1, sleep=lambda _: None)
+
+    vectors = pipeline.embed(["a", "b", "c"])
+
+    assert vectors == [[], [], []]
+    assert pipeline.get_stats()["failed_batches"] == 2
+
+
+def test_usearch_add_many_embeds_new_chunks_once(tmp_path, monkeypatch):
+    from server.services.agent_service import USearchVectorStore
+
+    monkeypatch.chdir(tmp_path)
+    fake = FakeEmbedder()
+    store = USearchVectorStore()
+    store.ndim = 2
+    store.embedder = EmbeddingPipeline(fake, batch_size=8)
+
+    store.add_many("u1", [("alpha", {}), ("beta", {}), ("alpha", {})])
+    store.add_many("u1", [("alpha", {}), ("gamma", {})])
+
+    assert fake.batches == [["alpha", "beta"], ["gamma"]]
+    assert len(store.metadata_store) == 3
+
+
+def test_cache_skips_upstream_for_repeated_texts(tmp_path):
+    fake = FakeEmbedder()
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"), max_memory_items=16)
+    pipeline = EmbeddingPipeline(fake, cache=cache)
+
+    first = pipeline.embed(["user preference style", "chest pain"], task_type="retrieval_query")
+    second = pipeline.embed(["user preference style", "new text"], task_type="retrieval_query")
+
+    assert fake.batches == [["user preference style", "chest pain"], ["new text"]]
+    assert second[0] == first[0]
+    stats = cache.get_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 3
+
+    # Different task type is a different cache entry
+    pipeline.embed(["chest pain"], task_type="retrieval_document")
+    assert fake.batches[-1] == ["chest pain"]
+
+
+def test_cache_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    EmbeddingCache(path=path).set("m", "retrieval_query", "chest pain", [0.5, 0.25])
+
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get("m", "retrieval_query", "chest pain") == [0.5, 0.25]
+    assert reopened.get("m", "retrieval_document", "chest pain") is None
+    assert reopened.get_stats()["disk_hits"] == 1
+
+    # Promoted into the memory tier
+    reopened.get("m", "retrieval_query", "chest pain")
+    assert reopened.get_stats()["memory_hits"] == 1
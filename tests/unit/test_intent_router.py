@@ -0,0 +1,93 @@
+from server.utils.intent_router import LocalIntentRouter
+
+EXAMPLES = {
+    "estimate_cost": "estimate cost price how much bill",
+    "generate_rehab_plan": "rehab rehabilitation recovery exercises plan",
+    "vitals_check": "vitals blood pressure heart rate temperature",
+}
+RULES = [(r"\btriage\b(?:.*?\bcase\s+#?(?P<case_id>[\w-]+))?", "triage", {"source": "rule"})]
+
+
+def test_rules_win_and_extract_payload():
+    router = LocalIntentRouter(EXAMPLES, RULES)
+
+    match = router.route("Please triage case 42 now")
+
+    assert match.label == "triage"
+    assert match.method == "rule"
+    assert match.payload == {"source": "rule", "case_id": "42"}
+
+
+def test_nearest_neighbour_routes_confident_queries():
+    router = LocalIntentRouter(EXAMPLES, RULES)
+
+    match = router.route("I need a rehab plan with exercises")
+
+    assert match.label == "generate_rehab_plan"
+    assert match.method == "nearest"
+    assert 0.35 <= match.confidence <= 1.0
+
+
+def test_low_confidence_falls_through():
+    router = LocalIntentRouter(EXAMPLES, RULES)
+
+    assert router.route("hi, how are you?") is None
+    # A single shared term is not enough evidence
+    assert router.route("what about the plan") is None
+
+
+async def test_orchestrator_routes_common_queries_without_llm():
+    from server.agents.orchestrator import orchestrator
+
+    route = await orchestrator.route_task("Find guidelines for atrial fibrillation")
+
+    assert route["task"] == "find_guidelines"
+    assert route["payload"]["condition"] == "atrial fibrillation"
+    assert route["routed_by"] == "rule"
+    assert orchestrator.get_agent_for_task(route["task"]) is not None
+
+
+def test_agent_bus_matches_capability_locally(db):
+    from server.services.agent_bus import AgentBusService
+
+    bus = AgentBusService()
+    bus.model = None # no LLM available: local routing must answer on its own
+    bus.seed_defaults(db)
+
+    named = bus.find_capability(db, "run a drug interaction check on warfarin and aspirin")
+    described = bus.find_capability(db, "verify insurance coverage for an MRI")
+
+    assert [c.capability_name for c in named] == ["check_drug_interaction"]
+    assert [c.capability_name for c in described] == ["check_insurance_eligibility"]
+
+
+def test_routing_table_is_reused_until_capabilities_change(db):
+    from server.agents.orchestrator import AgentOrchestrator
+    from server.models import AgentCapability
+
+    orch = AgentOrchestrator()
+    table = orch.routing_table(db)
+    assert orch.routing_table(db) is table
+    assert table.agent_for("triage").role == "Nurse"
+    assert orch.routing_table().agent_for_domain("Cardiology").domain_name == "Cardiology"
+    assert table.agent_for("no_such_task") is None
+    assert "no_such_task" not in table.task_agents
+
+    db.add(AgentCapability(id="cap-x", agent_role="NurseAgent", capability_name="vitals_check", is_active=False))
+    db.commit()
+
+    rebuilt = orch.routing_table(db)
+    assert rebuilt is not table
+    assert rebuilt.capabilities == {"vitals_check": False}
+
+
+def test_registering_an_agent_rebuilds_the_table():
+    from server.agents.orchestrator import AgentOrchestrator
+    from server.agents.specialists.base_specialist import SpecialistAgent
+
+    orch = AgentOrchestrator()
+    table = orch.routing_table()
+    orch.register_agent(SpecialistAgent(domain_name="Dermatology", domain_emoji="x"))
+
+    assert orch.routing_table() is not table
+    assert orch.routing_table().agent_for_domain("Dermatology").domain_name == "Dermatology"
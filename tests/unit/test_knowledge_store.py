@@ -0,0 +1,204 @@
+import os
+import threading
+import pytest
+
+from server.config import settings
+from server.knowledge_base import store
+from server.knowledge_base.store import DomainKnowledgeBase
+
+
+@pytest.fixture
+def kb_dir(tmp_path, monkeypatch):
+    """
+    Runs the knowledge base against a temporary data/vectors directory
+    with random (offline) embeddings.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", None)
+    return tmp_path / "data" / "vectors"
+
+
+def test_add_appends_to_wal_without_snapshot(kb_dir):
+    kb = DomainKnowledgeBase("cardiology")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.add_document("Beta-blockers for AFib rate control.", "Guideline")
+
+    assert os.path.exists(kb.wal_path)
+    assert not os.path.exists(kb.index_path)
+    assert kb._wal_records == 2
+
+
+def test_wal_replay_recovers_records(kb_dir):
+    kb = DomainKnowledgeBase("cardiology")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.add_document("Beta-blockers for AFib rate control.", "Guideline")
+
+    # Metadata rows lost (sidecar deleted) are recovered from the segment too
+    os.remove(kb.db_path)
+    reopened = DomainKnowledgeBase("cardiology")
+    texts = sorted(d["text"] for d in reopened.get_documents([1, 2]).values())
+    assert texts == ["Aspirin 325mg chewed for ACS.", "Beta-blockers for AFib rate control."]
+    assert len(reopened.delta) == 2
+
+
+def test_wal_replay_truncates_torn_tail(kb_dir):
+    kb = DomainKnowledgeBase("cardiology")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    good_size = os.path.getsize(kb.wal_path)
+
+    # Simulate a crash half-way through writing the next record
+    with open(kb.wal_path, "ab") as f:
+        f.write(b"\x07\x00\x00\x00\x00\x00\x00\x00\xff\x00")
+
+    reopened = DomainKnowledgeBase("cardiology")
+    assert len(reopened) == 1
+    assert os.path.getsize(kb.wal_path) == good_size
+
+
+def test_compaction_folds_wal_into_snapshot(kb_dir, monkeypatch):
+    monkeypatch.setattr(store, "WAL_COMPACT_THRESHOLD", 2)
+    kb = DomainKnowledgeBase("cardiology")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.add_document("Beta-blockers for AFib rate control.", "Guideline")
+    kb._compaction_thread.join(timeout=10)
+
+    assert kb._wal_records == 0
+    assert os.path.getsize(kb.wal_path) == 0
+    assert len(kb.delta) == 0
+    assert len(kb.index) == 2
+
+    reopened = DomainKnowledgeBase("cardiology")
+    assert len(reopened) == 2
+    assert len(reopened.index) == 2
+    assert len(reopened.delta) == 0
+
+
+def test_duplicate_content_skips_embedding(kb_dir, monkeypatch):
+    kb = DomainKnowledgeBase("cardiology")
+    calls = []
+    original = kb.get_embedding
+    monkeypatch.setattr(kb, "get_embedding", lambda text, mode="retrieval_document": calls.append(text) or original(text, mode))
+
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol (re-ingest)")
+    assert len(calls) == 1
+    assert len(kb) == 1
+
+    # The hash index is rebuilt from the persisted metadata on reopen
+    reopened = DomainKnowledgeBase("cardiology")
+    monkeypatch.setattr(reopened, "get_embedding", lambda text, mode="retrieval_document": calls.append(text) or original(text, mode))
+    reopened.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    assert len(calls) == 1
+    assert len(reopened) == 1
+
+
+def test_search_merges_snapshot_and_delta(kb_dir, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_API_KEY", "test-key")
+    vectors = {
+        "Aspirin 325mg chewed for ACS.": [1.0, 0.0, 0.0],
+        "Beta-blockers for AFib rate control.": [0.0, 1.0, 0.0],
+        "aspirin": [0.9, 0.1, 0.0],
+    }
+    monkeypatch.setattr(store, "embed_text", lambda text, task_type=None, title=None: vectors[text])
+
+    kb = DomainKnowledgeBase("cardiology")
+    kb.ndim = 3
+    kb.delta = store.usearch.index.Index(ndim=3)
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.compact()
+    kb.add_document("Beta-blockers for AFib rate control.", "Guideline")
+
+    # One record in the mapped snapshot, one in the delta
+    assert len(kb.index) == 1 and len(kb.delta) == 1
+    results = kb.search("aspirin", limit=2)
+    assert [r["source"] for r in results] == ["Protocol", "Guideline"]
+
+
+def test_legacy_json_metadata_is_migrated(kb_dir):
+    os.makedirs(kb_dir, exist_ok=True)
+    with open(kb_dir / "dentistry_meta.json", "w") as f:
+        f.write('{"1": {"text": "Fluoride varnish twice yearly.", "source": "ADA", "reliability": 1.0}}')
+
+    kb = DomainKnowledgeBase("dentistry")
+    assert len(kb) == 1
+    assert kb.get_documents([1])[1]["source"] == "ADA"
+    assert kb._next_key == 2
+
+
+@pytest.fixture
+def zones(kb_dir, monkeypatch):
+    monkeypatch.setattr(DomainKnowledgeBase, "_instances", store.OrderedDict())
+    monkeypatch.setattr(DomainKnowledgeBase, "_live", store.weakref.WeakValueDictionary())
+
+
+def test_open_zones_are_bounded(zones, monkeypatch):
+    monkeypatch.setattr(store, "MAX_OPEN_ZONES", 2)
+
+    first = DomainKnowledgeBase.get_instance("cardiology")
+    DomainKnowledgeBase.get_instance("dentistry")
+    assert DomainKnowledgeBase.get_instance("cardiology") is first
+    DomainKnowledgeBase.get_instance("ophthalmology")
+
+    assert list(DomainKnowledgeBase._instances) == ["cardiology", "ophthalmology"]
+
+
+def test_evicted_zone_in_use_is_not_reopened(zones, monkeypatch):
+    monkeypatch.setattr(store, "MAX_OPEN_ZONES", 1)
+
+    old = DomainKnowledgeBase.get_instance("cardiology")
+    DomainKnowledgeBase.get_instance("dentistry") # evicts cardiology from the LRU
+    new = DomainKnowledgeBase.get_instance("cardiology")
+    assert new is old
+
+    old.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    new.add_document("Beta-blockers for AFib rate control.", "Guideline")
+    assert len(DomainKnowledgeBase("cardiology")) == 2
+
+    # Once nobody holds it, an evicted zone is opened afresh from disk
+    del old, new
+    DomainKnowledgeBase.get_instance("dentistry")
+    assert "cardiology" not in DomainKnowledgeBase._live
+
+
+def test_compaction_does_not_block_adds(kb_dir, monkeypatch):
+    kb = DomainKnowledgeBase("cardiology")
+    kb.add_document("Aspirin 325mg chewed for ACS.", "Protocol")
+    kb.add_document("Beta-blockers for AFib rate control.", "Guideline")
+
+    write_snapshot = kb._write_snapshot
+    def slow_write(merged):
+        # An add while the merged index is being built must not wait for it
+        adder = threading.Thread(target=kb.add_document, args=("Heparin bolus for STEMI.", "Protocol"))
+        adder.start()
+        adder.join(timeout=5)
+        assert not adder.is_alive()
+        return write_snapshot(merged)
+    monkeypatch.setattr(kb, "_write_snapshot", slow_write)
+    kb.compact()
+
+    # The record added mid-compaction stays in the delta and the segment
+    assert len(kb.index) == 2
+    assert list(kb._delta_vectors) == [3]
+    assert kb._wal_records == 1
+
+    reopened = DomainKnowledgeBase("cardiology")
+    assert len(reopened) == 3
+    assert len(reopened.index) == 2 and len(reopened.delta) == 1
+
+
+def test_compaction_waits_for_a_fraction_of_the_snapshot(kb_dir, monkeypatch):
+    monkeypatch.setattr(store, "WAL_COMPACT_THRESHOLD", 2)
+    monkeypatch.setattr(store, "WAL_COMPACT_RATIO", 1.0)
+    kb = DomainKnowledgeBase("cardiology")
+    snapshots = []
+    write_snapshot = kb._write_snapshot
+    monkeypatch.setattr(kb, "_write_snapshot", lambda merged: snapshots.append(len(merged)) or write_snapshot(merged))
+
+    for i in range(8):
+        kb.add_document(f"Protocol {i}", "Protocol")
+        if kb._compaction_thread:
+            kb._compaction_thread.join(timeout=10)
+
+    # Each compaction waits for as many new records as the snapshot holds
+    assert snapshots == [2, 2, 4]
+    assert len(kb.index) == 8 and kb._wal_records == 0
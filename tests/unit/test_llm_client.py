@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from server.services.llm_client import LLMClient, LLMTimeoutError
+
+
+class FakeModel:
+    """Async stand-in for a GenerativeModel that records peak concurrency."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return f"answer to {prompt}"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+async def test_concurrency_is_bounded():
+    client = LLMClient(max_concurrency=2, timeout=5)
+    model = FakeModel()
+
+    results = await asyncio.gather(*(client.generate(model, f"q{i}") for i in range(6)))
+
+    assert results == [f"answer to q{i}" for i in range(6)]
+    assert model.peak == 2
+    assert client.get_stats()["calls"] == 6
+
+
+async def test_timeout_cancels_underlying_call():
+    client = LLMClient(max_concurrency=2, timeout=5)
+    model = FakeModel(delay=1)
+
+    with pytest.raises(LLMTimeoutError):
+        await client.generate(model, "slow", timeout=0.05)
+
+    assert model.cancelled == 1
+    assert client.get_stats()["timeouts"] == 1
+
+
+async def test_slow_call_does_not_block_event_loop():
+    client = LLMClient(max_concurrency=4, timeout=5)
+    model = FakeModel(delay=0.3)
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    await client.generate(model, "slow")
+    beat.cancel()
+
+    assert ticks > 10
+
+
+async def test_cancellation_propagates():
+    client = LLMClient(max_concurrency=1, timeout=5)
+    model = FakeModel(delay=1)
+
+    task = asyncio.create_task(client.generate(model, "q"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert model.cancelled == 1
+    assert client.get_stats()["in_flight"] == 0
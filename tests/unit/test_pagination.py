@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from server.models import Appointment, Case, HealthEvent, Patient, SystemLog, User
+from server.services.audit_service import AuditLogService
+from server.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+BASE = datetime(2026, 5, 1, 9, 0)
+
+
+def walk(client, url, headers, limit):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def patient_id(db):
+    user = db.query(User).filter(User.email == "test_patient_qa@example.com").first()
+    return db.query(Patient).filter(Patient.user_id == user.id).first().id
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    key = (BASE, "c-1")
+    assert decode_cursor(encode_cursor(key)) == key
+    with pytest.raises(InvalidCursor) as e:
+        decode_cursor("not-a-cursor")
+    assert e.value.status_code == 400
+
+
+def test_cases_pages_cover_everything_once_in_order(client, patient_auth, db):
+    pid = patient_id(db)
+    # Pairs share created_at, so the id tie-breaker matters
+    for i in range(7):
+        db.add(Case(id=f"case-{i}", title=f"T{i}", patient_id=pid, status="Open", creator_id="u", complaint="c", tags=[],
+                    created_at=(BASE + timedelta(hours=i // 2)).isoformat()))
+    db.commit()
+
+    pages = walk(client, "/api/cases", patient_auth, limit=3)
+    assert [len(p) for p in pages] == [3, 3, 1]
+    ids = [c["id"] for p in pages for c in p]
+    assert ids == ["case-6", "case-5", "case-4", "case-3", "case-2", "case-1", "case-0"]
+
+    assert client.get("/api/cases", params={"cursor": "%%%"}, headers=patient_auth).status_code == 400
+
+
+def test_appointments_and_timeline_pages(client, patient_auth, doctor_auth, db):
+    pid = patient_id(db)
+    doctor = db.query(User).filter(User.email == "test_doctor_qa@example.com").first()
+    for i in range(5):
+        db.add(Appointment(id=f"apt-{i}", doctor_id=doctor.id, patient_id=pid, scheduled_at=BASE + timedelta(days=i)))
+        db.add(HealthEvent(id=f"ev-{i}", patient_id=pid, type="note", title=f"E{i}",
+                           event_date=datetime.utcnow() - timedelta(days=20 * i)))
+    db.commit()
+
+    pages = walk(client, "/api/appointments/", doctor_auth, limit=2)
+    assert [a["id"] for p in pages for a in p] == ["apt-4", "apt-3", "apt-2", "apt-1", "apt-0"]
+
+    pages = walk(client, "/api/timeline/grouped", patient_auth, limit=2)
+    assert len(pages) == 3
+    assert [e["id"] for p in pages for month in p for e in month["events"]] == [f"ev-{i}" for i in range(5)]
+
+
+def test_audit_logs_keyset(db):
+    for i in range(5):
+        db.add(SystemLog(event_type="login", user_id="u", details={}, timestamp=BASE + timedelta(minutes=i // 2)))
+    db.commit()
+
+    service = AuditLogService(db)
+    seen, cursor = [], None
+    while True:
+        page = service.get_logs(user_id="u", limit=2, cursor=cursor)
+        seen += [log.id for log in page.items]
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert seen == [5, 4, 3, 2, 1]
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+from server.models import HealthData, MedicalRecord, Medication, Patient, PatientContextSnapshot, User
+from server.services.patient_context import RECENT_RECORDS, patient_context
+
+
+def make_patient(db):
+    db.add(User(id="u-ctx", email="ctx@example.com", role="Patient"))
+    patient = Patient(id="p-ctx", user_id="u-ctx", name="Ada", sex="F", dob="1980-01-01",
+                      weight=70.0, baseline_illnesses=["Asthma"], allergies=["Penicillin"])
+    db.add(patient)
+    db.add(MedicalRecord(id="r-0", patient_id="p-ctx", type="Lab", title="CBC", ai_summary="Normal",
+                         created_at=datetime.utcnow() - timedelta(days=30)))
+    db.commit()
+    return patient
+
+
+def fresh(db):
+    db.expire_all()
+    return db.get(PatientContextSnapshot, "p-ctx")
+
+
+def test_snapshot_is_built_once_and_patched_incrementally(db):
+    patient = make_patient(db)
+    snapshot = patient_context.for_user(db, "u-ctx")
+    assert [r["id"] for r in snapshot.records] == ["r-0"]
+    built_at = snapshot.updated_at
+
+    now = datetime.utcnow()
+    db.add(MedicalRecord(id="r-1", patient_id="p-ctx", type="Imaging", title="Chest X-Ray", created_at=now))
+    db.add(Medication(id="m-1", patient_id="p-ctx", name="Salbutamol", dosage="100mcg", frequency="PRN"))
+    db.add(HealthData(user_id="u-ctx", data_type="heart_rate", value=60, unit="bpm", source_timestamp=now - timedelta(hours=2)))
+    db.add(HealthData(user_id="u-ctx", data_type="heart_rate", value=80, unit="bpm", source_timestamp=now - timedelta(hours=1)))
+    db.commit()
+
+    snapshot = fresh(db)
+    assert [r["id"] for r in snapshot.records] == ["r-0", "r-1"]
+    assert snapshot.medications == [{"id": "m-1", "name": "Salbutamol", "dosage": "100mcg", "frequency": "PRN"}]
+    assert snapshot.vitals_latest["heart_rate"]["value"] == 80
+    assert patient_context.vitals_average(snapshot, "heart_rate", 7) == 70
+    assert snapshot.updated_at >= built_at
+
+    # Summaries filled in later, and profile edits, are patched in place
+    db.get(MedicalRecord, "r-1").ai_summary = "No acute findings"
+    patient.allergies = ["Penicillin", "Latex"]
+    db.commit()
+    snapshot = fresh(db)
+    assert snapshot.records[-1]["ai_summary"] == "No acute findings"
+    assert snapshot.profile["allergies"] == ["Penicillin", "Latex"]
+
+    context = patient_context.chat_context(snapshot)
+    assert "Allergies: Penicillin, Latex" in context
+    assert "Medications: Salbutamol" in context
+    assert "- heart_rate: 80" in context
+    assert "Imaging - Chest X-Ray: No acute findings" in context
+
+
+def test_only_recent_records_are_kept_and_deletes_invalidate(db):
+    make_patient(db)
+    patient_context.get(db, "p-ctx")
+
+    base = datetime.utcnow()
+    for i in range(RECENT_RECORDS + 2):
+        db.add(MedicalRecord(id=f"r-new-{i}", patient_id="p-ctx", type="Lab", title=f"T{i}",
+                             created_at=base + timedelta(minutes=i)))
+    db.commit()
+    snapshot = fresh(db)
+    assert len(snapshot.records) == RECENT_RECORDS
+    assert snapshot.records[-1]["id"] == f"r-new-{RECENT_RECORDS + 1}"
+
+    db.delete(db.get(MedicalRecord, f"r-new-{RECENT_RECORDS + 1}"))
+    db.commit()
+    assert fresh(db) is None
+
+    rebuilt = patient_context.get(db, "p-ctx")
+    assert rebuilt.records[-1]["id"] == f"r-new-{RECENT_RECORDS}"
+    assert len(rebuilt.records) == RECENT_RECORDS
+
+
+def test_no_patient_profile(db):
+    db.add(User(id="u-doc", email="doc@example.com", role="Doctor"))
+    db.commit()
+    assert patient_context.for_user(db, "u-doc") is None
+    assert patient_context.chat_context(None).endswith("No uploaded records available.")
+
+
+def test_building_a_snapshot_leaves_the_callers_transaction_alone(db):
+    make_patient(db)
+    db.add(User(id="u-pending", email="pending@example.com"))
+    assert patient_context.get(db, "p-ctx") is not None
+    assert db.get(User, "u-pending") is not None
+
+    db.rollback()
+    assert db.get(User, "u-pending") is None
+
+
+def test_rebuild_counts_vitals_without_a_source_timestamp(db):
+    make_patient(db)
+    db.add(HealthData(user_id="u-ctx", data_type="weight", value=71.5, unit="kg", recorded_at=datetime.utcnow()))
+    db.commit()
+
+    snapshot = patient_context.get(db, "p-ctx")
+    assert snapshot.vitals_latest["weight"]["value"] == 71.5
@@ -0,0 +1,85 @@
+import pytest
+
+from scripts import reindex_records as reindex
+from server.models import MedicalRecord, Patient, User
+
+
+class RecordingStore:
+    """Stands in for the vector store; fails once when asked to."""
+
+    embedder = None
+
+    def __init__(self, fail_on_call=None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def indexed_hashes(self, user_id, digests):
+        return set()
+
+    def add_many(self, user_id, items):
+        if len(self.calls) + 1 == self.fail_on_call:
+            self.fail_on_call = None
+            raise RuntimeError("embedding API down")
+        self.calls.append((user_id, [meta["record_id"] for _, meta in items]))
+
+
+@pytest.fixture
+def records(db):
+    db.add(User(id="u1", email="u1@example.com", hashed_password="x", role="patient"))
+    db.add(Patient(id="p1", user_id="u1", name="Pat"))
+    for i in range(5):
+        db.add(MedicalRecord(id=f"r{i}", patient_id="p1", content_text='{"HbA1c": "7.1"}', ai_summary="Labs"))
+    db.add(MedicalRecord(id="r9", content_text="orphan"))
+    db.commit()
+
+
+def test_reindex_batches_and_resumes_from_checkpoint(db, records, tmp_path, monkeypatch):
+    from server.services.agent_service import agent_service
+
+    checkpoint = str(tmp_path / "checkpoint.json")
+    store = RecordingStore(fail_on_call=2)
+    monkeypatch.setattr(agent_service, "vector_store", store)
+
+    with pytest.raises(RuntimeError):
+        reindex.reindex_records(batch_size=2, checkpoint_path=checkpoint, session_factory=lambda: db)
+    assert store.calls == [("u1", ["r0", "r1"])]
+    assert reindex.load_checkpoint(checkpoint)["last_id"] == "r1"
+
+    result = reindex.reindex_records(batch_size=2, checkpoint_path=checkpoint, session_factory=lambda: db)
+
+    assert store.calls == [("u1", ["r0", "r1"]), ("u1", ["r2", "r3"]), ("u1", ["r4"])]
+    assert result == {"last_id": "r9", "indexed": 5, "skipped": 1}
+
+
+def test_record_content_matches_upload_format():
+    record = MedicalRecord(id="r", content_text='["LDL high"]', ai_summary="Lipids",
+                           metadata_={"doctor_name": "Dr. A", "facility_name": "Clinic"})
+    assert reindex.record_content(record) == "Findings: LDL high\nSummary: Lipids\nStaff: Doctor: Dr. A | Facility: Clinic"
+
+
+def test_already_indexed_records_are_not_embedded_again(db, records, tmp_path, monkeypatch):
+    from server.services.agent_service import agent_service
+    from server.utils.text_processing import content_hash
+
+    for i, record in enumerate(db.query(MedicalRecord).filter(MedicalRecord.patient_id == "p1")):
+        record.ai_summary = f"Labs {i}"
+    db.commit()
+
+    class Embedder:
+        cache = {}
+        embedded = []
+
+        def embed(self, texts):
+            self.embedded.extend(texts)
+
+    store = RecordingStore()
+    store.embedder = Embedder()
+    stored = {content_hash(reindex.record_content(db.get(MedicalRecord, r))) for r in ("r0", "r1")}
+    store.indexed_hashes = lambda user_id, digests: stored.intersection(digests)
+    monkeypatch.setattr(agent_service, "vector_store", store)
+
+    result = reindex.reindex_records(batch_size=10, checkpoint_path=str(tmp_path / "c.json"), session_factory=lambda: db)
+
+    assert store.calls == [("u1", ["r2", "r3", "r4"])]
+    assert len(store.embedder.embedded) == 3
+    assert result["indexed"] == 5
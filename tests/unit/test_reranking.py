@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from server.utils.reranking import epoch_timestamp, recency_scores, rerank
+
+DAY = 86400.0
+NOW = 1_760_000_000.0
+
+
+def test_epoch_timestamp_prefers_ts_and_falls_back_to_iso():
+    assert epoch_timestamp({"ts": 123.5, "timestamp": "2020-01-01T00:00:00"}) == 123.5
+    assert epoch_timestamp({"timestamp": "1970-01-02T00:00:00"}) == DAY
+    assert np.isnan(epoch_timestamp({"timestamp": "not a date"}))
+    assert np.isnan(epoch_timestamp({}))
+
+
+def test_decay_curves():
+    ts = np.array([NOW, NOW - 90 * DAY, NOW - 400 * DAY, np.nan])
+
+    linear = recency_scores(ts, now=NOW, decay="linear")
+    assert linear[0] == 1.0 and linear[2] == 0.0 and linear[3] == 0.0
+    assert linear[1] == pytest.approx(1 - 90 / 365)
+
+    exponential = recency_scores(ts, now=NOW, decay="exponential", half_life_days=90)
+    assert exponential[1] == pytest.approx(0.5)
+
+    assert not recency_scores(ts, now=NOW, decay="none").any()
+    with pytest.raises(ValueError):
+        recency_scores(ts, now=NOW, decay="cubic")
+
+
+def test_recency_breaks_similarity_ties_and_dedups():
+    candidates = [
+        ("old note", {"ts": NOW - 300 * DAY}, 0.8),
+        ("new note", {"ts": NOW}, 0.8),
+        ("new note", {"ts": NOW}, 0.8),
+        ("unrelated", {"ts": NOW}, 0.1),
+    ]
+
+    assert rerank(candidates, 2, now=NOW) == ["new note", "old note"]
+
+
+def test_mmr_prefers_diverse_candidates():
+    candidates = [
+        ("metformin 500mg twice daily", {}, 0.95),
+        ("metformin 500mg twice daily with meals", {}, 0.94),
+        ("patient walks 30 minutes daily", {}, 0.80),
+    ]
+
+    plain = rerank(candidates, 2, decay="none", now=NOW)
+    diverse = rerank(candidates, 2, decay="none", mmr_lambda=0.5, now=NOW)
+
+    assert plain == ["metformin 500mg twice daily", "metformin 500mg twice daily with meals"]
+    assert diverse == ["metformin 500mg twice daily", "patient walks 30 minutes daily"]
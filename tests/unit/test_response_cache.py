@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from server.services.response_cache import SemanticResponseCache, contains_phi
+
+
+def keyword_embed(text):
+    """Bag-of-keywords embedding: prompts about the same terms are near-identical."""
+    vocab = ["chest", "pain", "diabetes", "fracture", "asthma", "knee"]
+    return [float(word in text) for word in vocab] + [0.01]
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def generator(self, value):
+        async def generate():
+            self.calls += 1
+            return value
+        return generate
+
+
+@pytest.fixture
+def cache():
+    return SemanticResponseCache(embed_fn=keyword_embed)
+
+
+@pytest.fixture
+def semantic_cache():
+    return SemanticResponseCache(embed_fn=keyword_embed, policies={"search_icd10": (3600, 0.95)})
+
+
+async def test_exact_hit_ignores_case_and_whitespace(cache):
+    llm = Counter()
+    first = await cache.get_or_generate("search_icd10", "m", "ICD codes for  Chest Pain", llm.generator(["R07.9"]))
+    second = await cache.get_or_generate("search_icd10", "m", "icd codes for chest pain", llm.generator(["other"]))
+
+    assert first == second == ["R07.9"]
+    assert llm.calls == 1
+    assert cache.get_stats()["exact_hits"] == 1
+
+
+async def test_semantic_tier_serves_similar_prompt(semantic_cache):
+    llm = Counter()
+    await semantic_cache.get_or_generate("search_icd10", "m", "ICD codes for chest pain", llm.generator(["R07.9"]))
+    result = await semantic_cache.get_or_generate("search_icd10", "m", "Find ICD codes: pain in chest", llm.generator(["x"]))
+    unrelated = await semantic_cache.get_or_generate("search_icd10", "m", "ICD codes for asthma", llm.generator(["J45"]))
+
+    assert result == ["R07.9"]
+    assert unrelated == ["J45"]
+    assert llm.calls == 2
+    assert semantic_cache.get_stats()["semantic_hits"] == 1
+
+
+@pytest.mark.parametrize("first, second", [
+    ("fracture of left knee", "fracture of right knee"),
+    ("type 1 diabetes", "type 2 diabetes"),
+    ("chest pain", "no chest pain"),
+    ("patient denies chest pain", "patient reports chest pain"),
+])
+async def test_near_duplicate_clinical_prompts_do_not_collide(cache, semantic_cache, first, second):
+    assert keyword_embed(first) == keyword_embed(second)
+    for c in (cache, semantic_cache):
+        llm = Counter()
+        assert await c.get_or_generate("search_icd10", "m", first, llm.generator("first")) == "first"
+        assert await c.get_or_generate("search_icd10", "m", second, llm.generator("second")) == "second"
+        assert llm.calls == 2
+        assert c.get_stats()["semantic_hits"] == 0
+
+
+async def test_models_and_endpoints_do_not_share_entries(cache):
+    llm = Counter()
+    await cache.get_or_generate("search_icd10", "m1", "chest pain", llm.generator(1))
+    await cache.get_or_generate("search_icd10", "m2", "chest pain", llm.generator(2))
+    await cache.get_or_generate("classify_domain", "m1", "chest pain", llm.generator(3))
+
+    assert llm.calls == 3
+
+
+async def test_phi_prompts_are_never_cached(cache):
+    llm = Counter()
+    prompt = "Explain chest pain for patient MRN: 448812, contact jane@example.com"
+    assert contains_phi(prompt)
+
+    await cache.get_or_generate("explain_diagnosis", "m", prompt, llm.generator("a"))
+    await cache.get_or_generate("explain_diagnosis", "m", prompt, llm.generator("b"))
+    await cache.get_or_generate("explain_diagnosis", "m", "chest pain", llm.generator("c"), phi=True)
+
+    assert llm.calls == 3
+    assert cache.get_stats()["phi_skips"] == 3
+    assert cache.get_stats()["size"] == 0
+
+
+async def test_entries_expire_per_endpoint_ttl(cache, monkeypatch):
+    llm = Counter()
+    cache.policies["search_icd10"] = (60, None)
+    await cache.get_or_generate("search_icd10", "m", "chest pain", llm.generator(1))
+
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 120)
+    await cache.get_or_generate("search_icd10", "m", "chest pain", llm.generator(2))
+
+    assert llm.calls == 2
+    assert cache.get_stats()["expired"] == 1
+
+
+async def test_errors_are_not_cached(cache):
+    async def failing():
+        raise ValueError("bad JSON")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_generate("search_icd10", "m", "chest pain", failing)
+    assert cache.get_stats()["size"] == 0
+
+
+async def test_cached_values_are_isolated_from_callers(cache):
+    llm = Counter()
+    first = await cache.get_or_generate("search_icd10", "m", "chest pain", llm.generator({"codes": ["R07.9"]}))
+    first["codes"].append("mutated")
+
+    second = await cache.get_or_generate("search_icd10", "m", "chest pain", llm.generator({}))
+    assert second == {"codes": ["R07.9"]}
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from server.services.single_flight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_flight():
+    flight = SingleFlight()
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"plan": "rest"}
+
+    results = await asyncio.gather(*(flight.do(("plan", "c1", "v1"), generate) for _ in range(5)))
+    assert calls == 1
+    assert all(r == {"plan": "rest"} for r in results)
+    assert flight.get_stats()["coalesced"] == 4
+    assert flight.in_flight() == 0
+
+    # Landed flights are not cached; a different case version is a different flight
+    await flight.do(("plan", "c1", "v1"), generate)
+    await flight.do(("plan", "c1", "v2"), generate)
+    assert calls == 3
+
+
+async def test_one_caller_leaving_does_not_cancel_the_others():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = False
+
+    async def generate():
+        nonlocal cancelled
+        started.set()
+        try:
+            await asyncio.sleep(0.1)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    first = asyncio.create_task(flight.do("k", generate))
+    second = asyncio.create_task(flight.do("k", generate))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "done"
+    assert not cancelled
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    # When every caller has gone the generation is cancelled too
+    only = asyncio.create_task(flight.do("k2", generate))
+    await asyncio.sleep(0.01)
+    only.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await only
+    await asyncio.sleep(0)
+    assert cancelled
+    assert flight.get_stats()["abandoned"] == 1
+
+
+async def test_errors_propagate_to_every_caller():
+    flight = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("k", generate) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+async def test_ai_flights_are_not_shared_across_users():
+    from types import SimpleNamespace
+
+    from server.routes.ai import coalesced
+
+    case = SimpleNamespace(id="c1", complaint="cough", history=None, findings=None, diagnosis=None)
+    doctor = SimpleNamespace(id="u1", role="Doctor")
+    nurse = SimpleNamespace(id="u2", role="Nurse")
+    calls = []
+
+    def generate(user):
+        async def run():
+            calls.append(user.id)
+            await asyncio.sleep(0.05)
+            return {"plan": f"for {user.id}"}
+        return run
+
+    results = await asyncio.gather(coalesced("plan", case, doctor, generate(doctor)),
+                                   coalesced("plan", case, nurse, generate(nurse)),
+                                   coalesced("plan", case, doctor, generate(doctor)))
+    assert sorted(calls) == ["u1", "u2"]
+    assert [r["plan"] for r in results] == ["for u1", "for u2", "for u1"]
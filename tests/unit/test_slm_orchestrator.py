@@ -0,0 +1,72 @@
+import asyncio
+
+from server.agents.slm_orchestrator import SLMOrchestrator
+from server.services.llm_client import LLMClient
+
+TIERS = ["lite", "flash", "pro"]
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+def test_complexity_heuristics_pick_starting_tier():
+    slm = SLMOrchestrator(tiers=[SLMOrchestrator.FAST_MODEL, SLMOrchestrator.STRONG_MODEL])
+
+    assert slm.select_model("hello", "Cardiology") == SLMOrchestrator.FAST_MODEL
+    assert slm.select_model("Please compare these two ECGs", "Cardiology") == SLMOrchestrator.STRONG_MODEL
+    assert slm.select_model("x" * 1001, "Cardiology") == SLMOrchestrator.STRONG_MODEL
+
+
+def test_degrades_when_p95_exceeds_endpoint_target():
+    slm = SLMOrchestrator(tiers=TIERS)
+    for _ in range(10):
+        slm.record("models/pro", 12.0)
+
+    # 12s is within the 20s specialist budget but not the 8s chat budget
+    assert slm.select_model("q", endpoint="specialist_consult", preferred="pro") == "pro"
+    assert slm.select_model("q", endpoint="chat", preferred="pro") == "flash"
+    assert slm.get_stats()["degraded"] == 1
+
+
+def test_degrades_on_errors_and_rate_limits():
+    slm = SLMOrchestrator(tiers=TIERS)
+    for _ in range(10):
+        slm.record("flash", 1.0, error=RuntimeError("boom"))
+    assert slm.select_model("q", preferred="flash") == "lite"
+
+    slm.record("pro", 1.0, error=RateLimited("Resource exhausted"))
+    assert slm.select_model("q", preferred="pro") == "lite"
+
+
+def test_stale_observations_expire():
+    slm = SLMOrchestrator(tiers=TIERS)
+    for _ in range(10):
+        slm.record("pro", 60.0)
+    assert slm.select_model("q", endpoint="chat", preferred="pro") == "flash"
+
+    slm.HEALTH_WINDOW = 0.0
+    assert slm.select_model("q", endpoint="chat", preferred="pro") == "pro"
+
+
+async def test_llm_client_reports_calls_to_observer():
+    observed = []
+    client = LLMClient(max_concurrency=2, timeout=5)
+    client.observer = lambda model, latency, error: observed.append((model, error is None))
+
+    class Model:
+        model_name = "models/flash"
+
+        async def generate_content_async(self, prompt, **kwargs):
+            await asyncio.sleep(0)
+            if prompt == "fail":
+                raise RuntimeError("boom")
+            return prompt
+
+    await client.generate(Model(), "ok")
+    try:
+        await client.generate(Model(), "fail")
+    except RuntimeError:
+        pass
+
+    assert observed == [("models/flash", True), ("models/flash", False)]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from server.models import Case, MedicalRecord, StatsRollup, SystemLog, User
+from server.services import stats_rollup as stats_rollup_module
+from server.services.stats_rollup import StatsRollupService
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def log(db, event_type, at):
+    db.add(SystemLog(event_type=event_type, user_id="u", details={}, timestamp=at))
+
+
+def test_refresh_is_incremental_and_stats_come_from_rollup(db):
+    rollup = StatsRollupService()
+    db.add_all([User(id="u1", email="a@example.com"), User(id="u2", email="b@example.com")])
+    db.add_all([Case(id="c1", status="Open"), Case(id="c2", status="Under Review"), Case(id="c3", status="Closed")])
+    db.add_all([MedicalRecord(id="r1", type="MRI"), MedicalRecord(id="r2", type="CT"), MedicalRecord(id="r3", type="Lab")])
+    log(db, "ai_query", NOW - timedelta(days=30)) # outside the 7-day history
+    log(db, "ai_query", NOW - timedelta(days=1))
+    log(db, "ai_query", NOW - timedelta(hours=1))
+    log(db, "login", NOW - timedelta(hours=1))
+    db.commit()
+
+    rollup.refresh(db, NOW - timedelta(minutes=30))
+    stats = rollup.admin_stats(db, NOW)
+    assert stats["total_users"] == 2
+    assert stats["active_cases"] == 2
+    assert stats["ai_queries_today"] == 1
+    assert [n for _, n in stats["ai_queries_by_day"]] == [0, 0, 0, 0, 0, 1, 1]
+    assert stats["ai_queries_by_day"][-1][0] == NOW.date()
+    assert (stats["medical_images"], stats["patient_documents"], stats["system_logs"]) == (2, 1, 4)
+
+    # Only days from the last rolled-up one are recounted: older counters are kept
+    # even once their logs are gone
+    db.query(SystemLog).filter(SystemLog.timestamp < NOW - timedelta(days=2)).delete()
+    log(db, "ai_query", NOW)
+    db.add(Case(id="c4", status="Open"))
+    db.commit()
+
+    # Readers see the rollup, not the live tables, until the next refresh
+    assert rollup.admin_stats(db, NOW)["ai_queries_today"] == 1
+
+    rollup.refresh(db, NOW)
+    stats = rollup.admin_stats(db, NOW)
+    assert stats["ai_queries_today"] == 2
+    assert stats["active_cases"] == 3
+    assert stats["system_logs"] == 5
+    assert db.query(StatsRollup).filter(StatsRollup.dimension == "event_type").count() == 4
+    assert rollup.get_stats()["inline_refreshes"] == 0
+
+
+def test_admin_stats_route_refreshes_an_empty_rollup(client, db):
+    db.add(User(id="u1", email="a@example.com"))
+    log(db, "ai_query", datetime.utcnow())
+    db.commit()
+
+    response = client.get("/api/dashboard/admin/stats")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["totalUsers"] == 1
+    assert body["aiQueriesToday"] == 1
+    assert [d["tokens"] for d in body["tokenUsageHistory"]][-1] == 1000
+    assert db.query(StatsRollup).count() > 0
+
+
+def test_refresh_overwrites_rows_of_a_racing_refresh_and_skips_when_locked(db, monkeypatch):
+    rollup = StatsRollupService()
+    db.add(Case(id="c1", status="Open"))
+    log(db, "login", NOW)
+    db.commit()
+
+    # Rows another worker committed after this refresh deleted the stale ones
+    real_upsert = stats_rollup_module._upsert
+    def racing_upsert(session, rows):
+        if any(r["dimension"] == "case_status" for r in rows):
+            session.add(StatsRollup(day=NOW.date(), dimension="case_status", key="Open", count=99, updated_at=NOW))
+            session.flush()
+        real_upsert(session, rows)
+    monkeypatch.setattr(stats_rollup_module, "_upsert", racing_upsert)
+    rollup.refresh(db, NOW)
+    assert rollup.admin_stats(db, NOW)["active_cases"] == 1
+
+    # Another worker holds the refresh lock: this round is skipped, nothing is written
+    monkeypatch.setattr(stats_rollup_module, "_upsert", real_upsert)
+    monkeypatch.setattr(stats_rollup_module, "_try_lock", lambda session: False)
+    db.add(Case(id="c2", status="Open"))
+    db.commit()
+    assert rollup.refresh(db, NOW) == 0
+    assert rollup.admin_stats(db, NOW)["active_cases"] == 1
+    assert rollup.get_stats()["skipped_refreshes"] == 1
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from server.utils.text_processing import TextSplitter, word_token_count
+
+DOCUMENT = "\n\n".join(
+    f"Section {i}. " + " ".join(f"finding{j}" for j in range(40)) for i in range(6)
+)
+
+
+def test_chunks_respect_budget_and_offsets():
+    chunks = list(TextSplitter.stream_split(DOCUMENT, chunk_size=200, overlap=50))
+
+    assert len(chunks) > 5
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    for c in chunks:
+        assert len(c.text) <= 200
+        assert DOCUMENT[c.start:c.end] == c.text
+
+
+def test_overlap_is_honoured():
+    chunks = list(TextSplitter.stream_split(DOCUMENT, chunk_size=200, overlap=50))
+
+    overlapping = [a for a, b in zip(chunks, chunks[1:]) if b.start < a.end]
+    assert len(overlapping) >= len(chunks) // 2
+    assert all(a.end - b.start <= 50 for a, b in zip(chunks, chunks[1:]))
+
+    no_overlap = list(TextSplitter.stream_split(DOCUMENT, chunk_size=200, overlap=0))
+    assert all(b.start >= a.end for a, b in zip(no_overlap, no_overlap[1:]))
+
+
+def test_streamed_sources_match_string_source():
+    expected = list(TextSplitter.stream_split(DOCUMENT, chunk_size=200, overlap=50))
+
+    from_file = list(TextSplitter.stream_split(io.StringIO(DOCUMENT), chunk_size=200, overlap=50))
+    pieces = (DOCUMENT[i:i + 13] for i in range(0, len(DOCUMENT), 13))
+    from_iter = list(TextSplitter.stream_split(pieces, chunk_size=200, overlap=50))
+
+    assert from_file == expected
+    assert from_iter == expected
+
+
+def test_token_budget_with_pluggable_tokenizer():
+    chunks = list(TextSplitter.stream_split(DOCUMENT, chunk_size=25, overlap=5, length_function=word_token_count))
+
+    assert max(word_token_count(c.text) for c in chunks) <= 25
+
+
+def test_recursive_split_without_separators_and_invalid_overlap():
+    assert [len(c) for c in TextSplitter.recursive_split("a" * 2500, chunk_size=1000, overlap=200)] == [800, 1000, 1000, 300]
+    assert TextSplitter.recursive_split("", chunk_size=100) == []
+    with pytest.raises(ValueError):
+        list(TextSplitter.stream_split("text", chunk_size=10, overlap=10))
+
+
+def test_unbroken_text_keeps_overlap():
+    text = "".join(chr(97 + i % 26) for i in range(2500))
+    chunks = list(TextSplitter.stream_split(text, chunk_size=1000, overlap=200))
+
+    assert max(len(c.text) for c in chunks) <= 1000
+    assert all(text[c.start:c.end] == c.text for c in chunks)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.end - nxt.start == 200
+    assert chunks[-1].end == len(text)
@@ -0,0 +1,145 @@
+import hashlib
+
+import numpy as np
+import pytest
+from usearch.index import Index
+
+from server.services.agent_service import USearchVectorStore
+from server.services.embedding_pipeline import EmbeddingPipeline
+
+NDIM = 8
+
+
+def fake_embed(texts, task_type="retrieval_document", title=None):
+    """Deterministic local embedder: one pseudo-random vector per text."""
+    vectors = []
+    for text in texts:
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        vectors.append(np.random.default_rng(seed).random(NDIM).tolist())
+    return vectors
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s = USearchVectorStore()
+    s.ndim = NDIM
+    s.embedder = EmbeddingPipeline(fake_embed)
+    return s
+
+
+def test_sparse_tenant_gets_full_results(store):
+    # A large tenant that would crowd out a small one in a global top-k search
+    store.add_many("big", [(f"big tenant note {i}", {}) for i in range(200)])
+    store.add_many("small", [("small note A", {}), ("small note B", {})])
+
+    results = store.query_with_scores("small", "big tenant note 7", n_results=2)
+
+    assert sorted(text for text, _, _ in results) == ["small note A", "small note B"]
+    assert len(store.query("big", "big tenant note 7", n_results=5)) == 5
+    assert store.query("nobody", "anything", n_results=3) == []
+
+
+def test_metadata_filter_searches_within_tenant(store):
+    store.add_many("u1", [(f"note {i}", {"type": "lab" if i % 10 == 0 else "note"}) for i in range(50)])
+
+    results = store.query_with_scores("u1", "note 3", n_results=3, filter={"type": "lab"})
+
+    assert len(results) == 3
+    assert all(meta["type"] == "lab" for _, meta, _ in results)
+
+
+def test_partitions_persist_and_reload(store, tmp_path):
+    store.add_many("u1", [("alpha", {}), ("beta", {})])
+
+    reopened = USearchVectorStore()
+    reopened.ndim = NDIM
+    reopened.embedder = EmbeddingPipeline(fake_embed)
+    assert sorted(reopened.query("u1", "alpha", n_results=5)) == ["alpha", "beta"]
+
+
+def test_legacy_global_index_is_migrated(store):
+    # Simulate data written by the old single-index layout
+    legacy = Index(ndim=NDIM, metric="cos")
+    for doc_id, text in [(11, "legacy one"), (12, "legacy two")]:
+        legacy.add(doc_id, np.array(fake_embed([text])[0], dtype=np.float32))
+        store.metadata_store[str(doc_id)] = {"text": text, "metadata": {}, "user_id": "old", "content_hash": text}
+    legacy.save(store.index_path)
+    store._save_metadata()
+
+    reopened = USearchVectorStore()
+    reopened.ndim = NDIM
+    reopened.embedder = EmbeddingPipeline(fake_embed)
+
+    assert sorted(reopened.query("old", "legacy one", n_results=5)) == ["legacy one", "legacy two"]
+
+
+def test_simple_json_store_ranks_by_bm25(tmp_path, monkeypatch):
+    from server.services.agent_service import SimpleJSONVectorStore
+
+    monkeypatch.chdir(tmp_path)
+    json_store = SimpleJSONVectorStore()
+    json_store.add_many("u1", [
+        ("Zebra crossing notes", {"type": "note"}),
+        ("Allergic to penicillin, rash in 2019", {"type": "allergy"}),
+        ("Penicillin allergy confirmed; penicillin avoided", {"type": "allergy"}),
+    ])
+
+    results = json_store.query_with_scores("u1", "penicillin allergy", n_results=3)
+
+    assert results[0][0] == "Penicillin allergy confirmed; penicillin avoided"
+    assert [score for _, _, score in results] == sorted((score for _, _, score in results), reverse=True)
+    assert json_store.query("u1", "penicillin", n_results=5, filter={"type": "note"}) == []
+
+    # A second process sees the new data without re-reading on every query
+    other = SimpleJSONVectorStore()
+    assert len(other.query("u1", "zebra", n_results=1)) == 1
+
+
+def test_usearch_keyword_search_is_per_tenant(store):
+    store.add_many("u1", [("HbA1c 8.2 percent", {}), ("LDL 130", {})])
+    store.add_many("u2", [("HbA1c 6.1 percent", {})])
+
+    assert [t for t, _, _ in store.keyword_search("u1", "HbA1c", 5)] == ["HbA1c 8.2 percent"]
+    store.add_many("u1", [("HbA1c repeat 7.9", {})])
+    assert len(store.keyword_search("u1", "HbA1c", 5)) == 2
+
+
+class FakePGConnection:
+    """Records statements; answers the content-hash lookup from `stored`."""
+
+    def __init__(self, stored, statements):
+        self.stored = stored
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params):
+        self.statements.append((str(statement), params))
+        if "SELECT content_hash" in str(statement):
+            return [(d,) for d in params["digests"] if (params["user_id"], d) in self.stored]
+        return []
+
+
+def test_pgvector_store_skips_stored_content(monkeypatch):
+    from server.services.agent_service import PGVectorStore
+    from server.utils.text_processing import content_hash
+
+    statements, embedded = [], []
+    engine = type("Engine", (), {})()
+    engine.connect = engine.begin = lambda: FakePGConnection({("u1", content_hash("old"))}, statements)
+    monkeypatch.setattr(PGVectorStore, "_init_db", lambda self: None)
+    monkeypatch.setattr("server.database.engine", engine)
+    pg = PGVectorStore()
+    pg.embedder = EmbeddingPipeline(lambda texts, *args, **kw: embedded.extend(texts) or fake_embed(texts))
+
+    pg.add_many("u1", [("old", {}), ("new", {}), ("new", {})])
+
+    assert embedded == ["new"]
+    insert, rows = statements[-1]
+    assert "ON CONFLICT (user_id, content_hash) DO NOTHING" in insert
+    assert [(r["content"], r["content_hash"]) for r in rows] == [("new", content_hash("new"))]
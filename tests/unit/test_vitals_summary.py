@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from server.models import Patient, User, VitalReading
+
+
+def add_readings(db, patient_id, vital_type, values, **extra):
+    now = datetime.utcnow()
+    for i, value in enumerate(values):
+        db.add(VitalReading(patient_id=patient_id, type=vital_type, value=str(value), unit="u", status="Normal",
+                            source="Manual", recorded_at=now - timedelta(minutes=len(values) - i), **extra))
+
+
+def test_summary_latest_two_per_type(client, patient_auth, db):
+    user = db.query(User).filter(User.email == "test_patient_qa@example.com").first()
+    patient_id = db.query(Patient).filter(Patient.user_id == user.id).first().id
+
+    add_readings(db, patient_id, "heart_rate", [50] * 10 + [60, 70]) # oldest first
+    add_readings(db, patient_id, "weight", [80])
+    add_readings(db, patient_id, "blood_pressure", [0, 0], systolic=150)
+    add_readings(db, patient_id, "glucose", ["n/a", 100])
+    add_readings(db, "someone-else", "oxygen", [99, 98])
+    db.commit()
+
+    response = client.get("/api/vitals/summary", headers=patient_auth)
+    assert response.status_code == 200
+    summary = {s["type"]: s for s in response.json()}
+
+    assert [s["type"] for s in response.json()] == ["blood_pressure", "heart_rate", "weight", "glucose"]
+    assert summary["heart_rate"]["latest_value"] == "70"
+    assert summary["heart_rate"]["trend"] == "up"
+    assert summary["heart_rate"]["change_percent"] == 16.7
+    assert summary["heart_rate"]["readings_count"] == 10
+    assert summary["weight"] == {**summary["weight"], "trend": "stable", "change_percent": None, "readings_count": 1}
+    assert summary["blood_pressure"]["trend"] == "stable"
+    assert summary["glucose"]["change_percent"] is None
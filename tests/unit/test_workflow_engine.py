@@ -0,0 +1,213 @@
+import asyncio
+
+import pytest
+
+from server.agents.workflow_engine import Workflow, WorkflowAbort, WorkflowEngine, WorkflowStep
+
+
+class FakeSession:
+    opened = []
+
+    def __init__(self):
+        self.closed = False
+        FakeSession.opened.append(self)
+
+    def close(self):
+        self.closed = True
+
+
+def make_engine(calls, delay=0.05):
+    async def dispatch(task, payload, context, db):
+        calls.append(task)
+        await asyncio.sleep(delay)
+        return {"task": task, "payload": payload}
+
+    FakeSession.opened = []
+    return WorkflowEngine(dispatch, session_factory=FakeSession)
+
+
+def diamond(load_calls=None):
+    async def load(inputs, db, context):
+        if load_calls is not None:
+            load_calls.append(inputs["x"])
+        if inputs["x"] is None:
+            raise WorkflowAbort({"error": "Missing x"})
+        return {"x": inputs["x"]}
+
+    return Workflow(
+        name="diamond",
+        steps=[
+            WorkflowStep("load", fn=load, inputs=lambda s: {"x": s["payload"].get("x")}, memoize=False),
+            WorkflowStep("left", after=["load"], task="left", inputs=lambda s: {"x": s["load"]["x"]}),
+            WorkflowStep("right", after=["load"], task="right", inputs=lambda s: {"x": s["load"]["x"]}),
+            WorkflowStep("skip", after=["load"], task="never", when=lambda s: False),
+            WorkflowStep("join", after=["left", "right"], task="join",
+                         inputs=lambda s: {"l": s["left"]["payload"], "r": s["right"]["payload"]}),
+        ],
+        output=lambda s: {"status": "success", "join": s["join"], "skip": s["skip"]}
+    )
+
+
+def test_workflow_rejects_cycles_and_unknown_steps():
+    with pytest.raises(ValueError):
+        Workflow("cyclic", [WorkflowStep("a", after=["b"], task="a"), WorkflowStep("b", after=["a"], task="b")], dict)
+    with pytest.raises(ValueError):
+        Workflow("dangling", [WorkflowStep("a", after=["missing"], task="a")], dict)
+
+
+async def test_independent_steps_run_concurrently_in_own_sessions():
+    calls = []
+    engine = make_engine(calls, delay=0.1)
+    engine.register(diamond())
+
+    started = asyncio.get_running_loop().time()
+    result = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert result["status"] == "success"
+    assert result["skip"]["status"] == "skipped"
+    assert "never" not in calls
+    # left and right overlap: two waves of 0.1s, not three
+    assert elapsed < 0.28
+    assert len(FakeSession.opened) == 4 # load, left, right, join
+    assert all(s.closed for s in FakeSession.opened)
+    assert result["workflow"]["steps"]["left"] == "run"
+
+
+async def test_memoised_steps_and_partial_rerun():
+    calls, loads = [], []
+    engine = make_engine(calls, delay=0)
+    engine.register(diamond(loads))
+
+    first = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    assert sorted(calls) == ["join", "left", "right"]
+
+    calls.clear()
+    second = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    assert calls == []
+    assert second["workflow"]["steps"]["left"] == "memo"
+    assert loads == [1, 1] # not memoised
+
+    # Re-running one branch recomputes it and everything downstream only
+    calls.clear()
+    await engine.run("diamond", {"x": 1}, {"user_id": "u1"}, rerun=["left"])
+    assert sorted(calls) == ["join", "left"]
+
+    # Reusing an earlier run skips its memoisable steps entirely; the load step
+    # reads live state and always runs
+    calls.clear()
+    loads.clear()
+    engine.clear_memo()
+    third = await engine.run("diamond", {"x": 1}, {"user_id": "u1"},
+                             previous_run=first["workflow"]["run_id"], rerun=["right"])
+    assert sorted(calls) == ["join", "right"]
+    assert loads == [1]
+    assert third["workflow"]["steps"]["left"] == "previous"
+
+    # Different inputs miss the memo
+    calls.clear()
+    await engine.run("diamond", {"x": 2}, {"user_id": "u1"})
+    assert sorted(calls) == ["join", "left", "right"]
+
+
+async def test_errors_are_not_memoised_and_memo_hits_respect_consent():
+    calls, failing, denied = [], {"left"}, set()
+
+    async def dispatch(task, payload, context, db):
+        calls.append(task)
+        if task in failing:
+            return {"status": "error", "message": "upstream down", "payload": payload}
+        return {"task": task, "payload": payload}
+
+    def consent_check(task, context, db):
+        return {"status": "error", "message": "Permission Denied"} if task in denied else None
+
+    engine = WorkflowEngine(dispatch, session_factory=FakeSession, consent_check=consent_check)
+    engine.register(diamond())
+
+    first = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    assert first["workflow"]["results"]["left"]["status"] == "error"
+
+    # The failed step is retried, the successful ones come from the memo
+    failing.clear()
+    calls.clear()
+    second = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    assert "left" in calls and "right" not in calls
+    assert second["workflow"]["results"]["left"]["task"] == "left"
+
+    # Withdrawn consent is enforced on memo hits too
+    denied.add("join")
+    calls.clear()
+    third = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    assert calls == []
+    assert third["join"] == {"status": "error", "message": "Permission Denied"}
+    assert third["workflow"]["steps"] == {"load": "run", "left": "memo", "right": "memo", "skip": "skipped", "join": "run"}
+
+
+async def test_previous_run_is_bound_to_user_and_payload():
+    calls = []
+    engine = make_engine(calls, delay=0)
+    engine.register(diamond())
+
+    first = await engine.run("diamond", {"x": 1}, {"user_id": "u1"})
+    run_id = first["workflow"]["run_id"]
+    engine.clear_memo() # every reused step must come from the earlier run
+
+    calls.clear()
+    again = await engine.run("diamond", {"x": 1}, {"user_id": "u1"}, previous_run=run_id)
+    assert calls == []
+    assert again["workflow"]["steps"]["join"] == "previous"
+
+    # Another user, another case, or an unknown id: nothing is reused
+    for payload, context, previous_run in [({"x": 1}, {"user_id": "u2"}, run_id),
+                                           ({"x": 2}, {"user_id": "u1"}, run_id),
+                                           ({"x": 1}, {"user_id": "u1"}, "forged")]:
+        calls.clear()
+        engine.clear_memo()
+        result = await engine.run("diamond", payload, context, previous_run=previous_run)
+        assert sorted(calls) == ["join", "left", "right"]
+        assert "previous" not in result["workflow"]["steps"].values()
+
+
+async def test_abort_and_unknown_workflow():
+    engine = make_engine([])
+    engine.register(diamond())
+
+    assert await engine.run("diamond", {}, {"user_id": "u1"}) == {"error": "Missing x"}
+    assert await engine.run("nope", {}, {}) == {"error": "Unknown workflow"}
+
+
+async def test_comprehensive_analysis_workflow(db, monkeypatch):
+    from server.agents.workflows import COMPREHENSIVE_PATIENT_ANALYSIS
+    from server.models import Case, LabResult
+    from server.services import domain_router as domain_router_module
+
+    db.add(Case(id="case-wf", complaint="Chest pain", history="HTN", findings="ST elevation"))
+    db.add(LabResult(case_id="case-wf", test="Troponin", value="2.1", unit="ng/mL"))
+    db.commit()
+
+    async def classify(text):
+        return {"domain": "Cardiology"}
+    monkeypatch.setattr(domain_router_module.domain_router, "classify_domain", classify)
+
+    calls = []
+    engine = make_engine(calls, delay=0)
+    engine.session_factory = lambda: db.__class__(bind=db.get_bind())
+    engine.register(COMPREHENSIVE_PATIENT_ANALYSIS)
+
+    result = await engine.run("comprehensive_patient_analysis", {"case_id": "case-wf"}, {"user_id": "u1"})
+    assert result["domain"] == "Cardiology"
+    assert sorted(calls) == ["analyze_labs", "augment_case", "specialist_consult"]
+    assert result["consultation_summary"]["imaging"]["status"] == "skipped"
+    synthesis = result["final_recommendation"]["payload"]
+    assert synthesis["extracted_data"]["consultation_context"] == "Multi-Disciplinary Team Review (Cardiology)"
+
+    # New lab rows change the case fingerprint, so lab analysis is not served from the memo
+    calls.clear()
+    db.add(LabResult(case_id="case-wf", test="CK-MB", value="30", unit="U/L"))
+    db.commit()
+    await engine.run("comprehensive_patient_analysis", {"case_id": "case-wf"}, {"user_id": "u1"})
+    assert sorted(calls) == ["analyze_labs", "augment_case"]
+
+    missing = await engine.run("comprehensive_patient_analysis", {"case_id": "nope"}, {"user_id": "u1"})
+    assert missing == {"error": "Case not found"}